@@ -1,19 +1,43 @@
-from google import genai
-from google.genai import types
 import os
+import time
+import threading
 import json
 import logging
 from pydantic import BaseModel, Field, computed_field
 from typing import List
 from template_manager import load_templates
+from logging_config import payload
+from money import LineArray, cents_to_float, line_total, round_money
 
 # Configure module logger
 logger = logging.getLogger(__name__)
 
-# Configure Gemini AI
-api_key= os.environ['GEMINI_API_KEY']
-client = genai.Client(api_key=api_key)
+# Configure Gemini AI; the client (and the google-genai package) load on first use
 model = "gemini-2.0-flash"
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Get the shared Gemini client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from google import genai
+                _client = genai.Client(api_key=os.environ['GEMINI_API_KEY'])
+    return _client
+
+def _generate_content(**kwargs):
+    """Call Gemini's generate_content, recording latency and token usage."""
+    from instrumentation import record_gemini_call
+
+    started = time.perf_counter()
+    response = None
+    try:
+        response = get_client().models.generate_content(**kwargs)
+        return response
+    finally:
+        record_gemini_call('generate_content', kwargs.get('model', model), time.perf_counter() - started, response)
 
 ##Project from description
 class Request(BaseModel):
@@ -48,7 +72,7 @@ def extract_project_data(description: str) -> tuple[dict, dict]:
     prompt = f"Extract the structured data from {description}"
 
     try:
-        response = client.models.generate_content(
+        response = _generate_content(
             model=model,
             contents=prompt,
             config={'response_mime_type': 'application/json', 'response_schema': ProjectData})
@@ -83,12 +107,12 @@ def extract_project_data_from_image(file_path: str) -> tuple[dict, dict]:
         raise FileNotFoundError(f"File not found: {file_path}")
         
     logger.info(f"Uploading file from {file_path} to Gemini API")
-    img_file = client.files.upload(file=file_path, config={'display_name': 'project_details'})
+    img_file = get_client().files.upload(file=file_path, config={'display_name': 'project_details'})
     logger.info(f"File uploaded successfully")
 
     prompt = "Extract the structured data from the following file. Include customer name, contact details, and project information."
-    logger.info(f"Sending prompt to Gemini API: {prompt}")
-    response = client.models.generate_content(
+    logger.debug("Sending prompt to Gemini API: %s", prompt)
+    response = _generate_content(
         model=model,
         contents=[prompt, img_file],
         config={'response_mime_type': 'application/json', 'response_schema': ProjectData}
@@ -110,7 +134,7 @@ def extract_project_data_from_image(file_path: str) -> tuple[dict, dict]:
         if not project_data.details or len(project_data.details) == 0:
             logger.warning("No project details found in image")
             
-        logger.debug(f"Extracted project data: {project_data}")
+        logger.debug("Extracted project data: %s", payload(project_data))
     except Exception as e:
         logger.error(f"Error parsing response: {str(e)}")
         raise
@@ -123,48 +147,158 @@ def extract_project_data_from_image(file_path: str) -> tuple[dict, dict]:
         "address": project_data.customer_address,
         "project_address": project_data.project_address
     }
-    logger.info(f"Customer data: {customer}")
+    logger.debug("Customer data: %s", payload(customer))
 
     project = {
         "notes": project_data.notes,
         "details": [{"item": detail.item, "quantity": detail.quantity} for detail in project_data.details]
     }
-    logger.info(f"Project data: {project}")
+    logger.debug("Project data: %s", payload(project))
 
     return customer, project
 
 
-def generate_price_list_from_image(file_path: str) -> Items:
-    img_file = client.files.upload(file=file_path, config={'display_name': 'price_list'})
+# Chunked price list extraction for large supplier documents
+PRICE_EXTRACTION_WORKERS = 4
+PDF_PAGES_PER_CHUNK = 2
+TEXT_CHUNK_CHARS = 6000
+
+def _split_pdf(file_path: str, pages_per_chunk: int = PDF_PAGES_PER_CHUNK) -> list[bytes]:
+    """Split a PDF into small PDFs of a few pages each, or return [] if it can't be split."""
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError:
+        logger.warning("pypdf is not installed; extracting the PDF in a single request")
+        return []
+
+    import io
+    try:
+        reader = PdfReader(file_path)
+        chunks = []
+        for start in range(0, len(reader.pages), pages_per_chunk):
+            writer = PdfWriter()
+            for page in reader.pages[start:start + pages_per_chunk]:
+                writer.add_page(page)
+            buffer = io.BytesIO()
+            writer.write(buffer)
+            chunks.append(buffer.getvalue())
+        return chunks
+    except Exception as e:
+        logger.warning(f"Could not split PDF {file_path}, extracting it in a single request: {str(e)}")
+        return []
+
+def _split_long_line(line: str, max_chars: int) -> list[str]:
+    """Break a line longer than max_chars at whitespace (or mid-word if there is none)."""
+    pieces = []
+    while len(line) > max_chars:
+        cut = line.rfind(' ', 0, max_chars) + 1 or max_chars
+        pieces.append(line[:cut])
+        line = line[cut:]
+    pieces.append(line)
+    return pieces
+
+def _split_text(description: str, max_chars: int = TEXT_CHUNK_CHARS) -> list[str]:
+    """Split a price description into chunks on line boundaries, breaking overlong lines."""
+    chunks, current, size = [], [], 0
+    lines = (piece for line in description.splitlines(keepends=True) for piece in _split_long_line(line, max_chars))
+    for line in lines:
+        if current and size + len(line) > max_chars:
+            chunks.append(''.join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        chunks.append(''.join(current))
+    return chunks
+
+def _price_list_chunks(file_path: str = None, description: str = None) -> list:
+    """Build the list of extraction requests for a file or a text description."""
+    if description is not None:
+        return [[f"Extract the structured data from the following: {chunk}"] for chunk in _split_text(description)]
 
     prompt = "Extract structured price list data from the following file"
-    response = client.models.generate_content(
+    if file_path.lower().endswith('.pdf'):
+        pages = _split_pdf(file_path)
+        if len(pages) > 1:
+            part_prompt = f"{prompt}. It is one part of a longer price list; extract every item on these pages"
+            from google.genai import types
+            return [[part_prompt, types.Part.from_bytes(data=data, mime_type='application/pdf')] for data in pages]
+
+    # Images and unsplittable documents go through the Files API as a single request
+    return [[prompt, get_client().files.upload(file=file_path, config={'display_name': 'price_list'})]]
+
+def _extract_price_chunk(contents: list) -> list[Item]:
+    response = _generate_content(
         model=model,
-        contents=[prompt, img_file],
+        contents=contents,
         config={'response_mime_type': 'application/json', 'response_schema': Items}
     )
-
     price_list: Items = response.parsed
-    return price_list
-
-def generate_price_list(description: str) -> Items:
-  prompt = f"Extract the structured data from the following: {description}"
-
-  response = client.models.generate_content(
-      model=model,
-      contents=prompt,
-      config={'response_mime_type': 'application/json', 'response_schema': Items})
-
-  price_list: Items = response.parsed
-
-
-  return price_list
-
+    return price_list.prices if price_list else []
+
+def merge_price_items(item_lists: list[list[Item]]) -> Items:
+    """Merge items extracted from separate chunks, dropping duplicates.
+
+    Items are matched on their normalized name. When an item appears more than
+    once, the first occurrence with a known unit and non-zero price wins.
+    """
+    merged = {}
+    for items in item_lists:
+        for item in items:
+            key = ' '.join(item.item.split()).lower()
+            if not key or key == 'unknown':
+                continue
+            existing = merged.get(key)
+            if existing is None or (existing.price == 0 and item.price != 0) or \
+                    (existing.unit == 'unknown' and item.unit != 'unknown' and item.price == existing.price):
+                merged[key] = item
+    return Items(prices=list(merged.values()))
+
+def iter_price_list_extraction(file_path: str = None, description: str = None,
+                               max_workers: int = PRICE_EXTRACTION_WORKERS):
+    """
+    Extract a price list chunk by chunk, reporting progress as chunks finish
+
+    Large documents are split into page ranges (PDF) or line-bounded sections
+    (text) that are extracted concurrently, so no single response has to hold
+    the whole price list.
+
+    Yields:
+        dict: {'type': 'progress', 'done', 'total', 'items'} after each chunk,
+              then {'type': 'result', 'price_list': Items}
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    chunks = _price_list_chunks(file_path, description)
+    logger.info(f"Extracting price list in {len(chunks)} chunk(s)")
+    results = [None] * len(chunks)
+    found = 0
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(chunks)) or 1)
+    try:
+        futures = {executor.submit(_extract_price_chunk, chunk): index for index, chunk in enumerate(chunks)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            found += len(results[futures[future]])
+            yield {'type': 'progress', 'done': done, 'total': len(chunks), 'items': found}
+    finally:
+        # If the consumer stops early (client disconnected, or a chunk failed),
+        # don't keep making model calls nobody will read
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # Merge in document order so earlier pages win ties
+    yield {'type': 'result', 'price_list': merge_price_items(results)}
+
+def generate_price_list_chunked(file_path: str = None, description: str = None) -> Items:
+    """Extract a price list with iter_price_list_extraction, without progress reporting."""
+    for event in iter_price_list_extraction(file_path, description):
+        if event['type'] == 'result':
+            return event['price_list']
 
 def analyze_project(description: str) -> dict:
   prompt = f"Extract the structured data from {description}"
 
-  response = client.models.generate_content(
+  response = _generate_content(
       model=model,
       contents=prompt,
       config={'response_mime_type': 'application/json', 'response_schema': Requests})
@@ -174,10 +308,10 @@ def analyze_project(description: str) -> dict:
   return user_request
 
 def analyze_project_image(file_path: str) -> dict:
-  img_file = client.files.upload(file=file_path, config={'display_name': 'project_details'})
+  img_file = get_client().files.upload(file=file_path, config={'display_name': 'project_details'})
 
   prompt = "Extract the structured data from the following file"
-  response = client.models.generate_content(
+  response = _generate_content(
       model=model,
       contents=[prompt, img_file],
       config={'response_mime_type': 'application/json', 'response_schema': Requests}
@@ -194,7 +328,8 @@ class Line_Item(BaseModel):
 
   @computed_field
   def total(self) -> float:
-    return self.price * self.quantity
+    # Multiplied in integer cents so e.g. 0.1 x 3 is 0.3, not 0.30000000000000004
+    return line_total(self.price, self.quantity)
 
 class Line_Items(BaseModel):
   lines: list[Line_Item] = Field(description="The list of line items with the item name, price, and quantity.")
@@ -202,7 +337,7 @@ class Line_Items(BaseModel):
   @computed_field
   def sub_total(self) -> float:
       """Calculates the sum of all line item totals."""
-      return sum(line.total for line in self.lines)
+      return cents_to_float(LineArray.from_lines(self.lines).subtotal())
 
 
 def lookup_prices(project_details: dict, price_list: dict) -> Line_Items:
@@ -213,8 +348,8 @@ def lookup_prices(project_details: dict, price_list: dict) -> Line_Items:
     prompt_manager = get_prompt_manager()
     
     # Log the inputs for debugging
-    logger.debug(f"Price lookup called with price_list: {price_list}")
-    logger.debug(f"Project details: {project_details}")
+    logger.debug("Price lookup called with price_list: %s", payload(price_list))
+    logger.debug("Project details: %s", payload(project_details))
     
     # Check if price list is empty
     if not price_list or len(price_list) == 0:
@@ -249,7 +384,7 @@ def lookup_prices(project_details: dict, price_list: dict) -> Line_Items:
                 lowercase_price_map[item_name.lower()] = {
                     "name": item_name,  # Keep original capitalization for display
                     "unit": item_data.get("unit", "unknown"),
-                    "price": float(item_data.get("price", 0.0))
+                    "price": round_money(item_data.get("price", 0.0))
                 }
         
         # Try to match items from project details to price list
@@ -265,7 +400,7 @@ def lookup_prices(project_details: dict, price_list: dict) -> Line_Items:
                     item_data = {
                         "name": item_name,
                         "unit": price_list[item_name].get("unit", "unknown"),
-                        "price": float(price_list[item_name].get("price", 0.0))
+                        "price": round_money(price_list[item_name].get("price", 0.0))
                     }
                 elif item_name.lower() in lowercase_price_map:
                     # Case-insensitive match
@@ -280,7 +415,7 @@ def lookup_prices(project_details: dict, price_list: dict) -> Line_Items:
                         quantity=quantity
                     )
                     manual_line_items.append(line_item)
-                    logger.debug(f"Direct match found for {item_name}, price: {item_data['price']}")
+                    logger.debug("Direct match found for %s, price: %s", item_name, item_data['price'])
         
         # If we have matches for all items, return the Line_Items
         if manual_line_items:
@@ -307,10 +442,11 @@ def lookup_prices(project_details: dict, price_list: dict) -> Line_Items:
         # Fallback to empty line items if prompts can't be loaded
         return Line_Items(lines=[])
     
-    logger.debug(f"Price list being sent to AI: {price_list}")
-    logger.debug(f"User request being sent to AI: {project_details}")
-    logger.debug(f"Sending prompt to Gemini API: {user_prompt}")
-    response = client.models.generate_content(
+    logger.debug("Price list being sent to AI: %s", payload(price_list))
+    logger.debug("User request being sent to AI: %s", payload(project_details))
+    logger.debug("Sending prompt to Gemini API: %s", payload(user_prompt))
+    from google.genai import types
+    response = _generate_content(
         model=model,
         contents=user_prompt,
         config = types.GenerateContentConfig(
@@ -337,7 +473,7 @@ def lookup_prices(project_details: dict, price_list: dict) -> Line_Items:
             updated_line = Line_Item(
                 name=original_name,
                 unit=line.unit,
-                price=line.price,
+                price=round_money(line.price),
                 quantity=line.quantity
             )
             updated_lines.append(updated_line)
@@ -369,7 +505,7 @@ def generate_proposal(project_details: dict, customer: dict, line_items: Line_It
         templates, _ = load_templates()
     
     # Debug log to check what templates we're receiving
-    logger.debug(f"Templates loaded: {templates}")
+    logger.debug("Templates loaded: %s", payload(templates))
     
     # Process templates to ensure proper newlines and formatting
     processed_templates = []
@@ -396,9 +532,10 @@ def generate_proposal(project_details: dict, customer: dict, line_items: Line_It
         return "Error: Could not generate proposal due to missing prompt template."
 
     # Debug log template examples to verify format
-    logger.debug(f"Template examples being sent to AI: {template_examples}")
+    logger.debug("Template examples being sent to AI: %s", payload(template_examples))
     
-    response = client.models.generate_content(
+    from google.genai import types
+    response = _generate_content(
         model=model,
         contents=user_prompt,
         config = types.GenerateContentConfig(
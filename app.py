@@ -2,6 +2,7 @@ import os
 import logging
 import threading
 import time
+from startup_profile import mark_startup_step, register_commands as register_profile_commands
 
 
 # Allow OAuth over HTTP for development only (crucial for OAuth to work in dev environment)
@@ -11,7 +12,6 @@ if os.environ.get('FLASK_ENV') != 'production':
 from flask import Flask, render_template, session, flash, redirect, url_for
 from flask_session import Session
 from markupsafe import Markup
-import markdown2
 from flask_wtf import CSRFProtect
 
 # Import configuration
@@ -25,10 +25,11 @@ from blueprints.proposals import proposals_bp
 from blueprints.prompts import prompts_bp
 from blueprints.drive_settings import drive_settings_bp
 from blueprints.admin import admin_bp, perform_session_cleanup
-from db.tenants import update_allowed_users_from_db
+from blueprints.analytics import analytics_bp
+from blueprints.search import search_bp
+
+mark_startup_step('import flask and blueprints')
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 
 # How often to clean up (in seconds)
 CLEANUP_INTERVAL = 3600  # 1 hour
@@ -57,6 +58,12 @@ app = Flask(__name__)
 # Load configuration from config.py
 app.config.from_object(get_config())
 
+# Configure logging levels and payload limits from config
+from logging_config import configure_logging
+configure_logging(app.config)
+
+mark_startup_step('load config')
+
 # Create the session directory if it doesn't exist
 os.makedirs(app.config['SESSION_FILE_DIR'], exist_ok=True)
 
@@ -96,11 +103,17 @@ app.session_interface = TenantAwareSessionInterface(app)
 # Initialize Session
 Session(app)
 
-# Initialize Markdown
-markdown = markdown2.Markdown()
+mark_startup_step('configure sessions')
 
-# Register markdown filter with None handling
-app.jinja_env.filters['markdown'] = lambda text: Markup(markdown.convert(text)) if text else Markup('')
+def render_markdown(text):
+    """Jinja filter rendering Markdown to HTML (cached by content), with None handling."""
+    if not text:
+        return Markup('')
+    from markdown_cache import render_markdown as render_cached
+    return Markup(render_cached(text))
+
+# Register markdown filter
+app.jinja_env.filters['markdown'] = render_markdown
 
 # Initialize CSRF protection
 csrf = CSRFProtect()
@@ -118,30 +131,42 @@ app.register_blueprint(proposals_bp)
 app.register_blueprint(prompts_bp)
 app.register_blueprint(drive_settings_bp)
 app.register_blueprint(admin_bp)
+app.register_blueprint(analytics_bp)
+app.register_blueprint(search_bp)
+
+mark_startup_step('register blueprints')
 
 # Import the is_admin_user function from db.tenants
 from db.tenants import is_admin_user
 
-# Add is_admin_user to template context
-app.jinja_env.filters['markdown'] = lambda text: Markup(markdown.convert(text)) if text else Markup('')
-
 # Make is_admin_user available in templates
 app.jinja_env.globals['is_admin_user'] = is_admin_user
 
 # Initialize database
 init_db(app)
 
-# Ensure tables exist before initializing price lists
-with app.app_context():
-    from db.init_db import create_tables
-    tables_created = create_tables()
+# Time requests and report Server-Timing / Prometheus metrics
+from instrumentation import init_app as init_instrumentation
+init_instrumentation(app)
+
+mark_startup_step('initialize database pool')
+
+# Schema changes are applied with `flask db-migrate`; in development, apply
+# any pending ones at startup (a no-op check once the database is at head)
+if app.config.get('AUTO_MIGRATE'):
+    with app.app_context():
+        from db.migrations import migrate
+        try:
+            if migrate():
+                from db.price_lists import initialize_price_lists
+                initialize_price_lists()
+        except Exception as e:
+            logging.error(f"Error applying database migrations: {str(e)}", exc_info=True)
 
-    if tables_created:
-        # Only initialize price lists if tables were created successfully
-        from db.price_lists import initialize_price_lists
-        initialize_price_lists()
+    mark_startup_step('apply database migrations')
 
 register_db_commands(app)
+register_profile_commands(app)
 
 # Start the cleanup thread
 cleanup_thread = threading.Thread(target=cleanup_session_files, daemon=True)
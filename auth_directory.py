@@ -0,0 +1,73 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class AuthDirectory:
+    """Caches which emails are allowed to sign in.
+
+    Each lookup is a point query for one email, so the cost of a login does not
+    grow with the number of users. Answers are remembered per email: allowed
+    emails for `ttl` seconds and rejected ones for the shorter `negative_ttl`, so
+    a newly added user is not locked out for long. Code that changes users or
+    tenant plans in this process should call invalidate(); changes made
+    elsewhere take effect once the cached answer expires.
+    """
+
+    def __init__(self, ttl=300, negative_ttl=30, max_entries=10000):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def is_allowed(self, email):
+        """Check whether an email belongs to a user of a tenant on an active plan."""
+        from db.tenants import is_email_allowed
+
+        if not email:
+            return False
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(email)
+        if entry and entry[1] > now:
+            return entry[0]
+
+        allowed = is_email_allowed(email)
+        if allowed is None:
+            # Lookup failed; don't cache the failure
+            return False
+
+        expires_at = now + (self.ttl if allowed else self.negative_ttl)
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict(now)
+            self._entries[email] = (allowed, expires_at)
+        return allowed
+
+    def _evict(self, now):
+        """Drop expired entries, or everything if none have expired yet."""
+        expired = [email for email, (_, expires_at) in self._entries.items() if expires_at <= now]
+        if not expired:
+            self._entries.clear()
+            return
+        for email in expired:
+            del self._entries[email]
+
+    def invalidate(self, email=None):
+        """Forget the cached answer for one email, or for every email if none is given."""
+        with self._lock:
+            if email is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(email, None)
+        logger.info(f"Invalidated auth directory cache for {email or 'all users'}")
+
+# Create singleton instance
+auth_directory = AuthDirectory()
+
+def get_auth_directory():
+    """Get the singleton AuthDirectory instance."""
+    return auth_directory
@@ -3,7 +3,7 @@ import glob
 import time
 import logging
 from datetime import datetime
-from flask import Blueprint, request, redirect, url_for, flash, session, render_template, current_app
+from flask import Blueprint, request, redirect, url_for, flash, session, render_template, current_app, jsonify
 from blueprints.auth import require_auth
 from db.tenants import is_admin_user, get_tenant_id_by_user_email
 from session_manager import get_tenant_session_manager
@@ -193,4 +193,71 @@ def util_cleanup_sessions(action):
             
     except Exception as e:
         logging.error(f"Session cleanup utility error: {str(e)}")
-        return f"Error: {str(e)}"
\ No newline at end of file
+        return f"Error: {str(e)}"
+
+@admin_bp.route('/admin/metrics')
+def metrics():
+    """Prometheus metrics for this worker process.
+
+    Scrapers authenticate with `Authorization: Bearer <METRICS_TOKEN>`; signed-in
+    admins can view the page directly.
+    """
+    import hmac
+    from instrumentation import get_metrics
+
+    token = current_app.config.get('METRICS_TOKEN')
+    auth_header = request.headers.get('Authorization', '')
+    authorized = bool(token) and hmac.compare_digest(auth_header, f'Bearer {token}')
+    if not authorized and not (session.get('auth_verified') and is_admin_user(session.get('user_email'))):
+        return 'Forbidden', 403
+
+    return get_metrics().render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+@admin_bp.route('/admin/diagnostics')
+@require_auth
+def diagnostics():
+    """Bounded estimate listing, table statistics and query plans for the app's main queries.
+
+    Query parameters: limit and cursor page through the tenant's estimates;
+    plans=0 skips EXPLAIN ANALYZE and format=text adds the full text plans.
+    """
+    from db.estimates import get_estimate_summaries
+    from db.diagnostics import explain_main_queries, get_table_stats, count_tenant_rows
+
+    user_email = session.get('user_email')
+    if not is_admin_user(user_email):
+        return jsonify({'error': 'Access denied'}), 403
+
+    try:
+        tenant_id = get_tenant_id_by_user_email(user_email)
+        if not tenant_id:
+            return jsonify({'error': 'No tenant found for user'}), 404
+
+        report = {
+            'tenant_id': str(tenant_id),
+            'counts': count_tenant_rows(tenant_id),
+            'tables': [
+                dict(row,
+                     last_autovacuum=row['last_autovacuum'].isoformat() if row['last_autovacuum'] else None,
+                     last_autoanalyze=row['last_autoanalyze'].isoformat() if row['last_autoanalyze'] else None)
+                for row in get_table_stats()
+            ]
+        }
+
+        estimates, next_cursor = get_estimate_summaries(
+            user_email,
+            limit=request.args.get('limit', 25),
+            cursor=request.args.get('cursor')
+        )
+        for estimate in estimates:
+            estimate['created_at'] = estimate['created_at'].isoformat() if estimate['created_at'] else None
+        report['estimates'] = estimates
+        report['next_cursor'] = next_cursor
+
+        if request.args.get('plans', '1') != '0':
+            report['query_plans'] = explain_main_queries(tenant_id, include_text=request.args.get('format') == 'text')
+
+        return jsonify(report)
+    except Exception as e:
+        logging.error(f"Error building diagnostics: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,67 @@
+import logging
+from datetime import date
+from flask import Blueprint, request, session, jsonify
+from blueprints.auth import require_auth
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+analytics_bp = Blueprint('analytics', __name__)
+
+# Upper bound on the number of top items returned
+MAX_TOP_ITEMS = 100
+
+def _serialize_rows(rows):
+    serialized = []
+    for row in rows:
+        row = dict(row)
+        for key, value in row.items():
+            if isinstance(value, date):
+                row[key] = value.isoformat()
+            elif value is not None and not isinstance(value, (int, str)):
+                # NUMERIC aggregates arrive as Decimal
+                row[key] = float(value)
+        serialized.append(row)
+    return serialized
+
+@analytics_bp.route('/api/analytics', methods=['GET'])
+@require_auth
+def analytics_api():
+    """Estimate, proposal and item reporting for the current tenant"""
+    from db.analytics import get_tenant_analytics, PERIODS, TOP_ITEM_SORTS
+
+    try:
+        email = session.get('user_email')
+        if not email:
+            return jsonify({'error': 'User not authenticated'}), 401
+
+        period = request.args.get('period', 'month')
+        if period not in PERIODS:
+            return jsonify({'error': f"period must be one of: {', '.join(PERIODS)}"}), 400
+
+        top_sort = request.args.get('top_sort', 'value')
+        if top_sort not in TOP_ITEM_SORTS:
+            return jsonify({'error': f"top_sort must be one of: {', '.join(TOP_ITEM_SORTS)}"}), 400
+
+        try:
+            start = date.fromisoformat(request.args['start']) if request.args.get('start') else None
+            end = date.fromisoformat(request.args['end']) if request.args.get('end') else None
+            top_limit = max(1, min(int(request.args.get('top', 10)), MAX_TOP_ITEMS))
+        except ValueError:
+            return jsonify({'error': 'Invalid start, end or top parameter'}), 400
+
+        analytics = get_tenant_analytics(email, period, start, end, top_sort, top_limit)
+        if analytics is None:
+            return jsonify({'error': 'No tenant found for user'}), 404
+
+        return jsonify({
+            'period': period,
+            'start': start.isoformat() if start else None,
+            'end': end.isoformat() if end else None,
+            'estimates': _serialize_rows(analytics['estimates']),
+            'proposals': _serialize_rows(analytics['proposals']),
+            'top_items': _serialize_rows(analytics['top_items'])
+        })
+    except Exception as e:
+        logger.error(f"Error building analytics: {e}")
+        return jsonify({'error': str(e)}), 500
@@ -3,35 +3,16 @@ import logging
 import warnings
 from flask import Blueprint, request, redirect, url_for, flash, session, render_template
 from functools import wraps
-import requests
 from oauth_config import create_oauth_flow
-from db.tenants import update_allowed_users_from_db, is_admin_user
+from db.tenants import is_admin_user
 
 # Register blueprint with url_prefix to match the original routes in app.py.backup
 auth_bp = Blueprint('auth', __name__, url_prefix='')
 
 def is_user_allowed(email):
-    """Check if user's email is in the allowed list from database."""
-    from flask import current_app
-    from datetime import datetime
-    from db.tenants import update_allowed_users_from_db
-    
-    # Periodically refresh the allowed users list (every 5 minutes)
-    refresh_interval = 300  # seconds
-    last_refresh = getattr(current_app, 'last_allowed_users_refresh', None)
-    now = datetime.now()
-    
-    if last_refresh is None or (now - last_refresh).total_seconds() > refresh_interval:
-        try:
-            current_app.last_allowed_users_refresh = now
-        except Exception as e:
-            current_app.logger.error(f"Error refreshing allowed users timestamp: {e}")
-    
-    # Get allowed users from database query
-    allowed_users = update_allowed_users_from_db()
-    
-    # Check if user is in the allowed users list
-    return email in allowed_users
+    """Check if user's email is allowed to sign in, using the cached auth directory."""
+    from auth_directory import get_auth_directory
+    return get_auth_directory().is_allowed(email)
 
 def require_auth(f):
     """Simplified authentication decorator that validates users once per session."""
@@ -50,21 +31,18 @@ def require_auth(f):
         
         # Only verify email once per session
         try:
-            # Get user info from Google
-            response = requests.get('https://www.googleapis.com/oauth2/v2/userinfo',
-                headers={'Authorization': f'Bearer {credentials["token"]}'})
+            # Get the verified email, from cache or local ID token checks where possible
+            from token_verification import get_token_verifier
+            email = get_token_verifier().verify(credentials, session.get('id_token'))
             
             # Check if token is valid
-            if response.status_code != 200:
+            if not email:
                 session.clear()
                 flash('Authentication expired. Please login again.', 'error')
                 return redirect(url_for('auth.login'))
             
-            # Get email and check if user is allowed
-            user_info = response.json()
-            email = user_info.get('email')
-            
-            if not email or not is_user_allowed(email):
+            # Check if user is allowed
+            if not is_user_allowed(email):
                 session.clear()
                 flash('Access denied. You are not authorized.', 'error')
                 return redirect(url_for('index'))
@@ -136,6 +114,9 @@ def oauth2callback():
             'scopes': credentials.scopes
         }
         
+        # Keep the ID token so the user's identity can be verified locally
+        session['id_token'] = getattr(credentials, 'id_token', None)
+        
         # Make sure session is permanent
         session.permanent = True
         session.modified = True
@@ -6,9 +6,9 @@ from flask import Blueprint, request, redirect, url_for, flash, session, render_
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import TextAreaField, SubmitField
-from ai_helper import extract_project_data, extract_project_data_from_image, lookup_prices
 from blueprints.auth import require_auth
-from google_services import create_doc_in_folder, create_folder_if_not_exists
+from logging_config import payload
+from money import LineArray, format_money, from_cents, to_cents
 from template_manager import load_templates
 from db.estimates import create_estimate, get_estimate, update_estimate
 
@@ -23,6 +23,17 @@ class ProjectForm(FlaskForm):
 
 
 
+def _line_items_markdown(line_items):
+    """Render estimate lines as a markdown table followed by the total."""
+    line_array = LineArray.from_lines(line_items.get('lines', []))
+    text = "| Item | Quantity | Unit | Price | Total |\n"
+    text += "|------|----------|------|-------|-------|\n"
+    for name, unit, price, quantity, total in zip(line_array.names, line_array.units, line_array.prices,
+                                                  line_array.quantities, line_array.totals()):
+        text += f"| {name} | {quantity} | {unit} | {format_money(from_cents(price))} | {format_money(from_cents(total))} |\n"
+    text += f"\n**Total: {format_money(from_cents(line_array.subtotal()))}**"
+    return text
+
 def load_price_list(user_email):
     """Load price list from database for user's tenant."""
     from db.price_lists import get_price_list
@@ -37,6 +48,9 @@ def estimate():
 @estimates_bp.route('/process_estimate', methods=['POST'])
 @require_auth
 def process_estimate():
+    from ai_helper import extract_project_data, extract_project_data_from_image, lookup_prices
+    from pricing_engine import tag_detail_lines
+
     try:
         # Simple extraction from form data
         if request.files.get('file') and request.files['file'].filename:
@@ -75,22 +89,22 @@ def process_estimate():
             price_list = {}
 
         line_items = lookup_prices(project_details, price_list)
-        total_cost = line_items.sub_total
-        line_items_dict = line_items.dict()
+        line_items_dict = tag_detail_lines(line_items.dict(), project_details.get('details'))
+        total_cost = line_items_dict['sub_total']
 
         # Save estimate to database
         logging.info(f"Attempting to save estimate for user: {user_email}")
-        logging.debug(f"Customer data: {customer}")
-        logging.debug(f"Project details: {project_details}")
-        logging.debug(f"Line items: {line_items_dict}")
-        logging.debug(f"Total cost: {total_cost}")
+        logging.debug("Customer data: %s", payload(customer))
+        logging.debug("Project details: %s", payload(project_details))
+        logging.debug("Line items: %s", payload(line_items_dict))
+        logging.debug("Total cost: %s", total_cost)
 
         estimate_id = create_estimate(
             user_email=user_email,
             customer=customer,
             project_details=project_details,
             line_items=line_items_dict,
-            total_cost=total_cost
+            total_cost=from_cents(to_cents(total_cost))
         )
 
         if not estimate_id:
@@ -170,7 +184,7 @@ def create_proposal():
     # Handle POST request from estimate_results.html
     if request.method == 'POST':
         logging.info(f"Processing POST request to create_proposal")
-        logging.debug(f"POST data: {request.form}")
+        logging.debug("POST data: %s", payload(request.form.to_dict()))
 
         # Use data from session to maintain consistency
         estimate_result = session.get('estimate_result')
@@ -211,8 +225,7 @@ def create_proposal():
                     logging.warning("AI generated an empty proposal, falling back to template")
                     # Fallback to a simple template if AI fails
                     customer_name = customer.get('name', 'Customer')
-                    total_cost = estimate_result['total_cost']
-                    total_cost_formatted = f"${total_cost:.2f}"
+                    total_cost_formatted = format_money(estimate_result['total_cost'])
 
                     raw_proposal = f"# Project Proposal for {customer_name}\n\n"
                     raw_proposal += f"Total Cost: {total_cost_formatted}\n\n"
@@ -221,13 +234,7 @@ def create_proposal():
 
                     # Format line items as markdown table
                     raw_proposal += "## Line Items\n\n"
-                    raw_proposal += "| Item | Quantity | Unit | Price | Total |\n"
-                    raw_proposal += "|------|----------|------|-------|-------|\n"
-
-                    for item in line_items['lines']:
-                        raw_proposal += f"| {item['name']} | {item['quantity']} | {item['unit']} | ${item['price']:.2f} | ${item['total']:.2f} |\n"
-
-                    raw_proposal += f"\n**Total: ${total_cost:.2f}**"
+                    raw_proposal += _line_items_markdown(line_items)
 
                     # Add contact information
                     raw_proposal += "\n\nContact Details:\n\n"
@@ -241,8 +248,7 @@ def create_proposal():
 
                 # Fallback to simple template
                 customer_name = customer.get('name', 'Customer')
-                total_cost = estimate_result['total_cost']
-                raw_proposal = f"# Project Proposal for {customer_name}\n\nTotal Cost: ${total_cost:.2f}"
+                raw_proposal = f"# Project Proposal for {customer_name}\n\nTotal Cost: {format_money(estimate_result['total_cost'])}"
                 # Store in session for later use
                 session['proposal_content'] = raw_proposal
                 session.modified = True
@@ -317,19 +323,13 @@ def create_proposal():
             total_cost = estimate_result['total_cost']
 
             # Format line items as markdown table
-            line_items_text = "| Item | Quantity | Unit | Price | Total |\n"
-            line_items_text += "|------|----------|------|-------|-------|\n"
-
-            for item in line_items['lines']:
-                line_items_text += f"| {item['name']} | {item['quantity']} | {item['unit']} | ${item['price']:.2f} | ${item['total']:.2f} |\n"
-
-            line_items_text += f"\n**Total: ${total_cost:.2f}**"
+            line_items_text = _line_items_markdown(line_items)
 
             # Use the template from default_template.json
             # First, prepare replacement values
             customer_name = customer.get('name', 'Customer')
             project_scope = project_details.get('notes', 'home improvement project')
-            total_cost_formatted = f"${total_cost:.2f}"
+            total_cost_formatted = format_money(total_cost)
             start_date = "as soon as possible"  # This could be configurable in the future
 
             # Now use the default template and replace placeholders
@@ -392,16 +392,13 @@ def save_proposal():
         user_email = session.get('user_email')
 
         if proposal_id and user_email:
-            from db.proposals import update_proposal
-            success = update_proposal(
-                proposal_id=proposal_id,
-                proposal_content=edited_proposal,
-                user_email=user_email
-            )
-            if success:
-                logging.info(f"Updated proposal {proposal_id} in database")
-            else:
-                logging.warning(f"Failed to update proposal {proposal_id} in database")
+            from db.proposal_revisions import save_proposal_content
+            try:
+                result = save_proposal_content(proposal_id, user_email, edited_proposal)
+                if result['status'] == 'not_found':
+                    logging.warning(f"Failed to update proposal {proposal_id} in database")
+            except Exception as e:
+                logging.warning(f"Failed to update proposal {proposal_id} in database: {e}")
 
         # Create filename
         estimate_result = session.get('estimate_result')
@@ -428,48 +425,78 @@ def save_proposal():
 @estimates_bp.route('/update_estimate_data', methods=['POST'])
 @require_auth
 def update_estimate_data():
+    from pricing_engine import diff_details, reprice_details, changed_fields
+
     try:
         # Get current estimate result from session
         estimate_result = session.get('estimate_result')
         if not estimate_result:
             return {'success': False, 'message': 'No estimate data found in session'}, 400
 
+        # Accepts the estimate form, or JSON with the same fields plus optional item details
+        fields = request.get_json(silent=True) or request.form
+        user_email = session.get('user_email')
+
         # Update customer information
-        customer = estimate_result['customer']
-        customer['name'] = request.form.get('customer_name', customer.get('name', ''))
-        customer['phone'] = request.form.get('customer_phone', customer.get('phone', ''))
-        customer['email'] = request.form.get('customer_email', customer.get('email', ''))
-        customer['address'] = request.form.get('customer_address', customer.get('address', ''))
-        customer['project_address'] = request.form.get('customer_project_address', customer.get('project_address', ''))
+        customer = dict(estimate_result['customer'])
+        customer['name'] = fields.get('customer_name', customer.get('name', ''))
+        customer['phone'] = fields.get('customer_phone', customer.get('phone', ''))
+        customer['email'] = fields.get('customer_email', customer.get('email', ''))
+        customer['address'] = fields.get('customer_address', customer.get('address', ''))
+        customer['project_address'] = fields.get('customer_project_address', customer.get('project_address', ''))
 
         # Update project details
-        project_details = estimate_result['project_details']
-        project_details['notes'] = request.form.get('project_notes', project_details.get('notes', ''))
+        project_details = dict(estimate_result['project_details'])
+        project_details['notes'] = fields.get('project_notes', project_details.get('notes', ''))
+
+        line_items = estimate_result['line_items']
+        total_cost = estimate_result['total_cost']
+        unpriced = []
+        details = fields.get('details')
+        if isinstance(details, str):
+            details = json.loads(details)
+        if details is not None:
+            changes = diff_details(project_details.get('details'), details)
+            if changes['added'] or changes['removed'] or changes['changed']:
+                # Only added items are priced; everything else keeps its line as is
+                line_items, sub_total, unpriced = reprice_details(
+                    line_items, project_details.get('details'), details, user_email,
+                    use_ai=str(fields.get('use_ai', '')).lower() in ('1', 'true', 'yes')
+                )
+                total_cost = float(sub_total)
+            project_details['details'] = details
+
+        # Write only the fields that actually changed
+        updates = changed_fields(estimate_result, customer=customer, project_details=project_details,
+                                 line_items=line_items, total_cost=total_cost)
 
         # Update the estimate result in session
-        estimate_result['customer'] = customer
-        estimate_result['project_details'] = project_details
+        estimate_result.update(updates)
         session['estimate_result'] = estimate_result
         session.modified = True
 
         # Update the estimate in the database
         estimate_id = estimate_result.get('estimate_id')
-        user_email = session.get('user_email')
 
-        if estimate_id and user_email:
+        if estimate_id and user_email and updates:
             success = update_estimate(
                 estimate_id=estimate_id,
                 user_email=user_email,
-                customer=customer,
-                project_details=project_details
+                **updates
             )
 
             if not success:
                 logging.error("Failed to update estimate in database")
                 return jsonify({'success': False, 'message': 'Failed to update estimate in database'}), 500
 
-        logging.info("Estimate data updated successfully")
-        return jsonify({'success': True, 'message': 'Estimate data updated successfully'})
+        logging.info(f"Estimate data updated successfully ({', '.join(updates) or 'no changes'})")
+        return jsonify({
+            'success': True,
+            'message': 'Estimate data updated successfully',
+            'line_items': estimate_result['line_items'],
+            'total_cost': estimate_result['total_cost'],
+            'unpriced': unpriced
+        })
 
     except Exception as e:
         logging.error(f"Error updating estimate data: {str(e)}", exc_info=True)
@@ -478,6 +505,8 @@ def update_estimate_data():
 @estimates_bp.route('/update_line_items', methods=['POST'])
 @require_auth
 def update_line_items():
+    from pricing_engine import reprice_lines, changed_fields
+
     try:
         # Get current estimate result from session
         estimate_result = session.get('estimate_result')
@@ -489,24 +518,26 @@ def update_line_items():
         if not data or 'line_items' not in data:
             return jsonify({'success': False, 'message': 'No line items data provided'}), 400
 
-        # Update the line items in the estimate result
-        estimate_result['line_items'] = data['line_items']
-        estimate_result['total_cost'] = data['line_items']['sub_total']
+        user_email = session.get('user_email')
+
+        # Totals are recomputed server-side; lines sent without a price are looked up in the price list
+        line_items, sub_total, unpriced = reprice_lines(data['line_items'].get('lines', []), user_email)
+        updates = changed_fields(estimate_result, line_items=line_items, total_cost=float(sub_total))
 
         # Update session
+        estimate_result.update(updates)
         session['estimate_result'] = estimate_result
         session.modified = True
 
         # Update the estimate in the database
         estimate_id = estimate_result.get('estimate_id')
-        user_email = session.get('user_email')
 
-        if estimate_id and user_email:
+        if estimate_id and user_email and updates:
             success = update_estimate(
                 estimate_id=estimate_id,
                 user_email=user_email,
-                line_items=data['line_items'],
-                total_cost=data['line_items']['sub_total']
+                line_items=line_items,
+                total_cost=sub_total
             )
 
             if not success:
@@ -517,78 +548,15 @@ def update_line_items():
         return jsonify({
             'success': True, 
             'message': 'Line items updated successfully',
-            'total_cost': data['line_items']['sub_total']
+            'line_items': line_items,
+            'total_cost': float(sub_total),
+            'unpriced': unpriced
         })
 
     except Exception as e:
         logging.error(f"Error updating line items: {str(e)}", exc_info=True)
         return jsonify({'success': False, 'message': str(e)}), 500
 
-@estimates_bp.route('/debug_estimates', methods=['GET'])
-@require_auth
-def debug_estimates():
-    """Debug route to show raw estimates data"""
-    try:
-        user_email = session.get('user_email')
-        if not user_email:
-            return jsonify({'error': 'No user email in session'}), 400
-
-        from db.tenants import get_tenant_id_by_user_email
-        from db.connection import execute_query
-
-        tenant_id = get_tenant_id_by_user_email(user_email)
-        logging.info(f"Debug: User {user_email} has tenant_id: {tenant_id}")
-
-        # Get raw estimates data
-        query = """
-        SELECT estimate_id, tenant_id, customer_data, total_cost, created_at, created_by_email
-        FROM estimates 
-        WHERE tenant_id = %s AND deleted_at IS NULL
-        ORDER BY created_at DESC
-        """
-
-        raw_estimates = execute_query(query, (tenant_id,), fetch=True)
-
-        # Also get all estimates regardless of tenant for debugging
-        all_estimates_query = """
-        SELECT estimate_id, tenant_id, customer_data, total_cost, created_at, created_by_email
-        FROM estimates 
-        WHERE deleted_at IS NULL
-        ORDER BY created_at DESC
-        """
-
-        all_estimates = execute_query(all_estimates_query, fetch=True)
-
-        return jsonify({
-            'user_email': user_email,
-            'tenant_id': str(tenant_id) if tenant_id else None,
-            'estimates_for_tenant': len(raw_estimates),
-            'all_estimates_in_db': len(all_estimates),
-            'tenant_estimates': [
-                {
-                    'estimate_id': str(row['estimate_id']),
-                    'customer_name': json.loads(row['customer_data']).get('name', 'Unknown'),
-                    'total_cost': float(row['total_cost']),
-                    'created_by': row['created_by_email'],
-                    'created_at': row['created_at'].isoformat() if row['created_at'] else None
-                } for row in raw_estimates
-            ],
-            'all_estimates': [
-                {
-                    'estimate_id': str(row['estimate_id']),
-                    'tenant_id': str(row['tenant_id']),
-                    'customer_name': json.loads(row['customer_data']).get('name', 'Unknown'),
-                    'total_cost': float(row['total_cost']),
-                    'created_by': row['created_by_email'],
-                    'created_at': row['created_at'].isoformat() if row['created_at'] else None
-                } for row in all_estimates
-            ]
-        })
-
-    except Exception as e:
-        logging.error(f"Error in debug_estimates: {str(e)}", exc_info=True)
-        return jsonify({'error': str(e)}), 500
-
 @estimates_bp.route('/list_estimates', methods=['GET'])
 @require_auth
 def list_estimates():
@@ -599,19 +567,49 @@ def list_estimates():
             flash('User session expired. Please log in again.', 'error')
             return redirect(url_for('auth.login'))
 
-        from db.estimates import get_estimates_for_tenant
-        estimates = get_estimates_for_tenant(user_email)
+        from db.estimates import get_estimate_summaries
+        estimates, next_cursor = get_estimate_summaries(
+            user_email,
+            limit=request.args.get('limit', 50),
+            cursor=request.args.get('cursor')
+        )
 
         logging.info(f"Found {len(estimates)} estimates for user {user_email}")
 
         return render_template('estimate_list.html', 
                              estimates=estimates, 
+                             next_cursor=next_cursor,
+                             is_first_page=not request.args.get('cursor'),
                              authenticated=True)
     except Exception as e:
         logging.error(f"Error listing estimates: {str(e)}", exc_info=True)
         flash(f'Error listing estimates: {str(e)}', 'error')
         return redirect(url_for('estimates.estimate'))
 
+@estimates_bp.route('/api/estimates', methods=['GET'])
+@require_auth
+def list_estimates_api():
+    """Return a page of estimate summaries for the current user's tenant"""
+    try:
+        user_email = session.get('user_email')
+        if not user_email:
+            return jsonify({'error': 'User not authenticated'}), 401
+
+        from db.estimates import get_estimate_summaries
+        estimates, next_cursor = get_estimate_summaries(
+            user_email,
+            limit=request.args.get('limit', 50),
+            cursor=request.args.get('cursor')
+        )
+
+        for estimate in estimates:
+            estimate['created_at'] = estimate['created_at'].isoformat() if estimate['created_at'] else None
+
+        return jsonify({'estimates': estimates, 'next_cursor': next_cursor})
+    except Exception as e:
+        logging.error(f"Error listing estimates: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
 @estimates_bp.route('/save_to_drive', methods=['POST'])
 @require_auth
 def save_to_drive():
@@ -632,34 +630,88 @@ def save_to_drive():
         customer_name = customer.get('name', 'Unknown')
         project_address = customer.get('project_address', 'Unknown')
 
-        # Create folder structure in Google Drive using tenant settings
+        # Queue the export so folder resolution and Drive retries happen off the web worker
         from db.tenants import get_tenant_id_by_user_email
-        from google_services import get_or_create_project_folder
+        from drive_export import get_drive_export_queue
         
         user_email = session.get('user_email')
         tenant_id = get_tenant_id_by_user_email(user_email) if user_email else None
-        
-        project_folder_id = get_or_create_project_folder(tenant_id, customer, estimate_result)
-        if not project_folder_id:
-            flash('Failed to create or access Google Drive folder.', 'error')
-            return redirect(url_for('estimates.create_proposal'))
 
-        # Create document with proposal content
         doc_title = f"Proposal - {customer_name} - {project_address}"
-        doc_info = create_doc_in_folder(doc_title, proposal_content, project_folder_id)
+        job_id = get_drive_export_queue().enqueue(
+            user_email=user_email,
+            tenant_id=tenant_id,
+            credentials_info=session['credentials'],
+            title=doc_title,
+            payload={
+                'title': doc_title,
+                'content': proposal_content,
+                'customer_data': customer,
+                'project_data': estimate_result.get('project_details')
+            }
+        )
 
-        if not doc_info:
-            flash('Failed to create Google Doc.', 'error')
-            return redirect(url_for('estimates.create_proposal'))
+        if not job_id:
+            return _drive_export_error('Failed to queue the Google Drive export.')
+
+        session['drive_export_job_id'] = job_id
+        session.modified = True
 
-        flash('Proposal saved to Google Drive successfully!', 'success')
+        if _wants_json():
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status_url': url_for('estimates.drive_export_status', job_id=job_id)
+            }), 202
 
+        flash('Proposal is being saved to Google Drive. It will appear in your Drive folder shortly.', 'info')
         return redirect(url_for('estimates.create_proposal'))
 
     except Exception as e:
         logging.error(f"Error saving to Google Drive: {str(e)}", exc_info=True)
-        flash(f'Error saving to Google Drive: {str(e)}', 'error')
-        return redirect(url_for('estimates.create_proposal'))
+        return _drive_export_error(f'Error saving to Google Drive: {str(e)}')
+
+def _wants_json():
+    """Check whether the client asked for a JSON response rather than a page."""
+    return request.accept_mimetypes.best == 'application/json'
+
+def _drive_export_error(message):
+    if _wants_json():
+        return jsonify({'success': False, 'error': message}), 500
+    flash(message, 'error')
+    return redirect(url_for('estimates.create_proposal'))
+
+@estimates_bp.route('/drive_export_status/<job_id>', methods=['GET'])
+@require_auth
+def drive_export_status(job_id):
+    """Report the status of a queued "save to Drive" job
+
+    Jobs whose worker went away (restart, or an idle instance being stopped)
+    are reported as failed once they have gone unchanged for the queue's
+    stale_after period.
+    """
+    from drive_export import get_drive_export_queue
+    from db.drive_exports import get_export_job, FINAL_STATUSES
+
+    get_drive_export_queue().fail_stale_jobs()
+    job = get_export_job(job_id, session.get('user_email'))
+    if not job:
+        return jsonify({'success': False, 'error': 'Export job not found'}), 404
+
+    return jsonify({
+        'success': True,
+        'job_id': str(job['job_id']),
+        'job_type': job['job_type'],
+        'title': job['title'],
+        'status': job['status'],
+        'done': job['status'] in FINAL_STATUSES,
+        'attempts': job['attempts'],
+        'result': job['result'],
+        'error': job['error'],
+        'next_attempt_at': job['next_attempt_at'].isoformat() if job['next_attempt_at'] else None,
+        'created_at': job['created_at'].isoformat() if job['created_at'] else None,
+        'updated_at': job['updated_at'].isoformat() if job['updated_at'] else None
+    })
 
 @estimates_bp.route('/update_proposal', methods=['POST'])
 @require_auth
@@ -679,18 +731,18 @@ def update_proposal():
         user_email = session.get('user_email')
 
         if proposal_id and user_email:
-            from db.proposals import update_proposal as db_update_proposal
-            success = db_update_proposal(
-                proposal_id=proposal_id,
-                proposal_content=proposal_content,
-                user_email=user_email
-            )
-            if success:
-                logging.info(f"Updated proposal {proposal_id} in database")
-                return jsonify({'success': True, 'message': 'Proposal updated successfully'})
-            else:
+            # Only the diff from the stored head is written to the revision history
+            from db.proposal_revisions import save_proposal_content
+            result = save_proposal_content(proposal_id, user_email, proposal_content)
+            if result['status'] == 'not_found':
                 logging.warning(f"Failed to update proposal {proposal_id} in database")
                 return jsonify({'success': False, 'error': 'Failed to update proposal in database'}), 500
+            return jsonify({
+                'success': True,
+                'message': 'Proposal updated successfully',
+                'proposal_id': proposal_id,
+                'revision': result['revision']
+            })
         else:
             # If no proposal ID, create a new proposal
             estimate_result = session.get('estimate_result')
@@ -708,7 +760,12 @@ def update_proposal():
                         session['proposal_id'] = proposal_id
                         session.modified = True
                         logging.info(f"Created new proposal with ID: {proposal_id}")
-                        return jsonify({'success': True, 'message': 'Proposal created successfully'})
+                        return jsonify({
+                            'success': True,
+                            'message': 'Proposal created successfully',
+                            'proposal_id': proposal_id,
+                            'revision': 0
+                        })
                     else:
                         return jsonify({'success': False, 'error': 'Failed to create proposal'}), 500
 
@@ -716,4 +773,48 @@ def update_proposal():
 
     except Exception as e:
         logging.error(f"Error updating proposal: {str(e)}", exc_info=True)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@estimates_bp.route('/update_proposal/patch', methods=['POST'])
+@require_auth
+def patch_proposal():
+    """Apply an autosave diff: {proposal_id, base_revision, ops: [{start, end, text}], length}"""
+    from db.proposal_revisions import save_proposal_patch, apply_ops, PatchError
+
+    try:
+        data = request.get_json(silent=True) or {}
+        proposal_id = data.get('proposal_id') or session.get('proposal_id')
+        user_email = session.get('user_email')
+        if not proposal_id or not user_email:
+            return jsonify({'success': False, 'error': 'Missing proposal or user information'}), 400
+
+        try:
+            proposal_id = str(uuid.UUID(str(proposal_id)))
+            base_revision = int(data.get('base_revision'))
+            expected_length = int(data['length']) if data.get('length') is not None else None
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'Invalid patch'}), 400
+
+        ops = data.get('ops') or []
+        result = save_proposal_patch(proposal_id, user_email, base_revision, ops, expected_length)
+
+        if result['status'] == 'not_found':
+            return jsonify({'success': False, 'error': 'Proposal not found'}), 404
+        if result['status'] == 'conflict':
+            # The client is out of step with the stored head; it resends its full content
+            return jsonify({'success': False, 'conflict': True, 'revision': result['revision']}), 409
+
+        if result['status'] == 'saved' and proposal_id == session.get('proposal_id') and session.get('proposal_content'):
+            try:
+                session['proposal_content'] = apply_ops(session['proposal_content'], ops)
+            except PatchError:
+                session.pop('proposal_content', None)
+            session.modified = True
+
+        return jsonify({'success': True, 'proposal_id': proposal_id, 'revision': result['revision']})
+
+    except PatchError as e:
+        return jsonify({'success': False, 'conflict': True, 'error': str(e)}), 409
+    except Exception as e:
+        logging.error(f"Error patching proposal: {str(e)}", exc_info=True)
         return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
@@ -1,14 +1,15 @@
 
 import os
 import json
+import uuid
 import logging
-from flask import Blueprint, request, redirect, url_for, flash, session, render_template, jsonify
+from flask import Blueprint, request, redirect, url_for, flash, session, render_template, jsonify, Response, stream_with_context
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import TextAreaField, SubmitField
-from ai_helper import generate_price_list, generate_price_list_from_image
 from blueprints.auth import require_auth
-from db.price_lists import get_price_list, save_price_list
+from db.price_lists import (save_price_list, upsert_price_item, delete_price_item,
+                            get_tenant_id_for_user, search_price_items)
 
 pricing_bp = Blueprint('pricing', __name__)
 
@@ -19,19 +20,62 @@ class PriceListForm(FlaskForm):
     ])
     submit = SubmitField('Generate Price List')
 
+class PriceImportForm(FlaskForm):
+    file = FileField('Supplier Catalog', validators=[
+        FileAllowed(['csv', 'xlsx', 'json'], 'Only CSV, XLSX, and JSON files allowed!')
+    ])
+    submit = SubmitField('Preview Import')
+
 @pricing_bp.route('/price-list', methods=['GET'])
 @require_auth
 def price_list():
     form = PriceListForm()
-    # Get user's email from session
+    import_form = PriceImportForm()
+    # Items are loaded page by page from pricing.price_items_api
+    return render_template('price_list.html', form=form, import_form=import_form, authenticated=True)
+
+@pricing_bp.route('/api/price-items', methods=['GET'])
+@require_auth
+def price_items_api():
+    """Search, sort and page through the tenant's price list"""
+    from db.pagination import clamp_page_size
+
     user_email = session.get('user_email')
-    # Load price list from database for this tenant
-    prices = get_price_list(user_email)
-    return render_template('price_list.html', prices=prices, form=form, authenticated=True)
+    limit = clamp_page_size(request.args.get('limit'))
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+    except ValueError:
+        page = 1
+
+    items, total = search_price_items(
+        user_email,
+        query=request.args.get('q', '').strip(),
+        sort=request.args.get('sort'),
+        descending=request.args.get('dir') == 'desc',
+        limit=limit,
+        offset=(page - 1) * limit
+    )
+
+    return jsonify({
+        'items': [{
+            'name': item['name'],
+            'unit': item['unit'],
+            'price': float(item['price'])
+        } for item in items],
+        'total': total,
+        'page': page,
+        'limit': limit
+    })
+
+def _price_list_dict(items):
+    """Convert extracted Items into the {name: {unit, price}} price list format"""
+    return {item.item: {"unit": item.unit, "price": item.price} for item in items.prices}
 
 @pricing_bp.route('/generate-price-list', methods=['POST'])
 @require_auth
 def generate_price_list_route():
+    from ai_helper import generate_price_list_chunked
+
     try:
         # Get user's email from session
         user_email = session.get('user_email')
@@ -46,25 +90,20 @@ def generate_price_list_route():
             temp_path = f"temp_{file.filename}"
             file.save(temp_path)
             try:
-                items = generate_price_list_from_image(temp_path)
+                items = generate_price_list_chunked(file_path=temp_path)
             finally:
                 if os.path.exists(temp_path):
                     os.remove(temp_path)
         elif request.form.get('price_description'):
             # Handle text input
             price_description = request.form.get('price_description')
-            items = generate_price_list(price_description)
+            items = generate_price_list_chunked(description=price_description)
         else:
             flash('Please provide either a file or price description.', 'error')
             return redirect(url_for('pricing.price_list'))
 
         # Convert AI response to dictionary format for database storage
-        price_list_dict = {}
-        for item in items.prices:
-            price_list_dict[item.item] = {
-                "unit": item.unit,
-                "price": item.price
-            }
+        price_list_dict = _price_list_dict(items)
 
         # Save to database
         if save_price_list(user_email, price_list_dict):
@@ -79,6 +118,56 @@ def generate_price_list_route():
         flash(f'Error generating price list: {str(e)}', 'error')
         return redirect(url_for('pricing.price_list'))
 
+@pricing_bp.route('/generate-price-list/stream', methods=['POST'])
+@require_auth
+def generate_price_list_stream():
+    """Generate a price list, streaming one JSON line per extracted chunk
+
+    Each line is a progress event ({"type": "progress", "done", "total", "items"});
+    the last line is {"type": "done", ...} or {"type": "error", "message"}.
+    """
+    from werkzeug.utils import secure_filename
+    from ai_helper import iter_price_list_extraction
+
+    user_email = session.get('user_email')
+    upload = request.files.get('file')
+    description = request.form.get('price_description')
+    temp_path = None
+
+    if upload and upload.filename:
+        temp_path = f"temp_{uuid.uuid4().hex}_{secure_filename(upload.filename)}"
+        upload.save(temp_path)
+        source = {'file_path': temp_path}
+    elif description:
+        source = {'description': description}
+    else:
+        return jsonify({'error': 'Please provide either a file or price description.'}), 400
+
+    def event(payload):
+        return json.dumps(payload) + '\n'
+
+    def generate():
+        try:
+            for update in iter_price_list_extraction(**source):
+                if update['type'] == 'progress':
+                    yield event(update)
+                    continue
+
+                price_list_dict = _price_list_dict(update['price_list'])
+                # The response has started, so report the outcome in the stream rather than flashing it
+                saved = save_price_list(user_email, price_list_dict)
+                yield event({'type': 'done', 'items': len(price_list_dict), 'saved': saved,
+                             'redirect': url_for('pricing.price_list')})
+        except Exception as e:
+            logging.error(f"Error generating price list: {str(e)}", exc_info=True)
+            yield event({'type': 'error', 'message': f'Error generating price list: {str(e)}'})
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @pricing_bp.route('/delete-price', methods=['POST'])
 @require_auth
 def delete_price():
@@ -89,18 +178,8 @@ def delete_price():
         flash('Item name is required', 'error')
         return redirect(url_for('pricing.price_list'))
     
-    # Get current price list
-    price_list = get_price_list(user_email)
-    
-    if item_name in price_list:
-        del price_list[item_name]
-        # Save updated price list
-        save_result = save_price_list(user_email, price_list)
-        
-        if save_result:
-            flash('Price deleted successfully', 'success')
-        else:
-            flash('Error saving updated price list', 'error')
+    if delete_price_item(user_email, item_name):
+        flash('Price deleted successfully', 'success')
     else:
         flash('Item not found', 'error')
     
@@ -124,12 +203,8 @@ def add_price():
         flash('Price must be a number', 'error')
         return redirect(url_for('pricing.price_list'))
     
-    # Get current price list
-    price_list = get_price_list(user_email)
-    price_list[item] = {"unit": unit, "price": price}
-    
-    # Save updated price list
-    save_result = save_price_list(user_email, price_list)
+    # Save just this item
+    save_result = upsert_price_item(user_email, item, unit, price)
     
     if save_result:
         flash('Price added successfully', 'success')
@@ -157,18 +232,8 @@ def update_price():
         flash('Price must be a number', 'error')
         return redirect(url_for('pricing.price_list'))
     
-    # Get current price list
-    price_list = get_price_list(user_email)
-    
-    # If item name was changed, remove the old item
-    if old_item and old_item != item and old_item in price_list:
-        del price_list[old_item]
-    
-    # Add or update the item
-    price_list[item] = {"unit": unit, "price": price}
-    
-    # Save updated price list
-    save_result = save_price_list(user_email, price_list)
+    # Save just this item, removing the old one if it was renamed
+    save_result = upsert_price_item(user_email, item, unit, price, old_name=old_item)
     
     if save_result:
         flash('Price updated successfully', 'success')
@@ -176,3 +241,66 @@ def update_price():
         flash('Error saving updated price list', 'error')
         
     return redirect(url_for('pricing.price_list'))
+
+@pricing_bp.route('/import-price-list', methods=['POST'])
+@require_auth
+def import_price_list():
+    """Stage an uploaded supplier catalog and show what committing it would change"""
+    from price_import import stage_price_import, PriceImportError
+    from db.price_imports import get_import_diff
+
+    user_email = session.get('user_email')
+    form = PriceImportForm()
+    if not form.validate_on_submit() or not form.file.data:
+        flash('Please choose a CSV, XLSX, or JSON file to import.', 'error')
+        return redirect(url_for('pricing.price_list'))
+
+    tenant_id = get_tenant_id_for_user(user_email)
+    if not tenant_id:
+        flash('Unable to determine your organization.', 'error')
+        return redirect(url_for('pricing.price_list'))
+
+    upload = form.file.data
+    try:
+        staged = stage_price_import(user_email, tenant_id, upload.stream, upload.filename)
+    except PriceImportError as e:
+        flash(f'Could not import price list: {str(e)}', 'error')
+        return redirect(url_for('pricing.price_list'))
+    except Exception as e:
+        logging.error(f"Error importing price list: {str(e)}", exc_info=True)
+        flash(f'Error importing price list: {str(e)}', 'error')
+        return redirect(url_for('pricing.price_list'))
+
+    if not staged['import_id']:
+        flash(f"No valid price rows found in {upload.filename}.", 'error')
+        return redirect(url_for('pricing.price_list'))
+
+    diff = get_import_diff(staged['import_id'], user_email)
+    if diff is None:
+        flash('Error comparing the import with your current price list.', 'error')
+        return redirect(url_for('pricing.price_list'))
+
+    return render_template('price_import_preview.html', filename=upload.filename,
+                           staged=staged, diff=diff, authenticated=True)
+
+@pricing_bp.route('/import-price-list/<import_id>/commit', methods=['POST'])
+@require_auth
+def commit_price_import_route(import_id):
+    from db.price_imports import commit_price_import
+
+    user_email = session.get('user_email')
+    merged = commit_price_import(import_id, user_email)
+    if merged is None:
+        flash('Error saving the imported prices.', 'error')
+    else:
+        flash(f'Price list import saved: {merged} items added or updated.', 'success')
+    return redirect(url_for('pricing.price_list'))
+
+@pricing_bp.route('/import-price-list/<import_id>/cancel', methods=['POST'])
+@require_auth
+def cancel_price_import(import_id):
+    from db.price_imports import discard_price_import
+
+    discard_price_import(import_id, session.get('user_email'))
+    flash('Price list import cancelled.', 'info')
+    return redirect(url_for('pricing.price_list'))
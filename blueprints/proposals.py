@@ -1,5 +1,7 @@
 
+import uuid
 import logging
+from datetime import date
 from flask import Blueprint, request, redirect, url_for, flash, session, render_template, jsonify
 from template_manager import load_templates, add_template, delete_template
 from blueprints.auth import require_auth
@@ -69,3 +71,234 @@ def get_templates_api():
     except Exception as e:
         logger.error(f"Error retrieving templates: {e}")
         return jsonify({'error': str(e)}), 500
+
+# Proposals exported to Drive by one bulk job; larger exports are split into several jobs
+MAX_BULK_EXPORT = 500
+
+def _serialize_proposal(proposal):
+    serialized = dict(proposal)
+    for key in ('proposal_id', 'estimate_id'):
+        if serialized.get(key) is not None:
+            serialized[key] = str(serialized[key])
+    for key in ('created_at', 'updated_at'):
+        if serialized.get(key) is not None:
+            serialized[key] = serialized[key].isoformat()
+    return serialized
+
+def _date_range(args):
+    """Parse created_from/created_to (YYYY-MM-DD) from request args or JSON; raises ValueError"""
+    created_from = args.get('created_from') or None
+    created_to = args.get('created_to') or None
+    return (date.fromisoformat(created_from) if created_from else None,
+            date.fromisoformat(created_to) if created_to else None)
+
+@proposals_bp.route('/proposals', methods=['GET'])
+@require_auth
+def list_proposals():
+    """List the tenant's proposals, with filters and bulk export to Drive"""
+    from db.proposals import list_proposal_summaries
+    
+    email = session.get('user_email')
+    try:
+        created_from, created_to = _date_range(request.args)
+    except ValueError:
+        flash('Dates must be in YYYY-MM-DD format.', 'error')
+        created_from = created_to = None
+    
+    status = request.args.get('status') or None
+    proposals, next_cursor = list_proposal_summaries(
+        email,
+        limit=request.args.get('limit', 50),
+        cursor=request.args.get('cursor'),
+        status=status,
+        created_from=created_from,
+        created_to=created_to
+    )
+    
+    filters = {
+        'status': status or '',
+        'created_from': created_from.isoformat() if created_from else '',
+        'created_to': created_to.isoformat() if created_to else ''
+    }
+    return render_template('proposals.html',
+                           proposals=proposals,
+                           next_cursor=next_cursor,
+                           is_first_page=not request.args.get('cursor'),
+                           filters=filters,
+                           max_bulk_export=MAX_BULK_EXPORT,
+                           authenticated=True)
+
+@proposals_bp.route('/api/proposals', methods=['GET'])
+@require_auth
+def list_proposals_api():
+    """Return a page of proposals (without content) for the current tenant"""
+    try:
+        email = session.get('user_email')
+        if not email:
+            return jsonify({'error': 'User not authenticated'}), 401
+        
+        estimate_id = request.args.get('estimate_id')
+        if estimate_id:
+            try:
+                estimate_id = str(uuid.UUID(estimate_id))
+            except ValueError:
+                return jsonify({'error': 'Invalid estimate ID'}), 400
+        
+        try:
+            created_from, created_to = _date_range(request.args)
+        except ValueError:
+            return jsonify({'error': 'created_from and created_to must be YYYY-MM-DD dates'}), 400
+        
+        from db.proposals import list_proposal_summaries
+        proposals, next_cursor = list_proposal_summaries(
+            email,
+            limit=request.args.get('limit', 50),
+            cursor=request.args.get('cursor'),
+            status=request.args.get('status'),
+            estimate_id=estimate_id,
+            created_from=created_from,
+            created_to=created_to
+        )
+        return jsonify({
+            'proposals': [_serialize_proposal(p) for p in proposals],
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        logger.error(f"Error listing proposals: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@proposals_bp.route('/api/proposals/<proposal_id>', methods=['GET'])
+@require_auth
+def get_proposal_api(proposal_id):
+    """Return a single proposal including its content"""
+    try:
+        email = session.get('user_email')
+        if not email:
+            return jsonify({'error': 'User not authenticated'}), 401
+        
+        try:
+            proposal_id = str(uuid.UUID(proposal_id))
+        except ValueError:
+            return jsonify({'error': 'Invalid proposal ID'}), 400
+        
+        from db.proposals import get_proposal
+        proposal = get_proposal(proposal_id, email)
+        if not proposal:
+            return jsonify({'error': 'Proposal not found'}), 404
+        
+        return jsonify({'proposal': _serialize_proposal(proposal)})
+    except Exception as e:
+        logger.error(f"Error retrieving proposal {proposal_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@proposals_bp.route('/api/proposals/<proposal_id>/revisions', methods=['GET'])
+@require_auth
+def list_proposal_revisions_api(proposal_id):
+    """Return a proposal's edit history, newest first"""
+    try:
+        email = session.get('user_email')
+        if not email:
+            return jsonify({'error': 'User not authenticated'}), 401
+
+        try:
+            proposal_id = str(uuid.UUID(proposal_id))
+            limit = max(1, min(int(request.args.get('limit', 50)), 200))
+        except ValueError:
+            return jsonify({'error': 'Invalid request'}), 400
+
+        from db.proposal_revisions import list_proposal_revisions
+        revisions = list_proposal_revisions(proposal_id, email, limit=limit)
+        return jsonify({'revisions': [_serialize_proposal(r) for r in revisions]})
+    except Exception as e:
+        logger.error(f"Error listing revisions of proposal {proposal_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@proposals_bp.route('/api/proposals/<proposal_id>/revisions/<int:revision>', methods=['GET'])
+@require_auth
+def get_proposal_revision_api(proposal_id, revision):
+    """Return a proposal's content as it was at a stored revision"""
+    try:
+        email = session.get('user_email')
+        if not email:
+            return jsonify({'error': 'User not authenticated'}), 401
+
+        try:
+            proposal_id = str(uuid.UUID(proposal_id))
+        except ValueError:
+            return jsonify({'error': 'Invalid proposal ID'}), 400
+
+        from db.proposal_revisions import get_proposal_revision
+        content = get_proposal_revision(proposal_id, email, revision)
+        if content is None:
+            return jsonify({'error': 'Revision not found'}), 404
+
+        return jsonify({'proposal_id': proposal_id, 'revision': revision, 'proposal_content': content})
+    except Exception as e:
+        logger.error(f"Error retrieving revision {revision} of proposal {proposal_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@proposals_bp.route('/proposals/export-to-drive', methods=['POST'])
+@require_auth
+def export_proposals_to_drive():
+    """Queue a bulk export of stored proposals to Google Drive
+    
+    Accepts either proposal_ids, or all=true with optional status and
+    created_from/created_to (inclusive YYYY-MM-DD dates). Exports larger than
+    MAX_BULK_EXPORT proposals are queued as several jobs.
+    """
+    try:
+        email = session.get('user_email')
+        if not email:
+            return jsonify({'error': 'User not authenticated'}), 401
+        
+        data = request.get_json(silent=True) or {}
+        if data.get('all'):
+            try:
+                created_from, created_to = _date_range(data)
+            except ValueError:
+                return jsonify({'error': 'created_from and created_to must be YYYY-MM-DD dates'}), 400
+            from db.proposals import list_proposal_ids
+            proposal_ids = list_proposal_ids(email, status=data.get('status') or None,
+                                             created_from=created_from, created_to=created_to)
+        else:
+            proposal_ids = data.get('proposal_ids') or request.form.getlist('proposal_ids')
+        
+        # Normalise and de-duplicate the IDs, rejecting anything that isn't a UUID
+        try:
+            proposal_ids = list(dict.fromkeys(str(uuid.UUID(str(pid))) for pid in proposal_ids))
+        except ValueError:
+            return jsonify({'error': 'Invalid proposal ID'}), 400
+        
+        if not proposal_ids:
+            return jsonify({'error': 'No proposals selected'}), 400
+        
+        from db.tenants import get_tenant_id_by_user_email
+        from drive_export import get_drive_export_queue
+        
+        tenant_id = get_tenant_id_by_user_email(email)
+        batches = [proposal_ids[i:i + MAX_BULK_EXPORT] for i in range(0, len(proposal_ids), MAX_BULK_EXPORT)]
+        jobs = []
+        for number, batch in enumerate(batches, start=1):
+            title = f"Bulk export of {len(batch)} proposals"
+            if len(batches) > 1:
+                title += f" (part {number} of {len(batches)})"
+            job_id = get_drive_export_queue().enqueue(
+                user_email=email,
+                tenant_id=tenant_id,
+                credentials_info=session['credentials'],
+                title=title,
+                payload={'proposal_ids': batch},
+                job_type='bulk_proposals'
+            )
+            if not job_id:
+                return jsonify({'error': 'Failed to queue the Google Drive export', 'jobs': jobs}), 500
+            jobs.append({
+                'job_id': job_id,
+                'proposal_count': len(batch),
+                'status_url': url_for('estimates.drive_export_status', job_id=job_id)
+            })
+        
+        return jsonify({'proposal_count': len(proposal_ids), 'jobs': jobs}), 202
+    except Exception as e:
+        logger.error(f"Error queuing bulk Drive export: {e}")
+        return jsonify({'error': str(e)}), 500
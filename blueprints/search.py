@@ -0,0 +1,85 @@
+import logging
+from flask import Blueprint, request, session, render_template, jsonify, flash
+from markupsafe import Markup, escape
+from blueprints.auth import require_auth
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+search_bp = Blueprint('search', __name__)
+
+def _highlight(snippet):
+    """Escape a search snippet and turn its match markers into <mark> tags."""
+    from db.search import HIGHLIGHT_START, HIGHLIGHT_END
+
+    text = str(escape(snippet or ''))
+    return Markup(text.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
+
+def _search_args():
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    kind = request.args.get('kind', 'all')
+    return request.args.get('q', '').strip(), kind, page, request.args.get('page_size', 20)
+
+@search_bp.route('/search', methods=['GET'])
+@require_auth
+def search_page():
+    """Search estimates and proposals"""
+    from db.search import search, SEARCH_KINDS
+    from db.pagination import clamp_page_size
+
+    query, kind, page, page_size = _search_args()
+    if kind not in SEARCH_KINDS:
+        kind = 'all'
+    page_size = clamp_page_size(page_size, default=20)
+
+    results, total = [], 0
+    if query:
+        try:
+            results, total = search(session.get('user_email'), query, kind, page, page_size)
+            for result in results:
+                result['snippet'] = _highlight(result['snippet'])
+        except Exception as e:
+            logger.error(f"Error searching: {e}")
+            flash('An error occurred while searching.', 'error')
+
+    return render_template('search.html',
+                           query=query,
+                           kind=kind,
+                           kinds=SEARCH_KINDS,
+                           results=results,
+                           total=total,
+                           page=page,
+                           has_next=page * page_size < total,
+                           authenticated=True)
+
+@search_bp.route('/api/search', methods=['GET'])
+@require_auth
+def search_api():
+    """Return a page of ranked search results with highlighted snippets"""
+    from db.search import search, SEARCH_KINDS
+
+    try:
+        email = session.get('user_email')
+        if not email:
+            return jsonify({'error': 'User not authenticated'}), 401
+
+        query, kind, page, page_size = _search_args()
+        if not query:
+            return jsonify({'error': 'Query parameter q is required'}), 400
+        if kind not in SEARCH_KINDS:
+            return jsonify({'error': f"kind must be one of: {', '.join(SEARCH_KINDS)}"}), 400
+
+        results, total = search(email, query, kind, page, page_size)
+        for result in results:
+            result['snippet'] = str(_highlight(result['snippet']))
+            result['created_at'] = result['created_at'].isoformat() if result['created_at'] else None
+            result['total_cost'] = float(result['total_cost']) if result['total_cost'] is not None else None
+            result['rank'] = float(result['rank'])
+
+        return jsonify({'results': results, 'total': total, 'page': page})
+    except Exception as e:
+        logger.error(f"Error searching: {e}")
+        return jsonify({'error': str(e)}), 500
@@ -38,12 +38,30 @@ class BaseConfig:
         'openid'
     ]
     
+    # Bearer token Prometheus scrapers use for /admin/metrics (unset: admins only)
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+    
     # File path settings
     PRICE_LIST_FILE = "price_list.json"
     TEMPLATES_FILE = "default_template.json"
     
     # Debug mode
     DEBUG = True
+    
+    # Logging: root level, per-module overrides, and limits on logged payloads
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "DEBUG")
+    LOG_LEVELS = {
+        'urllib3': 'INFO',
+        'googleapiclient.discovery_cache': 'ERROR',
+        'werkzeug': 'INFO'
+    }
+    LOG_PAYLOAD_MAX_CHARS = int(os.environ.get("LOG_PAYLOAD_MAX_CHARS", 2000))
+    LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", 1.0))
+    # 'text' for readable lines, 'json' for one structured object per line
+    LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+    
+    # Apply pending database migrations when the app starts (run `flask db-migrate` otherwise)
+    AUTO_MIGRATE = os.environ.get("AUTO_MIGRATE", "true").lower() == "true"
 
 class DevelopmentConfig(BaseConfig):
     """Development configuration settings."""
@@ -52,6 +70,13 @@ class DevelopmentConfig(BaseConfig):
 class ProductionConfig(BaseConfig):
     """Production configuration settings."""
     DEBUG = False
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+    LOG_PAYLOAD_MAX_CHARS = int(os.environ.get("LOG_PAYLOAD_MAX_CHARS", 500))
+    LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", 0.01))
+    LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+    # The deployment runs `flask db-migrate` once before starting gunicorn (see .replit),
+    # not in every worker
+    AUTO_MIGRATE = os.environ.get("AUTO_MIGRATE", "false").lower() == "true"
     # In production, always use environment variables for secrets
     SECRET_KEY = os.environ.get("SESSION_SECRET")
     
@@ -0,0 +1,255 @@
+import logging
+import psycopg2.extras
+from db.connection import execute_query, get_db_connection
+from db.tenants import get_tenant_id_by_user_email
+
+logger = logging.getLogger(__name__)
+
+# Periods the summaries can be rolled up by (date_trunc fields)
+PERIODS = ('day', 'week', 'month', 'quarter', 'year')
+
+# Orderings for the top items report
+TOP_ITEM_SORTS = {
+    'value': 'total_value',
+    'count': 'line_count',
+    'quantity': 'quantity'
+}
+
+# Rows committed slightly after a refresh started can carry an earlier updated_at;
+# each refresh rescans this far behind the watermark to pick them up
+REFRESH_OVERLAP = '5 minutes'
+
+# Summaries refreshed more recently than this are served as they are
+MIN_REFRESH_INTERVAL = '30 seconds'
+
+# A day in UTC, as a half-open timestamptz range usable with the created_at indexes
+_DAY_START = "(d.day::timestamp AT TIME ZONE 'UTC')"
+_DAY_END = "((d.day + 1)::timestamp AT TIME ZONE 'UTC')"
+
+# Days whose summaries are affected by rows changed since %(since)s
+_COLLECT_TOUCHED_DAYS = """
+INSERT INTO analytics_refresh_days (day)
+SELECT (e.created_at AT TIME ZONE 'UTC')::date
+FROM estimates e
+WHERE e.tenant_id = %(tenant_id)s AND e.updated_at > %(since)s
+UNION
+SELECT (p.created_at AT TIME ZONE 'UTC')::date
+FROM proposals p
+WHERE p.tenant_id = %(tenant_id)s AND p.updated_at > %(since)s
+UNION
+-- A proposal changing converts (or un-converts) the estimate it belongs to
+SELECT (e.created_at AT TIME ZONE 'UTC')::date
+FROM proposals p
+JOIN estimates e ON e.estimate_id = p.estimate_id
+WHERE p.tenant_id = %(tenant_id)s AND p.updated_at > %(since)s
+UNION
+-- Proposal values come from their estimate's total, so an estimate edit
+-- (or deletion) changes the days its proposals were created on
+SELECT (p.created_at AT TIME ZONE 'UTC')::date
+FROM estimates e
+JOIN proposals p ON p.estimate_id = e.estimate_id
+WHERE e.tenant_id = %(tenant_id)s AND e.updated_at > %(since)s;
+"""
+
+_REFRESH_ESTIMATE_SUMMARY = f"""
+INSERT INTO estimate_daily_summary (tenant_id, day, estimate_count, total_value, converted_count)
+SELECT e.tenant_id, d.day, count(*), sum(e.total_cost),
+       count(*) FILTER (WHERE EXISTS (
+         SELECT 1 FROM proposals p WHERE p.estimate_id = e.estimate_id AND p.deleted_at IS NULL
+       ))
+FROM analytics_refresh_days d
+JOIN estimates e ON e.created_at >= {_DAY_START} AND e.created_at < {_DAY_END}
+WHERE e.tenant_id = %(tenant_id)s AND e.deleted_at IS NULL
+GROUP BY e.tenant_id, d.day;
+"""
+
+_REFRESH_PROPOSAL_SUMMARY = f"""
+INSERT INTO proposal_daily_summary (tenant_id, day, status, proposal_count, total_value)
+SELECT p.tenant_id, d.day, p.status, count(*), COALESCE(sum(e.total_cost), 0)
+FROM analytics_refresh_days d
+JOIN proposals p ON p.created_at >= {_DAY_START} AND p.created_at < {_DAY_END}
+LEFT JOIN estimates e ON e.estimate_id = p.estimate_id AND e.deleted_at IS NULL
+WHERE p.tenant_id = %(tenant_id)s AND p.deleted_at IS NULL
+GROUP BY p.tenant_id, d.day, p.status;
+"""
+
+# Line items are expanded in SQL; non-numeric JSON values count as zero
+_REFRESH_ITEM_SUMMARY = f"""
+INSERT INTO item_daily_summary (tenant_id, day, item_name, line_count, quantity, total_value)
+SELECT e.tenant_id, d.day,
+       lower(regexp_replace(btrim(line->>'name'), '[[:space:]]+', ' ', 'g')) AS item_name,
+       count(*),
+       sum(CASE WHEN jsonb_typeof(line->'quantity') = 'number' THEN (line->>'quantity')::numeric ELSE 0 END),
+       sum(CASE WHEN jsonb_typeof(line->'total') = 'number' THEN (line->>'total')::numeric ELSE 0 END)
+FROM analytics_refresh_days d
+JOIN estimates e ON e.created_at >= {_DAY_START} AND e.created_at < {_DAY_END}
+CROSS JOIN LATERAL jsonb_array_elements(
+  CASE WHEN jsonb_typeof(e.line_items->'lines') = 'array' THEN e.line_items->'lines' ELSE '[]'::jsonb END
+) AS line
+WHERE e.tenant_id = %(tenant_id)s AND e.deleted_at IS NULL AND COALESCE(btrim(line->>'name'), '') <> ''
+GROUP BY e.tenant_id, d.day, 3;
+"""
+
+def refresh_summaries(tenant_id, full=False):
+    """
+    Bring a tenant's daily summary tables up to date
+
+    Only days with estimates or proposals changed since the tenant's watermark
+    are recomputed (all days on the first run, or with full=True). Concurrent
+    refreshes of the same tenant are serialized with an advisory lock.
+
+    Returns:
+        int: Number of days recomputed (0 if the summaries were fresh enough)
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (f"analytics:{tenant_id}",))
+            cur.execute("""
+            SELECT now() AS started, refreshed_through,
+                   refreshed_through > now() - %s::interval AS fresh
+            FROM (SELECT 1) AS one
+            LEFT JOIN analytics_watermarks ON tenant_id = %s;
+            """, (MIN_REFRESH_INTERVAL, tenant_id))
+            state = cur.fetchone()
+
+            if state['fresh'] and not full:
+                conn.rollback()
+                return 0
+
+            if full or state['refreshed_through'] is None:
+                since = '-infinity'
+            else:
+                cur.execute("SELECT %s::timestamptz - %s::interval AS since;",
+                            (state['refreshed_through'], REFRESH_OVERLAP))
+                since = cur.fetchone()['since']
+
+            params = {'tenant_id': tenant_id, 'since': since}
+            cur.execute("CREATE TEMP TABLE analytics_refresh_days (day DATE PRIMARY KEY) ON COMMIT DROP;")
+            cur.execute(_COLLECT_TOUCHED_DAYS, params)
+            cur.execute("SELECT count(*) AS days FROM analytics_refresh_days;")
+            days = cur.fetchone()['days']
+
+            for table in ('estimate_daily_summary', 'proposal_daily_summary', 'item_daily_summary'):
+                if since == '-infinity':
+                    # Rebuilding from scratch also drops days that no longer have any rows
+                    cur.execute(f"DELETE FROM {table} WHERE tenant_id = %(tenant_id)s;", params)
+                elif days:
+                    cur.execute(f"""
+                    DELETE FROM {table}
+                    WHERE tenant_id = %(tenant_id)s AND day IN (SELECT day FROM analytics_refresh_days);
+                    """, params)
+
+            if days:
+                cur.execute(_REFRESH_ESTIMATE_SUMMARY, params)
+                cur.execute(_REFRESH_PROPOSAL_SUMMARY, params)
+                cur.execute(_REFRESH_ITEM_SUMMARY, params)
+
+            cur.execute("""
+            INSERT INTO analytics_watermarks (tenant_id, refreshed_through)
+            VALUES (%s, %s)
+            ON CONFLICT (tenant_id) DO UPDATE SET refreshed_through = EXCLUDED.refreshed_through;
+            """, (tenant_id, state['started']))
+        conn.commit()
+        if days:
+            logger.info(f"Refreshed analytics summaries for tenant {tenant_id}: {days} days recomputed")
+        return days
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error refreshing analytics summaries for tenant {tenant_id}: {e}")
+        raise
+
+def _date_conditions(start, end):
+    conditions = ["tenant_id = %(tenant_id)s"]
+    if start:
+        conditions.append("day >= %(start)s")
+    if end:
+        conditions.append("day <= %(end)s")
+    return ' AND '.join(conditions)
+
+def get_estimate_summary(tenant_id, period='month', start=None, end=None):
+    """
+    Estimate counts, value and conversion to proposals per period
+
+    Returns:
+        list: Dicts with period, estimate_count, total_value, converted_count
+            and conversion_rate, oldest period first
+    """
+    query = f"""
+    SELECT date_trunc(%(period)s, day::timestamp)::date AS period,
+           sum(estimate_count)::int AS estimate_count,
+           sum(total_value) AS total_value,
+           sum(converted_count)::int AS converted_count,
+           round(sum(converted_count)::numeric / NULLIF(sum(estimate_count), 0), 4) AS conversion_rate
+    FROM estimate_daily_summary
+    WHERE {_date_conditions(start, end)}
+    GROUP BY 1
+    ORDER BY 1;
+    """
+    return execute_query(query, {'tenant_id': tenant_id, 'period': period, 'start': start, 'end': end}) or []
+
+def get_proposal_summary(tenant_id, period='month', start=None, end=None):
+    """
+    Proposal counts and value by status per period
+
+    Returns:
+        list: Dicts with period, status, proposal_count and total_value
+    """
+    query = f"""
+    SELECT date_trunc(%(period)s, day::timestamp)::date AS period, status,
+           sum(proposal_count)::int AS proposal_count,
+           sum(total_value) AS total_value
+    FROM proposal_daily_summary
+    WHERE {_date_conditions(start, end)}
+    GROUP BY 1, 2
+    ORDER BY 1, 2;
+    """
+    return execute_query(query, {'tenant_id': tenant_id, 'period': period, 'start': start, 'end': end}) or []
+
+def get_top_items(tenant_id, start=None, end=None, sort='value', limit=10):
+    """
+    Most frequently priced items over a date range
+
+    Returns:
+        list: Dicts with item_name, line_count, quantity and total_value
+    """
+    order_by = TOP_ITEM_SORTS.get(sort, 'total_value')
+    query = f"""
+    SELECT item_name,
+           sum(line_count)::int AS line_count,
+           sum(quantity) AS quantity,
+           sum(total_value) AS total_value
+    FROM item_daily_summary
+    WHERE {_date_conditions(start, end)}
+    GROUP BY item_name
+    ORDER BY {order_by} DESC, item_name
+    LIMIT %(limit)s;
+    """
+    return execute_query(query, {'tenant_id': tenant_id, 'start': start, 'end': end, 'limit': limit}) or []
+
+def get_tenant_analytics(user_email, period='month', start=None, end=None, top_sort='value', top_limit=10):
+    """
+    Reporting data for a user's tenant, refreshing the summaries first if needed
+
+    Args:
+        user_email (str): User requesting the report
+        period (str): One of PERIODS
+        start (date, optional): First day to include
+        end (date, optional): Last day to include
+        top_sort (str): One of TOP_ITEM_SORTS
+        top_limit (int): Number of top items to return
+
+    Returns:
+        dict: {'estimates', 'proposals', 'top_items'}, or None if the user has no tenant
+    """
+    tenant_id = get_tenant_id_by_user_email(user_email)
+    if not tenant_id:
+        logger.error(f"No tenant found for user: {user_email}")
+        return None
+
+    refresh_summaries(tenant_id)
+    return {
+        'estimates': get_estimate_summary(tenant_id, period, start, end),
+        'proposals': get_proposal_summary(tenant_id, period, start, end),
+        'top_items': get_top_items(tenant_id, start, end, top_sort, top_limit)
+    }
@@ -1,4 +1,3 @@
-
 import click
 from flask import current_app
 from flask.cli import with_appcontext
@@ -14,6 +13,50 @@ def init_db_command():
     else:
         click.echo('Failed to initialize database tables.')
 
+@click.command('db-migrate')
+@click.option('--check', is_flag=True, help='Only report whether migrations are pending.')
+@click.option('--no-seed', is_flag=True, help='Skip seeding default data for new tenants.')
+@with_appcontext
+def db_migrate_command(check, no_seed):
+    """Apply pending schema migrations and seed default data."""
+    from db.migrations import get_current_version, migrate, HEAD_VERSION
+
+    current = get_current_version()
+    if check:
+        if current >= HEAD_VERSION:
+            click.echo(f'Database is at head (version {current}).')
+        else:
+            click.echo(f'Database is at version {current}; head is {HEAD_VERSION}.')
+            raise SystemExit(1)
+        return
+
+    applied = migrate()
+    if applied:
+        click.echo(f"Applied migrations: {', '.join(str(version) for version in applied)}")
+    else:
+        click.echo(f'Database already at head (version {current}).')
+
+    if not no_seed:
+        from db.price_lists import initialize_price_lists
+        if initialize_price_lists():
+            click.echo('Default price lists seeded.')
+        else:
+            click.echo('Failed to seed default price lists.')
+
+@click.command('analytics-refresh')
+@click.option('--full', is_flag=True, help='Rebuild the summaries from scratch instead of incrementally.')
+@with_appcontext
+def analytics_refresh_command(full):
+    """Bring every tenant's analytics summary tables up to date."""
+    from db.connection import execute_query
+    from db.analytics import refresh_summaries
+
+    tenants = execute_query("SELECT id FROM tenants ORDER BY id;") or []
+    days = sum(refresh_summaries(tenant['id'], full=full) for tenant in tenants)
+    click.echo(f'Refreshed analytics for {len(tenants)} tenants ({days} days recomputed).')
+
 def register_commands(app):
     """Register database commands with the Flask app."""
     app.cli.add_command(init_db_command)
+    app.cli.add_command(db_migrate_command)
+    app.cli.add_command(analytics_refresh_command)
@@ -1,10 +1,20 @@
 
 import os
+import json
+import time
 import logging
+from decimal import Decimal
 import psycopg2
+import psycopg2.extras
 from psycopg2.pool import SimpleConnectionPool
 from psycopg2.extras import RealDictCursor
 from flask import g, current_app
+from instrumentation import record_db_query
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fall back to the standard library
+    orjson = None
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -12,6 +22,34 @@ logger = logging.getLogger(__name__)
 # Global connection pool
 _pool = None
 
+def _json_default(value):
+    """Serialize values the JSON encoders don't handle natively"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+def json_dumps(value):
+    """
+    Serialize a value to a JSON string for a json/jsonb column
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=_json_default).decode('utf-8')
+    return json.dumps(value, default=_json_default)
+
+json_loads = orjson.loads if orjson is not None else json.loads
+
+def to_jsonb(value):
+    """
+    Wrap a Python value so psycopg2 sends it to a JSONB column as a single encode
+    """
+    return psycopg2.extras.Json(value, dumps=json_dumps)
+
+# json/jsonb columns come back as Python objects; decode them once with the fast decoder
+psycopg2.extras.register_default_json(globally=True, loads=json_loads)
+psycopg2.extras.register_default_jsonb(globally=True, loads=json_loads)
+
 def get_db_pool():
     """
     Create or return the existing database connection pool
@@ -101,14 +139,17 @@ def execute_query(query, params=None, fetch=True, retry_count=2):
             with conn.cursor() as test_cur:
                 test_cur.execute("SELECT 1;")
             
+            started = time.perf_counter()
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
                 cur.execute(query, params)
                 
                 if fetch:
-                    results = cur.fetchall()
-                    return [dict(row) for row in results]
+                    results = [dict(row) for row in cur.fetchall()]
+                    record_db_query(query, time.perf_counter() - started, len(results))
+                    return results
                 else:
                     conn.commit()
+                    record_db_query(query, time.perf_counter() - started, cur.rowcount)
                     return None
                     
         except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
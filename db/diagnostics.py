@@ -0,0 +1,104 @@
+import json
+import logging
+import psycopg2.extras
+from db.connection import execute_query, get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# EXPLAIN ANALYZE runs the query for real; don't let a bad plan hold the worker
+EXPLAIN_STATEMENT_TIMEOUT = '5s'
+
+def _main_queries(tenant_id):
+    """
+    The app's hot queries, as they are issued for a first page / typical lookup
+
+    Returns:
+        list: (name, sql, params)
+    """
+    from db.estimates import ESTIMATE_SUMMARIES_QUERY
+    from db.proposals import PROPOSAL_SUMMARIES_QUERY
+    from db.prompts import ACTIVE_PROMPTS_QUERY, PROMPT_BY_NAME_QUERY
+
+    return [
+        ('estimate listing', ESTIMATE_SUMMARIES_QUERY.format(keyset_clause=''), (tenant_id, 51)),
+        ('proposal listing', PROPOSAL_SUMMARIES_QUERY.format(conditions='p.tenant_id = %s AND p.deleted_at IS NULL'),
+         (tenant_id, 51)),
+        ('active prompts', ACTIVE_PROMPTS_QUERY, (tenant_id,)),
+        ('prompt lookup', PROMPT_BY_NAME_QUERY, (tenant_id, 'lookup_prices')),
+    ]
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _plan_nodes(child)
+
+def _summarize_plan(plan):
+    """Pull the figures worth looking at out of an EXPLAIN (FORMAT JSON) plan."""
+    nodes = list(_plan_nodes(plan['Plan']))
+    return {
+        'planning_ms': plan.get('Planning Time'),
+        'execution_ms': plan.get('Execution Time'),
+        'rows': plan['Plan'].get('Actual Rows'),
+        'shared_hit_blocks': plan['Plan'].get('Shared Hit Blocks'),
+        'shared_read_blocks': plan['Plan'].get('Shared Read Blocks'),
+        'indexes': sorted({node['Index Name'] for node in nodes if node.get('Index Name')}),
+        'seq_scans': sorted({node['Relation Name'] for node in nodes if node.get('Node Type') == 'Seq Scan'}),
+        'sorts': [node.get('Sort Method') for node in nodes if node.get('Node Type') == 'Sort']
+    }
+
+def explain_main_queries(tenant_id, include_text=False):
+    """
+    Run EXPLAIN ANALYZE on the app's main queries for a tenant
+
+    Each query runs in its own transaction that is rolled back, with a
+    statement timeout, so a slow plan is reported rather than waited out.
+
+    Returns:
+        list: Dicts with name, summary (see _summarize_plan) and, if include_text,
+            the plan as text; or error if the query could not be explained
+    """
+    conn = get_db_connection()
+    reports = []
+    for name, sql, params in _main_queries(tenant_id):
+        report = {'name': name}
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute("SET LOCAL statement_timeout = %s;", (EXPLAIN_STATEMENT_TIMEOUT,))
+                cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+                plan = cur.fetchone()['QUERY PLAN']
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                report['summary'] = _summarize_plan(plan[0])
+                if include_text:
+                    cur.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+                    report['plan'] = '\n'.join(row['QUERY PLAN'] for row in cur.fetchall())
+        except Exception as e:
+            logger.warning(f"Could not explain {name}: {e}")
+            report['error'] = str(e)
+        finally:
+            conn.rollback()
+        reports.append(report)
+    return reports
+
+def get_table_stats(tables=('estimates', 'proposals', 'prompts', 'price_items')):
+    """Approximate row counts and sizes from the catalog, without scanning the tables."""
+    query = """
+    SELECT c.relname AS table_name,
+           GREATEST(c.reltuples, 0)::bigint AS approximate_rows,
+           pg_total_relation_size(c.oid) AS total_bytes,
+           s.seq_scan, s.idx_scan, s.n_dead_tup,
+           s.last_autovacuum, s.last_autoanalyze
+    FROM pg_class c
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE c.relname = ANY(%s) AND c.relkind = 'r' AND c.relnamespace = 'public'::regnamespace
+    ORDER BY c.relname;
+    """
+    return execute_query(query, (list(tables),)) or []
+
+def count_tenant_rows(tenant_id):
+    """Live estimate and proposal counts for a tenant (index-backed)."""
+    query = """
+    SELECT (SELECT count(*) FROM estimates WHERE tenant_id = %s AND deleted_at IS NULL) AS estimates,
+           (SELECT count(*) FROM proposals WHERE tenant_id = %s AND deleted_at IS NULL) AS proposals;
+    """
+    return execute_query(query, (tenant_id, tenant_id))[0]
@@ -0,0 +1,95 @@
+import logging
+import psycopg2.extras
+from db.connection import execute_query, get_db_connection, to_jsonb
+
+logger = logging.getLogger(__name__)
+
+# Statuses after which a job will not change again
+FINAL_STATUSES = ('succeeded', 'failed')
+
+def create_export_job(tenant_id, user_email, title, job_type='proposal'):
+    """Record a new Drive export job and return its ID."""
+    query = """
+    INSERT INTO drive_export_jobs (tenant_id, user_email, job_type, title)
+    VALUES (%s, %s, %s, %s)
+    RETURNING job_id;
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(query, (tenant_id, user_email, job_type, title))
+            result = cur.fetchone()
+            conn.commit()
+            if result:
+                return str(result['job_id'])
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error creating drive export job: {e}")
+    return None
+
+def update_export_job(job_id, status, attempts=None, result=None, error=None, next_attempt_at=None):
+    """Update the status (and optionally the outcome) of a Drive export job."""
+    query = """
+    UPDATE drive_export_jobs
+    SET status = %s,
+        attempts = COALESCE(%s, attempts),
+        result = COALESCE(%s, result),
+        error = %s,
+        next_attempt_at = %s,
+        updated_at = now()
+    WHERE job_id = %s;
+    """
+    try:
+        execute_query(query, (status, attempts, to_jsonb(result) if result is not None else None,
+                              error, next_attempt_at, job_id), fetch=False)
+    except Exception as e:
+        logger.error(f"Error updating drive export job {job_id}: {e}")
+
+def get_export_job(job_id, user_email):
+    """Get a Drive export job, ensuring it belongs to the requesting user."""
+    query = """
+    SELECT job_id, job_type, title, status, attempts, result, error,
+           next_attempt_at, created_at, updated_at
+    FROM drive_export_jobs
+    WHERE job_id = %s AND user_email = %s;
+    """
+    try:
+        result = execute_query(query, (job_id, user_email))
+        if result and len(result) > 0:
+            return result[0]
+    except Exception as e:
+        logger.error(f"Error getting drive export job {job_id}: {e}")
+    return None
+
+def fail_stale_export_jobs(older_than):
+    """
+    Mark unfinished jobs that have not changed for a while as failed
+
+    Queued and retrying jobs only live in the memory of the process that
+    accepted them, so a restart leaves their rows behind.
+
+    Args:
+        older_than (timedelta): How long a job must have been unchanged
+
+    Returns:
+        int: Number of jobs marked as failed
+    """
+    query = """
+    UPDATE drive_export_jobs
+    SET status = 'failed',
+        error = 'The export was interrupted by a server restart. Please try again.',
+        next_attempt_at = NULL,
+        updated_at = now()
+    WHERE status NOT IN %s AND updated_at < now() - %s;
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(query, (FINAL_STATUSES, older_than))
+            count = cur.rowcount
+            conn.commit()
+            return count
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error failing stale drive export jobs: {e}")
+        return 0
@@ -0,0 +1,68 @@
+import logging
+from db.connection import execute_query
+
+logger = logging.getLogger(__name__)
+
+# Parent key used for folders created at the top level of the user's Drive
+ROOT_PARENT = 'root'
+
+def get_cached_folder_id(tenant_id, user_email, folder_name, parent_folder_id=None):
+    """Get a cached Drive folder ID for a folder name under a parent folder."""
+    query = """
+    SELECT folder_id FROM drive_folder_cache
+    WHERE tenant_id = %s AND user_email = %s AND parent_id = %s AND folder_name = %s;
+    """
+    try:
+        result = execute_query(query, (tenant_id, user_email, parent_folder_id or ROOT_PARENT, folder_name))
+        if result and len(result) > 0:
+            return result[0]['folder_id']
+    except Exception as e:
+        logger.error(f"Error reading drive folder cache: {e}")
+    return None
+
+def cache_folder_id(tenant_id, user_email, folder_name, folder_id, parent_folder_id=None):
+    """Remember the Drive folder ID for a folder name under a parent folder."""
+    query = """
+    INSERT INTO drive_folder_cache (tenant_id, user_email, parent_id, folder_name, folder_id)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (tenant_id, user_email, parent_id, folder_name)
+    DO UPDATE SET
+        folder_id = EXCLUDED.folder_id,
+        updated_at = now();
+    """
+    try:
+        execute_query(query, (tenant_id, user_email, parent_folder_id or ROOT_PARENT, folder_name, folder_id), fetch=False)
+    except Exception as e:
+        logger.error(f"Error writing drive folder cache: {e}")
+
+def invalidate_folder_id(tenant_id, user_email, folder_id):
+    """Forget a Drive folder and any cached subfolders beneath it."""
+    query = """
+    DELETE FROM drive_folder_cache
+    WHERE tenant_id = %s AND user_email = %s AND (folder_id = %s OR parent_id = %s);
+    """
+    try:
+        execute_query(query, (tenant_id, user_email, folder_id, folder_id), fetch=False)
+        logger.info(f"Invalidated cached drive folder {folder_id}")
+    except Exception as e:
+        logger.error(f"Error invalidating drive folder cache: {e}")
+
+def get_cached_folder_ids(tenant_id, user_email, folder_names, parent_folder_id=None):
+    """Get cached Drive folder IDs for several sibling folders in one query.
+
+    Returns:
+        dict: Mapping of folder name to folder ID for the names found in the cache
+    """
+    if not folder_names:
+        return {}
+
+    query = """
+    SELECT folder_name, folder_id FROM drive_folder_cache
+    WHERE tenant_id = %s AND user_email = %s AND parent_id = %s AND folder_name = ANY(%s);
+    """
+    try:
+        result = execute_query(query, (tenant_id, user_email, parent_folder_id or ROOT_PARENT, list(folder_names)))
+        return {row['folder_name']: row['folder_id'] for row in result}
+    except Exception as e:
+        logger.error(f"Error reading drive folder cache: {e}")
+        return {}
@@ -1,13 +1,29 @@
 
 import logging
-import json
 import psycopg2.extras
 from datetime import datetime
-from db.connection import execute_query
+from db.connection import execute_query, to_jsonb
 from db.tenants import get_tenant_id_by_user_email
 
 logger = logging.getLogger(__name__)
 
+def _estimate_from_row(row):
+    """
+    Map an estimates row to the estimate dict used by the app
+    
+    JSONB columns are already decoded by the adapters registered in db.connection.
+    """
+    return {
+        'estimate_id': str(row['estimate_id']),
+        'customer': row['customer_data'],
+        'project_details': row['project_details'],
+        'line_items': row['line_items'],
+        'total_cost': float(row['total_cost']),
+        'created_at': row['created_at'],
+        'updated_at': row['updated_at'],
+        'created_by_email': row['created_by_email']
+    }
+
 def create_estimate(user_email, customer, project_details, line_items, total_cost):
     """
     Create a new estimate in the database
@@ -38,9 +54,9 @@ def create_estimate(user_email, customer, project_details, line_items, total_cos
         
         params = (
             tenant_id,
-            json.dumps(customer),
-            json.dumps(project_details),
-            json.dumps(line_items),
+            to_jsonb(customer),
+            to_jsonb(project_details),
+            to_jsonb(line_items),
             total_cost,
             user_email
         )
@@ -99,17 +115,7 @@ def get_estimate(estimate_id, user_email):
         result = execute_query(query, (estimate_id, tenant_id), fetch=True)
         
         if result and len(result) > 0:
-            estimate = result[0]
-            return {
-                'estimate_id': str(estimate['estimate_id']),
-                'customer': json.loads(estimate['customer_data']),
-                'project_details': json.loads(estimate['project_details']),
-                'line_items': json.loads(estimate['line_items']),
-                'total_cost': float(estimate['total_cost']),
-                'created_at': estimate['created_at'],
-                'updated_at': estimate['updated_at'],
-                'created_by_email': estimate['created_by_email']
-            }
+            return _estimate_from_row(result[0])
         
         return None
         
@@ -145,15 +151,15 @@ def update_estimate(estimate_id, user_email, customer=None, project_details=None
         
         if customer is not None:
             update_fields.append("customer_data = %s")
-            params.append(json.dumps(customer))
+            params.append(to_jsonb(customer))
             
         if project_details is not None:
             update_fields.append("project_details = %s")
-            params.append(json.dumps(project_details))
+            params.append(to_jsonb(project_details))
             
         if line_items is not None:
             update_fields.append("line_items = %s")
-            params.append(json.dumps(line_items))
+            params.append(to_jsonb(line_items))
             
         if total_cost is not None:
             update_fields.append("total_cost = %s")
@@ -194,84 +200,111 @@ def update_estimate(estimate_id, user_email, customer=None, project_details=None
         logger.error(f"Error updating estimate {estimate_id}: {e}")
         return False
 
-def get_estimates_for_tenant(user_email, limit=50, offset=0):
+def delete_estimate(estimate_id, user_email):
     """
-    Get all estimates for a tenant
+    Soft delete an estimate
     
     Args:
-        user_email (str): Email of the user requesting estimates
-        limit (int): Maximum number of estimates to return
-        offset (int): Number of estimates to skip
+        estimate_id (str): The estimate ID
+        user_email (str): Email of the user deleting the estimate
         
     Returns:
-        list: List of estimates for the tenant
+        bool: True if successful, False otherwise
     """
     try:
         # Get tenant ID from user email
         tenant_id = get_tenant_id_by_user_email(user_email)
         if not tenant_id:
             logger.error(f"No tenant found for user email: {user_email}")
-            return []
+            return False
         
         query = """
-        SELECT estimate_id, customer_data, project_details, line_items, total_cost, 
-               created_at, updated_at, created_by_email
-        FROM estimates 
-        WHERE tenant_id = %s AND deleted_at IS NULL
-        ORDER BY created_at DESC
-        LIMIT %s OFFSET %s
+        UPDATE estimates 
+        SET deleted_at = %s, updated_at = %s
+        WHERE estimate_id = %s AND tenant_id = %s AND deleted_at IS NULL
         """
         
-        result = execute_query(query, (tenant_id, limit, offset), fetch=True)
-        
-        estimates = []
-        for row in result:
-            estimates.append({
-                'estimate_id': str(row['estimate_id']),
-                'customer': json.loads(row['customer_data']),
-                'project_details': json.loads(row['project_details']),
-                'line_items': json.loads(row['line_items']),
-                'total_cost': float(row['total_cost']),
-                'created_at': row['created_at'],
-                'updated_at': row['updated_at'],
-                'created_by_email': row['created_by_email']
-            })
-        
-        return estimates
+        now = datetime.utcnow()
+        execute_query(query, (now, now, estimate_id, tenant_id), fetch=False)
+        logger.info(f"Deleted estimate {estimate_id}")
+        return True
         
     except Exception as e:
-        logger.error(f"Error getting estimates for tenant: {e}")
-        return []
+        logger.error(f"Error deleting estimate {estimate_id}: {e}")
+        return False
 
-def delete_estimate(estimate_id, user_email):
+# Listing query behind get_estimate_summaries; also profiled by db.diagnostics
+ESTIMATE_SUMMARIES_QUERY = """
+SELECT estimate_id,
+       customer_data->>'name' AS customer_name,
+       left(project_details->>'notes', 200) AS notes,
+       jsonb_array_length(COALESCE(line_items->'lines', '[]'::jsonb)) AS line_item_count,
+       total_cost, created_at, created_by_email
+FROM estimates 
+WHERE tenant_id = %s AND deleted_at IS NULL
+{keyset_clause}
+ORDER BY created_at DESC, estimate_id DESC
+LIMIT %s
+"""
+
+def get_estimate_summaries(user_email, limit=50, cursor=None):
     """
-    Soft delete an estimate
+    Get a page of estimate summaries for a tenant, newest first
+    
+    Only the fields shown in listings are extracted (in SQL) from the JSONB
+    columns, and pages are addressed by a keyset cursor on (created_at, estimate_id)
+    so the cost of a page does not grow with the number of estimates.
     
     Args:
-        estimate_id (str): The estimate ID
-        user_email (str): Email of the user deleting the estimate
+        user_email (str): Email of the user requesting estimates
+        limit (int): Maximum number of estimates to return
+        cursor (str, optional): Cursor returned with the previous page
         
     Returns:
-        bool: True if successful, False otherwise
+        tuple: (list of estimate summaries, cursor for the next page or None)
     """
+    from db.pagination import encode_cursor, decode_cursor, clamp_page_size
+    
     try:
         # Get tenant ID from user email
         tenant_id = get_tenant_id_by_user_email(user_email)
         if not tenant_id:
             logger.error(f"No tenant found for user email: {user_email}")
-            return False
+            return [], None
         
-        query = """
-        UPDATE estimates 
-        SET deleted_at = %s, updated_at = %s
-        WHERE estimate_id = %s AND tenant_id = %s AND deleted_at IS NULL
-        """
+        limit = clamp_page_size(limit)
+        params = [tenant_id]
+        keyset_clause = ""
+        position = decode_cursor(cursor)
+        if position:
+            keyset_clause = "AND (created_at, estimate_id) < (%s, %s::uuid)"
+            params.extend(position)
+        # Fetch one extra row to know whether another page exists
+        params.append(limit + 1)
         
-        now = datetime.utcnow()
-        execute_query(query, (now, now, estimate_id, tenant_id), fetch=False)
-        logger.info(f"Deleted estimate {estimate_id}")
-        return True
+        query = ESTIMATE_SUMMARIES_QUERY.format(keyset_clause=keyset_clause)
+        
+        result = execute_query(query, tuple(params), fetch=True)
+        
+        summaries = []
+        for row in result[:limit]:
+            summaries.append({
+                'estimate_id': str(row['estimate_id']),
+                'customer_name': row['customer_name'],
+                'notes': row['notes'],
+                'line_item_count': row['line_item_count'],
+                'total_cost': float(row['total_cost']),
+                'created_at': row['created_at'],
+                'created_by_email': row['created_by_email']
+            })
+        
+        next_cursor = None
+        if len(result) > limit:
+            last = result[limit - 1]
+            next_cursor = encode_cursor(last['created_at'], last['estimate_id'])
+        
+        return summaries, next_cursor
         
     except Exception as e:
-        logger.error(f"Error deleting estimate {estimate_id}: {e}")
-        return False
+        logger.error(f"Error getting estimate summaries for tenant: {e}")
+        return [], None
@@ -5,10 +5,17 @@ from db.connection import execute_query
 # Configure logging
 logger = logging.getLogger(__name__)
 
-def create_tables():
+def create_tables(run=None):
     """
     Create all required database tables if they don't exist
+
+    Args:
+        run (callable, optional): Executes one SQL string; by default each
+            statement is committed on its own through execute_query
     """
+    if run is None:
+        run = lambda sql: execute_query(sql, fetch=False)
+
     try:
         # Create tenants table
         create_tenants_table = """
@@ -27,7 +34,7 @@ def create_tables():
         );
         """
 
-        execute_query(create_tenants_table, fetch=False)
+        run(create_tenants_table)
         logger.info("Tenants table created successfully")
 
         # Create users table with user_role ENUM
@@ -56,30 +63,84 @@ def create_tables():
         CREATE INDEX IF NOT EXISTS idx_users_tenant_id ON users(tenant_id);
         """
 
-        # Create price_lists table for tenant-specific price lists
-        create_price_lists_table = """
-        CREATE TABLE IF NOT EXISTS price_lists (
-          id               UUID      PRIMARY KEY DEFAULT gen_random_uuid(),
+        # Create price_items table holding one row per tenant price list item
+        create_price_items_table = """
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+        CREATE TABLE IF NOT EXISTS price_items (
           tenant_id        UUID      NOT NULL REFERENCES tenants(id),
-          prices           JSONB     NOT NULL,
+          normalized_name  TEXT      NOT NULL,     -- lower-cased, whitespace-collapsed name
+          name             TEXT      NOT NULL,     -- name as entered, for display
+          unit             TEXT      NOT NULL,
+          price            NUMERIC(12,2) NOT NULL,
           created_at       TIMESTAMPTZ NOT NULL DEFAULT now(),
-          updated_at       TIMESTAMPTZ NOT NULL DEFAULT now()
+          updated_at       TIMESTAMPTZ NOT NULL DEFAULT now(),
+          PRIMARY KEY (tenant_id, normalized_name)
         );
 
-        -- Create index on tenant_id for faster lookups
-        CREATE INDEX IF NOT EXISTS idx_price_lists_tenant_id ON price_lists(tenant_id);
+        -- Trigram index for fuzzy item search
+        CREATE INDEX IF NOT EXISTS idx_price_items_name_trgm ON price_items USING gin (normalized_name gin_trgm_ops);
+
+        -- Move items out of the legacy whole-list JSONB table, once
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_class
+                       WHERE relname = 'price_lists' AND relkind = 'r'
+                       AND relnamespace = current_schema()::regnamespace) THEN
+                INSERT INTO price_items (tenant_id, normalized_name, name, unit, price)
+                SELECT pl.tenant_id,
+                       lower(btrim(regexp_replace(item.key, '\\s+', ' ', 'g'))),
+                       item.key,
+                       COALESCE(item.value->>'unit', 'unknown'),
+                       COALESCE(NULLIF(item.value->>'price', '')::numeric, 0)
+                FROM price_lists pl
+                CROSS JOIN LATERAL jsonb_each(pl.prices) AS item
+                ON CONFLICT (tenant_id, normalized_name) DO NOTHING;
+
+                ALTER TABLE price_lists RENAME TO price_lists_legacy;
+            END IF;
+        END$$;
+
+        -- Compatibility view exposing each tenant's items in the old {name: {unit, price}} shape
+        CREATE OR REPLACE VIEW price_lists AS
+        SELECT tenant_id,
+               jsonb_object_agg(name, jsonb_build_object('unit', unit, 'price', price)) AS prices,
+               max(updated_at) AS updated_at
+        FROM price_items
+        GROUP BY tenant_id;
+        """
+
+
+        # Create the staging table bulk price imports are loaded into before review
+        create_price_import_staging_table = """
+        CREATE UNLOGGED TABLE IF NOT EXISTS price_import_staging (
+          import_id        UUID      NOT NULL,
+          tenant_id        UUID      NOT NULL,
+          user_email       TEXT      NOT NULL,
+          line_no          INTEGER   NOT NULL,
+          normalized_name  TEXT      NOT NULL,
+          name             TEXT      NOT NULL,
+          unit             TEXT      NOT NULL,
+          price            NUMERIC(12,2) NOT NULL,
+          created_at       TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_price_import_staging_import ON price_import_staging(import_id, normalized_name);
         """
 
 
         # First create the ENUM type if it doesn't exist
-        execute_query(create_user_role_enum, fetch=False)
+        run(create_user_role_enum)
         # Then create the users table
-        execute_query(create_users_table, fetch=False)
+        run(create_users_table)
         logger.info("Users table created successfully")
 
-        # Create the price_lists table
-        execute_query(create_price_lists_table, fetch=False)
-        logger.info("Price lists table created successfully")
+        # Create the price_items table and the price_lists compatibility view
+        run(create_price_items_table)
+        logger.info("Price items table created successfully")
+
+        run(create_price_import_staging_table)
+        logger.info("Price import staging table created successfully")
 
         # Create templates table for tenant-specific templates
         create_templates_table = """
@@ -96,7 +157,7 @@ def create_tables():
         CREATE INDEX IF NOT EXISTS idx_templates_tenant_id ON templates(tenant_id);
         """
 
-        execute_query(create_templates_table, fetch=False)
+        run(create_templates_table)
         logger.info("Templates table created successfully")
 
         # Create estimates table for storing estimates data
@@ -120,9 +181,11 @@ def create_tables():
         CREATE INDEX IF NOT EXISTS idx_estimates_created_by ON estimates(created_by_email);
         CREATE INDEX IF NOT EXISTS idx_estimates_created_at ON estimates(created_at);
         CREATE INDEX IF NOT EXISTS idx_estimates_proposal_id ON estimates(proposal_id);
+        -- Keyset pagination of a tenant's live estimates, newest first
+        CREATE INDEX IF NOT EXISTS idx_estimates_tenant_created_live ON estimates(tenant_id, created_at DESC, estimate_id DESC) WHERE deleted_at IS NULL;
         """
 
-        execute_query(create_estimates_table, fetch=False)
+        run(create_estimates_table)
         logger.info("Estimates table created successfully")
 
         # Create proposals table for future use
@@ -144,9 +207,12 @@ def create_tables():
         CREATE INDEX IF NOT EXISTS idx_proposals_estimate_id ON proposals(estimate_id);
         CREATE INDEX IF NOT EXISTS idx_proposals_created_by ON proposals(created_by_email);
         CREATE INDEX IF NOT EXISTS idx_proposals_status ON proposals(status);
+        -- Keyset pagination of a tenant's live proposals, optionally filtered by status
+        CREATE INDEX IF NOT EXISTS idx_proposals_tenant_created_live ON proposals(tenant_id, created_at DESC, proposal_id DESC) WHERE deleted_at IS NULL;
+        CREATE INDEX IF NOT EXISTS idx_proposals_tenant_status_created_live ON proposals(tenant_id, status, created_at DESC, proposal_id DESC) WHERE deleted_at IS NULL;
         """
 
-        execute_query(create_proposals_table, fetch=False)
+        run(create_proposals_table)
         logger.info("Proposals table created successfully")
 
         # Create prompts table with version control
@@ -173,7 +239,7 @@ def create_tables():
         CREATE UNIQUE INDEX IF NOT EXISTS ux_prompts_tenant_name_active ON prompts(tenant_id, name) WHERE is_active = true;
         """
 
-        execute_query(create_prompts_table, fetch=False)
+        run(create_prompts_table)
         logger.info("Prompts table created successfully")
 
         # Create drive_settings table
@@ -192,9 +258,52 @@ def create_tables():
         );
         """
 
-        execute_query(create_drive_settings_table, fetch=False)
+        run(create_drive_settings_table)
         logger.info("Drive settings table created successfully")
 
+        # Create drive_folder_cache table mapping (parent, folder name) to Drive folder IDs
+        create_drive_folder_cache_table = """
+        CREATE TABLE IF NOT EXISTS drive_folder_cache (
+          tenant_id            UUID      NOT NULL REFERENCES tenants(id),
+          user_email           TEXT      NOT NULL,
+          parent_id            TEXT      NOT NULL,     -- 'root' for top-level folders
+          folder_name          TEXT      NOT NULL,
+          folder_id            TEXT      NOT NULL,
+          created_at           TIMESTAMPTZ NOT NULL DEFAULT now(),
+          updated_at           TIMESTAMPTZ NOT NULL DEFAULT now(),
+          PRIMARY KEY (tenant_id, user_email, parent_id, folder_name)
+        );
+
+        -- Used when invalidating a folder that Drive reports as missing
+        CREATE INDEX IF NOT EXISTS idx_drive_folder_cache_folder_id ON drive_folder_cache(tenant_id, user_email, folder_id);
+        """
+
+        run(create_drive_folder_cache_table)
+        logger.info("Drive folder cache table created successfully")
+
+        # Create drive_export_jobs table tracking background "save to Drive" jobs
+        create_drive_export_jobs_table = """
+        CREATE TABLE IF NOT EXISTS drive_export_jobs (
+          job_id               UUID      PRIMARY KEY DEFAULT gen_random_uuid(),
+          tenant_id            UUID      REFERENCES tenants(id),
+          user_email           TEXT      NOT NULL,
+          job_type             VARCHAR(50) NOT NULL DEFAULT 'proposal',
+          title                TEXT,
+          status               VARCHAR(50) NOT NULL DEFAULT 'queued',
+          attempts             INTEGER   NOT NULL DEFAULT 0,
+          result               JSONB,
+          error                TEXT,
+          next_attempt_at      TIMESTAMPTZ,
+          created_at           TIMESTAMPTZ NOT NULL DEFAULT now(),
+          updated_at           TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_drive_export_jobs_user ON drive_export_jobs(user_email, created_at DESC);
+        """
+
+        run(create_drive_export_jobs_table)
+        logger.info("Drive export jobs table created successfully")
+
         return True
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
@@ -0,0 +1,241 @@
+import logging
+from db.connection import execute_query, get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for the advisory lock that serializes migration runs across processes
+MIGRATION_LOCK_ID = 7240317
+
+create_schema_migrations_table = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+  version          INTEGER   PRIMARY KEY,
+  name             TEXT      NOT NULL,
+  applied_at       TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+def _baseline_schema(cur):
+    """Create every table, index and view the application had before versioned migrations."""
+    from db.init_db import create_tables
+    if not create_tables(run=cur.execute):
+        raise RuntimeError("Creating the baseline schema failed; see the log for details")
+
+def _proposal_revisions(cur):
+    """Track proposal edits as compact deltas with periodic full snapshots."""
+    cur.execute("""
+    ALTER TABLE proposals ADD COLUMN IF NOT EXISTS head_revision INTEGER NOT NULL DEFAULT 0;
+
+    CREATE TABLE IF NOT EXISTS proposal_revisions (
+      proposal_id          UUID      NOT NULL REFERENCES proposals(proposal_id) ON DELETE CASCADE,
+      revision             INTEGER   NOT NULL,
+      tenant_id            UUID      NOT NULL REFERENCES tenants(id),
+      ops                  JSONB,              -- splice ops applied on top of the previous revision
+      snapshot             TEXT,               -- full content, written every few revisions
+      content_length       INTEGER   NOT NULL,
+      created_by_email     TEXT      NOT NULL,
+      created_at           TIMESTAMPTZ NOT NULL DEFAULT now(),
+      updated_at           TIMESTAMPTZ NOT NULL DEFAULT now(),
+      PRIMARY KEY (proposal_id, revision),
+      CHECK ((ops IS NULL) <> (snapshot IS NULL))
+    );
+
+    -- Finding the snapshot to rebuild a revision from
+    CREATE INDEX IF NOT EXISTS idx_proposal_revisions_snapshots ON proposal_revisions(proposal_id, revision DESC) WHERE snapshot IS NOT NULL;
+    """)
+
+def _analytics_summaries(cur):
+    """Per-tenant daily summary tables for reporting, refreshed incrementally by db.analytics."""
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS estimate_daily_summary (
+      tenant_id            UUID      NOT NULL REFERENCES tenants(id),
+      day                  DATE      NOT NULL,
+      estimate_count       INTEGER   NOT NULL,
+      total_value          NUMERIC(14,2) NOT NULL,
+      converted_count      INTEGER   NOT NULL,   -- estimates with at least one proposal
+      PRIMARY KEY (tenant_id, day)
+    );
+
+    CREATE TABLE IF NOT EXISTS proposal_daily_summary (
+      tenant_id            UUID      NOT NULL REFERENCES tenants(id),
+      day                  DATE      NOT NULL,
+      status               VARCHAR(50) NOT NULL,
+      proposal_count       INTEGER   NOT NULL,
+      total_value          NUMERIC(14,2) NOT NULL,   -- value of the estimates the proposals are for
+      PRIMARY KEY (tenant_id, day, status)
+    );
+
+    CREATE TABLE IF NOT EXISTS item_daily_summary (
+      tenant_id            UUID      NOT NULL REFERENCES tenants(id),
+      day                  DATE      NOT NULL,
+      item_name            TEXT      NOT NULL,   -- normalized as in price_items
+      line_count           INTEGER   NOT NULL,
+      quantity             NUMERIC(14,2) NOT NULL,
+      total_value          NUMERIC(14,2) NOT NULL,
+      PRIMARY KEY (tenant_id, day, item_name)
+    );
+
+    -- How far each tenant's summaries have been brought up to date
+    CREATE TABLE IF NOT EXISTS analytics_watermarks (
+      tenant_id            UUID      PRIMARY KEY REFERENCES tenants(id),
+      refreshed_through    TIMESTAMPTZ NOT NULL
+    );
+
+    -- Finding rows changed since the watermark
+    CREATE INDEX IF NOT EXISTS idx_estimates_tenant_updated ON estimates(tenant_id, updated_at);
+    CREATE INDEX IF NOT EXISTS idx_proposals_tenant_updated ON proposals(tenant_id, updated_at);
+    """)
+
+def _full_text_search(cur):
+    """Trigger-maintained tsvector columns with GIN indexes on estimates and proposals."""
+    cur.execute("""
+    CREATE OR REPLACE FUNCTION estimate_line_item_names(line_items JSONB) RETURNS TEXT
+    LANGUAGE sql IMMUTABLE AS $$
+      SELECT string_agg(line->>'name', ' ')
+      FROM jsonb_array_elements(
+        CASE WHEN jsonb_typeof(line_items->'lines') = 'array' THEN line_items->'lines' ELSE '[]'::jsonb END
+      ) AS line
+    $$;
+
+    -- Names and addresses are indexed unstemmed ('simple'); free text is stemmed ('english')
+    CREATE OR REPLACE FUNCTION estimates_search_vector_update() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+      NEW.search_vector :=
+        setweight(to_tsvector('simple', COALESCE(NEW.customer_data->>'name', '')), 'A') ||
+        setweight(to_tsvector('simple', concat_ws(' ', NEW.customer_data->>'address', NEW.customer_data->>'project_address',
+                                                  NEW.customer_data->>'email', NEW.customer_data->>'phone')), 'B') ||
+        setweight(to_tsvector('english', COALESCE(estimate_line_item_names(NEW.line_items), '')), 'B') ||
+        setweight(to_tsvector('english', COALESCE(NEW.project_details->>'notes', '')), 'C');
+      RETURN NEW;
+    END
+    $$;
+
+    CREATE OR REPLACE FUNCTION proposals_search_vector_update() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+      -- Autosaves rewrite the row often; only re-parse the text when it changed
+      IF TG_OP = 'INSERT' OR NEW.proposal_content IS DISTINCT FROM OLD.proposal_content THEN
+        NEW.search_vector := to_tsvector('english', COALESCE(NEW.proposal_content, ''));
+      END IF;
+      RETURN NEW;
+    END
+    $$;
+
+    ALTER TABLE estimates ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+    ALTER TABLE proposals ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+
+    DROP TRIGGER IF EXISTS estimates_search_vector ON estimates;
+    CREATE TRIGGER estimates_search_vector
+      BEFORE INSERT OR UPDATE OF customer_data, project_details, line_items ON estimates
+      FOR EACH ROW EXECUTE FUNCTION estimates_search_vector_update();
+
+    DROP TRIGGER IF EXISTS proposals_search_vector ON proposals;
+    CREATE TRIGGER proposals_search_vector
+      BEFORE INSERT OR UPDATE OF proposal_content ON proposals
+      FOR EACH ROW EXECUTE FUNCTION proposals_search_vector_update();
+
+    -- Backfill existing rows through the triggers
+    UPDATE estimates SET customer_data = customer_data WHERE search_vector IS NULL;
+    UPDATE proposals SET search_vector = to_tsvector('english', COALESCE(proposal_content, '')) WHERE search_vector IS NULL;
+
+    CREATE INDEX IF NOT EXISTS idx_estimates_search_vector ON estimates USING GIN (search_vector);
+    CREATE INDEX IF NOT EXISTS idx_proposals_search_vector ON proposals USING GIN (search_vector);
+    """)
+
+def _drop_price_items_prefix_index(cur):
+    """Drop the text_pattern_ops price item index; the primary key serves name-ordered paging."""
+    cur.execute("DROP INDEX IF EXISTS idx_price_items_tenant_name_prefix;")
+
+def _search_names_in_both_configs(cur):
+    """Index estimate names and addresses stemmed as well, so mixed queries match."""
+    cur.execute("""
+    -- Queries are matched as english OR simple, each as a whole; names and addresses
+    -- also need english lexemes for a query like "Jones bathrooms" to match
+    CREATE OR REPLACE FUNCTION estimates_search_vector_update() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    DECLARE
+      names TEXT := COALESCE(NEW.customer_data->>'name', '');
+      addresses TEXT := concat_ws(' ', NEW.customer_data->>'address', NEW.customer_data->>'project_address',
+                                  NEW.customer_data->>'email', NEW.customer_data->>'phone');
+    BEGIN
+      NEW.search_vector :=
+        setweight(to_tsvector('simple', names), 'A') ||
+        setweight(to_tsvector('english', names), 'A') ||
+        setweight(to_tsvector('simple', addresses), 'B') ||
+        setweight(to_tsvector('english', addresses), 'B') ||
+        setweight(to_tsvector('english', COALESCE(estimate_line_item_names(NEW.line_items), '')), 'B') ||
+        setweight(to_tsvector('english', COALESCE(NEW.project_details->>'notes', '')), 'C');
+      RETURN NEW;
+    END
+    $$;
+
+    -- Rebuild existing vectors through the trigger
+    UPDATE estimates SET customer_data = customer_data;
+    """)
+
+# Ordered list of (version, name, function). Append new migrations; never edit applied ones.
+MIGRATIONS = [
+    (1, 'baseline schema', _baseline_schema),
+    (2, 'proposal revisions', _proposal_revisions),
+    (3, 'analytics summaries', _analytics_summaries),
+    (4, 'full-text search', _full_text_search),
+    (5, 'drop price items prefix index', _drop_price_items_prefix_index),
+    (6, 'search names in both text configs', _search_names_in_both_configs),
+]
+
+HEAD_VERSION = MIGRATIONS[-1][0]
+
+def get_current_version():
+    """Get the schema version the database is at (0 if it has never been migrated)."""
+    result = execute_query("SELECT to_regclass('schema_migrations') IS NOT NULL AS present;")
+    if not result or not result[0]['present']:
+        return 0
+    result = execute_query("SELECT COALESCE(max(version), 0) AS version FROM schema_migrations;")
+    return result[0]['version']
+
+def migrate(target=None):
+    """
+    Apply pending migrations up to target (default: head)
+
+    Each migration and its schema_migrations row are committed together, on one
+    connection, under a transaction-level advisory lock; so several workers
+    starting at once apply each migration exactly once, and a failed migration
+    leaves nothing behind.
+
+    Returns:
+        list: Versions applied by this call (empty if already up to date)
+    """
+    target = target or HEAD_VERSION
+    if get_current_version() >= target:
+        return []
+
+    applied = []
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (MIGRATION_LOCK_ID,))
+            cur.execute(create_schema_migrations_table)
+        conn.commit()
+
+        for version, name, apply in MIGRATIONS:
+            if version > target:
+                break
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(%s);", (MIGRATION_LOCK_ID,))
+                # Another process may have applied it while we waited for the lock
+                cur.execute("SELECT 1 FROM schema_migrations WHERE version = %s;", (version,))
+                if cur.fetchone():
+                    conn.rollback()
+                    continue
+                logger.info(f"Applying migration {version}: {name}")
+                apply(cur)
+                cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s);", (version, name))
+            conn.commit()
+            applied.append(version)
+    except Exception:
+        conn.rollback()
+        raise
+
+    if applied:
+        logger.info(f"Database migrated to version {applied[-1]}")
+    return applied
@@ -0,0 +1,52 @@
+import json
+import base64
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Hard cap on page sizes requested through the listing APIs
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(created_at, row_id):
+    """
+    Encode the sort key of the last row on a page into an opaque cursor
+
+    Args:
+        created_at (datetime): created_at of the last row returned
+        row_id: Primary key of the last row returned
+
+    Returns:
+        str: URL-safe cursor string
+    """
+    payload = json.dumps({'t': created_at.isoformat(), 'id': str(row_id)})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Args:
+        cursor (str): Cursor string from a previous page
+
+    Returns:
+        tuple: (created_at, row_id), or None if the cursor is missing or invalid
+    """
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(payload['t']), payload['id']
+    except Exception as e:
+        logger.warning(f"Ignoring invalid pagination cursor: {e}")
+        return None
+
+def clamp_page_size(limit, default=50):
+    """Coerce a requested page size into the range 1..MAX_PAGE_SIZE"""
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, MAX_PAGE_SIZE))
@@ -0,0 +1,130 @@
+import logging
+from db.connection import execute_query, get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Staged imports that were never committed or cancelled are dropped after this long
+STAGING_RETENTION = '1 day'
+
+# The last row of the file wins when an item appears more than once
+_LATEST_STAGED_ROWS = """
+SELECT DISTINCT ON (normalized_name) tenant_id, normalized_name, name, unit, price
+FROM price_import_staging
+WHERE import_id = %s AND user_email = %s
+ORDER BY normalized_name, line_no DESC
+"""
+
+def stage_price_rows(import_id, tenant_id, user_email, csv_file):
+    """
+    Load parsed price rows into the staging table with COPY
+
+    Args:
+        import_id (str): ID grouping the rows of this import
+        tenant_id: Tenant the rows belong to
+        user_email (str): User performing the import
+        csv_file: File-like object of CSV rows (line_no, normalized_name, name, unit, price)
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM price_import_staging WHERE created_at < now() - %s::interval;",
+                        (STAGING_RETENTION,))
+            cur.execute("CREATE TEMP TABLE price_import_load (line_no INTEGER, normalized_name TEXT, name TEXT, unit TEXT, price NUMERIC(12,2)) ON COMMIT DROP;")
+            cur.copy_expert("COPY price_import_load FROM STDIN WITH (FORMAT csv)", csv_file)
+            cur.execute("""
+            INSERT INTO price_import_staging (import_id, tenant_id, user_email, line_no, normalized_name, name, unit, price)
+            SELECT %s, %s, %s, line_no, normalized_name, name, unit, price FROM price_import_load;
+            """, (import_id, tenant_id, user_email))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def get_import_diff(import_id, user_email, sample_limit=50):
+    """
+    Compare a staged import against the tenant's current price items
+
+    Returns:
+        dict: Counts of added, changed and unchanged items plus sample rows of
+              the added and changed items, or None if the import does not exist
+    """
+    query = f"""
+    WITH staged AS ({_LATEST_STAGED_ROWS}),
+    compared AS (
+        SELECT s.name, s.unit, s.price,
+               pi.unit AS current_unit, pi.price AS current_price,
+               CASE
+                   WHEN pi.normalized_name IS NULL THEN 'added'
+                   WHEN pi.unit IS DISTINCT FROM s.unit OR pi.price IS DISTINCT FROM s.price THEN 'changed'
+                   ELSE 'unchanged'
+               END AS change
+        FROM staged s
+        LEFT JOIN price_items pi
+          ON pi.tenant_id = s.tenant_id AND pi.normalized_name = s.normalized_name
+    ),
+    ranked AS (
+        SELECT *, count(*) OVER (PARTITION BY change) AS change_count,
+               row_number() OVER (PARTITION BY change ORDER BY name) AS rn
+        FROM compared
+    )
+    SELECT change, change_count, name, unit, price, current_unit, current_price
+    FROM ranked
+    WHERE rn = 1 OR (rn <= %s AND change <> 'unchanged')
+    ORDER BY change, name;
+    """
+    try:
+        result = execute_query(query, (import_id, user_email, sample_limit))
+    except Exception as e:
+        logger.error(f"Error computing price import diff for {import_id}: {e}")
+        return None
+
+    if not result:
+        return None
+
+    diff = {'added': 0, 'changed': 0, 'unchanged': 0, 'added_items': [], 'changed_items': []}
+    for row in result:
+        diff[row['change']] = row['change_count']
+        if row['change'] in ('added', 'changed'):
+            diff[f"{row['change']}_items"].append(row)
+    return diff
+
+def commit_price_import(import_id, user_email):
+    """
+    Merge a staged import into the tenant's price items and drop the staged rows
+
+    Returns:
+        int: Number of items inserted or updated, or None if the merge failed
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+            INSERT INTO price_items (tenant_id, normalized_name, name, unit, price)
+            SELECT tenant_id, normalized_name, name, unit, price FROM ({_LATEST_STAGED_ROWS}) staged
+            ON CONFLICT (tenant_id, normalized_name)
+            DO UPDATE SET
+                name = EXCLUDED.name,
+                unit = EXCLUDED.unit,
+                price = EXCLUDED.price,
+                updated_at = now()
+            WHERE (price_items.name, price_items.unit, price_items.price)
+                  IS DISTINCT FROM (EXCLUDED.name, EXCLUDED.unit, EXCLUDED.price);
+            """, (import_id, user_email))
+            merged = cur.rowcount
+            cur.execute("DELETE FROM price_import_staging WHERE import_id = %s AND user_email = %s;",
+                        (import_id, user_email))
+        conn.commit()
+        logger.info(f"Committed price import {import_id}: {merged} items inserted or updated")
+        return merged
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error committing price import {import_id}: {e}")
+        return None
+
+def discard_price_import(import_id, user_email):
+    """Drop the staged rows of an import that will not be committed."""
+    try:
+        execute_query("DELETE FROM price_import_staging WHERE import_id = %s AND user_email = %s;",
+                      (import_id, user_email), fetch=False)
+    except Exception as e:
+        logger.error(f"Error discarding price import {import_id}: {e}")
@@ -1,6 +1,7 @@
 import json
 import logging
-from db.connection import execute_query
+import psycopg2.extras
+from db.connection import execute_query, get_db_connection, to_jsonb
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -22,6 +23,25 @@ def get_tenant_id_for_user(email):
         logger.error(f"Error getting tenant ID for user: {e}")
         return None
 
+def normalize_item_name(name):
+    """Normalize an item name into the key price items are stored under."""
+    return ' '.join(str(name).split()).lower()
+
+def _price_item_rows(tenant_id, price_list):
+    """Convert a {name: {unit, price}} price list into price_items rows."""
+    rows = {}
+    for name, details in price_list.items():
+        details = details or {}
+        # Later duplicates (differing only in case/spacing) win, as with a dict update
+        rows[normalize_item_name(name)] = (
+            tenant_id,
+            normalize_item_name(name),
+            name.strip(),
+            details.get('unit') or 'unknown',
+            float(details.get('price') or 0)
+        )
+    return list(rows.values())
+
 def get_price_list(email):
     """Get price list for a user's tenant."""
     try:
@@ -30,6 +50,7 @@ def get_price_list(email):
             logger.error(f"No tenant found for user: {email}")
             return {}
 
+        # price_lists is a view aggregating the tenant's price_items rows
         query = """
         SELECT prices FROM price_lists 
         WHERE tenant_id = %s;
@@ -45,49 +66,221 @@ def get_price_list(email):
         logger.error(f"Error getting price list: {e}")
         return {}
 
-def save_price_list(email, price_list):
-    """Save or update price list for a user's tenant."""
+# Columns the price item search can be sorted by
+PRICE_ITEM_SORTS = {
+    'name': 'normalized_name',
+    'unit': 'unit',
+    'price': 'price',
+    'updated': 'updated_at'
+}
+
+def _like_escape(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def search_price_items(email, query=None, sort=None, descending=False, limit=50, offset=0):
+    """
+    Search and page through a tenant's price items
+
+    Args:
+        email (str): User's email, used to find the tenant
+        query (str, optional): Text to search item names for; matches prefixes,
+            substrings and (via trigram similarity) near-miss spellings
+        sort (str, optional): One of PRICE_ITEM_SORTS; by default results are
+            ordered by relevance when searching and by name otherwise
+        descending (bool): Reverse the sort order
+        limit (int): Page size
+        offset (int): Number of items to skip
+
+    Returns:
+        tuple: (list of item dicts, total number of matching items)
+    """
     try:
         tenant_id = get_tenant_id_for_user(email)
         if not tenant_id:
             logger.error(f"No tenant found for user: {email}")
-            return False
+            return [], 0
 
-        # Check if price list already exists for this tenant
-        query_check = """
-        SELECT id FROM price_lists 
-        WHERE tenant_id = %s;
+        direction = 'DESC' if descending else 'ASC'
+        conditions = ["tenant_id = %(tenant_id)s"]
+        params = {'tenant_id': tenant_id, 'limit': limit + 1, 'offset': offset}
+        order_by = f"normalized_name {direction}"
+
+        search = normalize_item_name(query) if query else ''
+        if search:
+            params.update(search=search, prefix=_like_escape(search) + '%', contains='%' + _like_escape(search) + '%')
+            conditions.append("(normalized_name LIKE %(contains)s OR normalized_name %% %(search)s)")
+            if sort not in PRICE_ITEM_SORTS:
+                order_by = ("(normalized_name LIKE %(prefix)s) DESC, "
+                            "similarity(normalized_name, %(search)s) DESC, normalized_name ASC")
+
+        if sort in PRICE_ITEM_SORTS:
+            order_by = f"{PRICE_ITEM_SORTS[sort]} {direction}, normalized_name ASC"
+
+        # One extra row tells whether there is a next page; the primary key
+        # (tenant_id, normalized_name) serves the name-ordered listing
+        sql = f"""
+        SELECT name, unit, price, updated_at
+        FROM price_items
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {order_by}
+        LIMIT %(limit)s OFFSET %(offset)s;
         """
-        result = execute_query(query_check, (tenant_id,))
+        result = execute_query(sql, params) or []
 
-        if result and len(result) > 0:
-            # Update existing price list
-            query_update = """
-            UPDATE price_lists 
-            SET prices = %s, updated_at = now() 
-            WHERE tenant_id = %s;
-            """
-            execute_query(query_update, (json.dumps(price_list), tenant_id), fetch=False)
-        else:
-            # Insert new price list
-            query_insert = """
-            INSERT INTO price_lists (tenant_id, prices) 
-            VALUES (%s, %s);
-            """
-            execute_query(query_insert, (tenant_id, json.dumps(price_list)), fetch=False)
+        if len(result) <= limit and (result or offset == 0):
+            # Last page: the total follows without counting
+            return result, offset + len(result)
+
+        count_sql = f"SELECT count(*) AS total_count FROM price_items WHERE {' AND '.join(conditions)};"
+        total = execute_query(count_sql, params)[0]['total_count']
+        return result[:limit], total
+    except Exception as e:
+        logger.error(f"Error searching price items: {e}")
+        return [], 0
+
+def get_price_items(email, names):
+    """
+    Look up specific items in a tenant's price list
+
+    Args:
+        email (str): User's email, used to find the tenant
+        names (list): Item names, matched case- and whitespace-insensitively
+
+    Returns:
+        dict: {normalized name: {'name', 'unit', 'price'}} for the items found
+    """
+    normalized = sorted({normalize_item_name(name) for name in names if name})
+    if not normalized:
+        return {}
+    try:
+        tenant_id = get_tenant_id_for_user(email)
+        if not tenant_id:
+            logger.error(f"No tenant found for user: {email}")
+            return {}
+
+        query = """
+        SELECT normalized_name, name, unit, price
+        FROM price_items
+        WHERE tenant_id = %s AND normalized_name = ANY(%s);
+        """
+        result = execute_query(query, (tenant_id, normalized))
+        return {row.pop('normalized_name'): row for row in result or []}
+    except Exception as e:
+        logger.error(f"Error looking up price items: {e}")
+        return {}
+
+def save_price_list(email, price_list):
+    """Replace the whole price list for a user's tenant in one transaction."""
+    try:
+        tenant_id = get_tenant_id_for_user(email)
+        if not tenant_id:
+            logger.error(f"No tenant found for user: {email}")
+            return False
+
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM price_items WHERE tenant_id = %s;", (tenant_id,))
+                rows = _price_item_rows(tenant_id, price_list)
+                if rows:
+                    psycopg2.extras.execute_values(cur, """
+                    INSERT INTO price_items (tenant_id, normalized_name, name, unit, price)
+                    VALUES %s;
+                    """, rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
         return True
     except Exception as e:
         logger.error(f"Error saving price list: {e}")
         return False
 
-def initialize_price_lists():
-    """Migrate existing price_list.json to database if needed."""
+def upsert_price_item(email, name, unit, price, old_name=None):
+    """
+    Insert or update a single price list item
+
+    Args:
+        email (str): User's email, used to find the tenant
+        name (str): Item name
+        unit (str): Unit the price applies to
+        price (float): Price per unit
+        old_name (str, optional): Previous name when the item is being renamed
+
+    Returns:
+        bool: True if the item was saved
+    """
     try:
-        # Get all tenants
-        query = "SELECT id FROM tenants WHERE deleted_at IS NULL;"
-        tenants = execute_query(query)
+        tenant_id = get_tenant_id_for_user(email)
+        if not tenant_id:
+            logger.error(f"No tenant found for user: {email}")
+            return False
+
+        normalized_name = normalize_item_name(name)
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                if old_name and normalize_item_name(old_name) != normalized_name:
+                    cur.execute("""
+                    DELETE FROM price_items
+                    WHERE tenant_id = %s AND normalized_name = %s;
+                    """, (tenant_id, normalize_item_name(old_name)))
+
+                cur.execute("""
+                INSERT INTO price_items (tenant_id, normalized_name, name, unit, price)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (tenant_id, normalized_name)
+                DO UPDATE SET
+                    name = EXCLUDED.name,
+                    unit = EXCLUDED.unit,
+                    price = EXCLUDED.price,
+                    updated_at = now();
+                """, (tenant_id, normalized_name, name.strip(), unit, price))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        return True
+    except Exception as e:
+        logger.error(f"Error saving price item: {e}")
+        return False
+
+def delete_price_item(email, name):
+    """
+    Delete a single price list item
 
+    Returns:
+        bool: True if the item existed and was deleted
+    """
+    try:
+        tenant_id = get_tenant_id_for_user(email)
+        if not tenant_id:
+            logger.error(f"No tenant found for user: {email}")
+            return False
+
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                DELETE FROM price_items
+                WHERE tenant_id = %s AND normalized_name = %s;
+                """, (tenant_id, normalize_item_name(name)))
+                deleted = cur.rowcount > 0
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        return deleted
+    except Exception as e:
+        logger.error(f"Error deleting price item: {e}")
+        return False
+
+def initialize_price_lists():
+    """Seed every tenant that has no price items with the default price_list.json, in one statement."""
+    try:
         # Try to load the existing price_list.json
         try:
             with open('price_list.json', 'r') as f:
@@ -95,20 +288,24 @@ def initialize_price_lists():
         except (FileNotFoundError, json.JSONDecodeError):
             default_prices = {}
 
-        # For each tenant, initialize a price list if they don't have one
-        for tenant in tenants:
-            tenant_id = tenant['id']
-
-            # Check if tenant already has a price list
-            query_check = "SELECT id FROM price_lists WHERE tenant_id = %s;"
-            result = execute_query(query_check, (tenant_id,))
-
-            if not result:
-                # Initialize tenant with default price list
-                query_insert = "INSERT INTO price_lists (tenant_id, prices) VALUES (%s, %s);"
-                execute_query(query_insert, (tenant_id, json.dumps(default_prices)), fetch=False)
-                logger.info(f"Initialized price list for tenant {tenant_id}")
+        if not default_prices:
+            return True
 
+        query = """
+        INSERT INTO price_items (tenant_id, normalized_name, name, unit, price)
+        SELECT t.id,
+               lower(btrim(regexp_replace(item.key, '\\s+', ' ', 'g'))),
+               btrim(item.key),
+               COALESCE(NULLIF(item.value->>'unit', ''), 'unknown'),
+               COALESCE(NULLIF(item.value->>'price', '')::numeric, 0)
+        FROM tenants t
+        CROSS JOIN jsonb_each(%s::jsonb) AS item
+        WHERE t.deleted_at IS NULL
+        AND NOT EXISTS (SELECT 1 FROM price_items pi WHERE pi.tenant_id = t.id)
+        ON CONFLICT (tenant_id, normalized_name) DO NOTHING;
+        """
+        execute_query(query, (to_jsonb(default_prices),), fetch=False)
+        logger.info("Initialized default price lists for tenants without one")
         return True
     except Exception as e:
         logger.error(f"Error initializing price lists: {e}")
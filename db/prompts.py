@@ -6,24 +6,27 @@ from db.connection import execute_query
 # Configure module logger
 logger = logging.getLogger(__name__)
 
+# Lookups run on every prompt load; also profiled by db.diagnostics
+ACTIVE_PROMPTS_QUERY = """
+SELECT id, name, description, system_instruction, user_prompt, version, created_by_email, created_at, updated_at
+FROM prompts 
+WHERE tenant_id = %s AND is_active = true AND deleted_at IS NULL
+ORDER BY name, version DESC
+"""
+
+PROMPT_BY_NAME_QUERY = """
+SELECT id, name, description, system_instruction, user_prompt, version, created_by_email, created_at, updated_at
+FROM prompts 
+WHERE tenant_id = %s AND name = %s AND is_active = true AND deleted_at IS NULL
+"""
+
 def get_active_prompts(tenant_id: str) -> List[Dict[str, Any]]:
     """Get all active prompts for a tenant"""
-    query = """
-    SELECT id, name, description, system_instruction, user_prompt, version, created_by_email, created_at, updated_at
-    FROM prompts 
-    WHERE tenant_id = %s AND is_active = true AND deleted_at IS NULL
-    ORDER BY name, version DESC
-    """
-    return execute_query(query, (tenant_id,))
+    return execute_query(ACTIVE_PROMPTS_QUERY, (tenant_id,))
 
 def get_prompt_by_name(tenant_id: str, name: str) -> Optional[Dict[str, Any]]:
     """Get the active version of a prompt by name"""
-    query = """
-    SELECT id, name, description, system_instruction, user_prompt, version, created_by_email, created_at, updated_at
-    FROM prompts 
-    WHERE tenant_id = %s AND name = %s AND is_active = true AND deleted_at IS NULL
-    """
-    results = execute_query(query, (tenant_id, name))
+    results = execute_query(PROMPT_BY_NAME_QUERY, (tenant_id, name))
     return results[0] if results else None
 
 def get_prompt_versions(tenant_id: str, name: str) -> List[Dict[str, Any]]:
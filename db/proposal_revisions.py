@@ -0,0 +1,293 @@
+import logging
+import psycopg2.extras
+from db.connection import get_db_connection, to_jsonb, json_dumps
+from db.tenants import get_tenant_id_by_user_email
+
+logger = logging.getLogger(__name__)
+
+# Write a full snapshot after this many deltas, so rebuilding any revision replays a bounded chain
+SNAPSHOT_INTERVAL = 25
+
+# Saves by the same user within this window are folded into the previous delta row
+MERGE_WINDOW = '60 seconds'
+
+# ...but a merged row never spans more than this, so history keeps some granularity
+MAX_MERGE_SPAN = '10 minutes'
+
+class PatchError(ValueError):
+    """Raised when a patch can't be applied to the proposal content."""
+
+def diff_ops(old, new):
+    """
+    Describe the change from old to new as splice ops
+
+    Trims the common prefix and suffix, which is what a single edit in a
+    textarea between two autosaves produces.
+
+    Returns:
+        list: [{'start', 'end', 'text'}], or an empty list if nothing changed
+    """
+    if old == new:
+        return []
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit and old[start] == new[start]:
+        start += 1
+    end_old, end_new = len(old), len(new)
+    while end_old > start and end_new > start and old[end_old - 1] == new[end_new - 1]:
+        end_old -= 1
+        end_new -= 1
+    return [{'start': start, 'end': end_old, 'text': new[start:end_new]}]
+
+def apply_ops(text, ops):
+    """
+    Apply splice ops to text, in order
+
+    Each op replaces text[start:end] with its 'text'; offsets refer to the
+    result of the previous op and count Unicode code points.
+
+    Raises:
+        PatchError: If an op is malformed or out of range
+    """
+    if not isinstance(ops, list):
+        raise PatchError("ops must be a list")
+    for op in ops:
+        try:
+            start, end, insert = op['start'], op['end'], op.get('text') or ''
+        except (KeyError, TypeError, AttributeError):
+            raise PatchError(f"Malformed op: {op!r}")
+        if not isinstance(start, int) or not isinstance(end, int) or not isinstance(insert, str):
+            raise PatchError(f"Malformed op: {op!r}")
+        if not 0 <= start <= end <= len(text):
+            raise PatchError(f"Op {start}:{end} is out of range for content of length {len(text)}")
+        text = text[:start] + insert + text[end:]
+    return text
+
+def _record_revision(cur, proposal, tenant_id, user_email, ops, new_content, status=None):
+    """Store a change to a locked proposal row and advance its head revision."""
+    proposal_id = proposal['proposal_id']
+    head = proposal['head_revision']
+    revision = head + 1
+
+    cur.execute("""
+    SELECT revision, ops IS NOT NULL AS is_delta, created_by_email,
+           updated_at > now() - %s::interval AND created_at > now() - %s::interval AS mergeable
+    FROM proposal_revisions
+    WHERE proposal_id = %s
+    ORDER BY revision DESC
+    LIMIT 1
+    """, (MERGE_WINDOW, MAX_MERGE_SPAN, proposal_id))
+    latest = cur.fetchone()
+
+    if latest is None:
+        # History starts with the content as it was before the first tracked change
+        cur.execute("""
+        INSERT INTO proposal_revisions (proposal_id, revision, tenant_id, snapshot, content_length, created_by_email)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        """, (proposal_id, head, tenant_id, proposal['proposal_content'],
+              len(proposal['proposal_content']), proposal['created_by_email']))
+
+    cur.execute("""
+    SELECT count(*) AS deltas
+    FROM proposal_revisions
+    WHERE proposal_id = %s AND ops IS NOT NULL
+      AND revision > (SELECT COALESCE(max(revision), -1) FROM proposal_revisions
+                      WHERE proposal_id = %s AND snapshot IS NOT NULL)
+    """, (proposal_id, proposal_id))
+    deltas = cur.fetchone()['deltas']
+
+    if (latest and latest['is_delta'] and latest['mergeable']
+            and latest['revision'] == head and latest['created_by_email'] == user_email):
+        # Debounce: fold this save into the previous delta instead of adding a row
+        cur.execute("""
+        UPDATE proposal_revisions
+        SET revision = %s, ops = ops || %s::jsonb, content_length = %s, updated_at = now()
+        WHERE proposal_id = %s AND revision = %s
+        """, (revision, json_dumps(ops), len(new_content), proposal_id, head))
+    elif deltas >= SNAPSHOT_INTERVAL:
+        cur.execute("""
+        INSERT INTO proposal_revisions (proposal_id, revision, tenant_id, snapshot, content_length, created_by_email)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        """, (proposal_id, revision, tenant_id, new_content, len(new_content), user_email))
+    else:
+        cur.execute("""
+        INSERT INTO proposal_revisions (proposal_id, revision, tenant_id, ops, content_length, created_by_email)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        """, (proposal_id, revision, tenant_id, to_jsonb(ops), len(new_content), user_email))
+
+    cur.execute("""
+    UPDATE proposals
+    SET proposal_content = %s, head_revision = %s, status = COALESCE(%s, status), updated_at = now()
+    WHERE proposal_id = %s
+    """, (new_content, revision, status, proposal_id))
+    return revision
+
+def _lock_proposal(cur, proposal_id, tenant_id):
+    cur.execute("""
+    SELECT proposal_id, proposal_content, head_revision, created_by_email
+    FROM proposals
+    WHERE proposal_id = %s AND tenant_id = %s AND deleted_at IS NULL
+    FOR UPDATE
+    """, (proposal_id, tenant_id))
+    return cur.fetchone()
+
+def save_proposal_patch(proposal_id: str, user_email: str, base_revision: int, ops: list, expected_length: int = None):
+    """
+    Apply a client-side patch to a proposal
+
+    Args:
+        proposal_id (str): Proposal to patch
+        user_email (str): User making the change
+        base_revision (int): Revision the client computed the patch against
+        ops (list): Splice ops, see apply_ops
+        expected_length (int, optional): Length of the client's content after the patch,
+            used to catch offset mismatches
+
+    Returns:
+        dict: {'status': 'saved' | 'unchanged' | 'conflict' | 'not_found', 'revision': int}.
+            On 'conflict' the client should resend its full content.
+
+    Raises:
+        PatchError: If the ops can't be applied
+    """
+    tenant_id = get_tenant_id_by_user_email(user_email)
+    if not tenant_id:
+        logger.error(f"No tenant found for user: {user_email}")
+        return {'status': 'not_found', 'revision': None}
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            proposal = _lock_proposal(cur, proposal_id, tenant_id)
+            if not proposal:
+                conn.rollback()
+                return {'status': 'not_found', 'revision': None}
+
+            head = proposal['head_revision']
+            if base_revision != head:
+                conn.rollback()
+                return {'status': 'conflict', 'revision': head}
+
+            new_content = apply_ops(proposal['proposal_content'], ops)
+            if expected_length is not None and len(new_content) != expected_length:
+                conn.rollback()
+                return {'status': 'conflict', 'revision': head}
+            if new_content == proposal['proposal_content']:
+                conn.rollback()
+                return {'status': 'unchanged', 'revision': head}
+
+            revision = _record_revision(cur, proposal, tenant_id, user_email, ops, new_content)
+        conn.commit()
+        logger.info(f"Saved revision {revision} of proposal {proposal_id}")
+        return {'status': 'saved', 'revision': revision}
+    except Exception as e:
+        conn.rollback()
+        if not isinstance(e, PatchError):
+            logger.error(f"Error patching proposal {proposal_id}: {e}")
+        raise
+
+def save_proposal_content(proposal_id: str, user_email: str, proposal_content: str, status: str = None):
+    """
+    Save the full content of a proposal, storing only the diff from the current head
+
+    Returns:
+        dict: {'status': 'saved' | 'unchanged' | 'not_found', 'revision': int}
+    """
+    tenant_id = get_tenant_id_by_user_email(user_email)
+    if not tenant_id:
+        logger.error(f"No tenant found for user: {user_email}")
+        return {'status': 'not_found', 'revision': None}
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            proposal = _lock_proposal(cur, proposal_id, tenant_id)
+            if not proposal:
+                conn.rollback()
+                return {'status': 'not_found', 'revision': None}
+
+            ops = diff_ops(proposal['proposal_content'], proposal_content)
+            if not ops:
+                if status:
+                    cur.execute("UPDATE proposals SET status = %s, updated_at = now() WHERE proposal_id = %s",
+                                (status, proposal_id))
+                    conn.commit()
+                else:
+                    conn.rollback()
+                return {'status': 'unchanged', 'revision': proposal['head_revision']}
+
+            revision = _record_revision(cur, proposal, tenant_id, user_email, ops, proposal_content, status)
+        conn.commit()
+        logger.info(f"Saved revision {revision} of proposal {proposal_id}")
+        return {'status': 'saved', 'revision': revision}
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Error saving proposal {proposal_id}: {e}")
+        raise
+
+def get_proposal_revision(proposal_id: str, user_email: str, revision: int):
+    """
+    Rebuild a proposal's content as of a revision
+
+    Returns:
+        str: The content, or None if the revision isn't in the proposal's history
+    """
+    tenant_id = get_tenant_id_by_user_email(user_email)
+    if not tenant_id:
+        logger.error(f"No tenant found for user: {user_email}")
+        return None
+
+    conn = get_db_connection()
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute("""
+        SELECT revision, snapshot
+        FROM proposal_revisions
+        WHERE proposal_id = %s AND tenant_id = %s AND snapshot IS NOT NULL AND revision <= %s
+        ORDER BY revision DESC
+        LIMIT 1
+        """, (proposal_id, tenant_id, revision))
+        base = cur.fetchone()
+        if not base:
+            return None
+
+        cur.execute("""
+        SELECT revision, ops
+        FROM proposal_revisions
+        WHERE proposal_id = %s AND revision > %s AND revision <= %s
+        ORDER BY revision
+        """, (proposal_id, base['revision'], revision))
+        rows = cur.fetchall()
+
+    if base['revision'] != revision and (not rows or rows[-1]['revision'] != revision):
+        # Merged saves leave gaps in the numbering; only stored revisions can be rebuilt
+        return None
+
+    content = base['snapshot']
+    for row in rows:
+        content = apply_ops(content, row['ops'])
+    return content
+
+def list_proposal_revisions(proposal_id: str, user_email: str, limit: int = 50):
+    """
+    List a proposal's stored revisions, newest first
+
+    Returns:
+        list: Dicts with revision, kind ('snapshot' or 'delta'), content_length,
+            created_by_email, created_at and updated_at
+    """
+    tenant_id = get_tenant_id_by_user_email(user_email)
+    if not tenant_id:
+        logger.error(f"No tenant found for user: {user_email}")
+        return []
+
+    conn = get_db_connection()
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute("""
+        SELECT revision, CASE WHEN snapshot IS NOT NULL THEN 'snapshot' ELSE 'delta' END AS kind,
+               content_length, created_by_email, created_at, updated_at
+        FROM proposal_revisions
+        WHERE proposal_id = %s AND tenant_id = %s
+        ORDER BY revision DESC
+        LIMIT %s
+        """, (proposal_id, tenant_id, limit))
+        return [dict(row) for row in cur.fetchall()]
@@ -50,43 +50,17 @@ def create_proposal(estimate_id: str, proposal_content: str, user_email: str, st
         return None
 
 def update_proposal(proposal_id: str, proposal_content: str, user_email: str, status: str = None):
-    """Update an existing proposal"""
+    """Update an existing proposal, recording the change in its revision history"""
+    from db.proposal_revisions import save_proposal_content
+
     try:
-        tenant_id = get_tenant_id_by_user_email(user_email)
-        if not tenant_id:
-            logger.error(f"No tenant found for user: {user_email}")
+        result = save_proposal_content(proposal_id, user_email, proposal_content, status)
+        if result['status'] == 'not_found':
+            logger.error(f"Proposal {proposal_id} not found for user: {user_email}")
             return False
-        
-        # Build query dynamically based on what we're updating
-        if status:
-            query = """
-            UPDATE proposals 
-            SET proposal_content = %s, status = %s, updated_at = now()
-            WHERE proposal_id = %s AND tenant_id = %s AND deleted_at IS NULL
-            """
-            params = (proposal_content, status, proposal_id, tenant_id)
-        else:
-            query = """
-            UPDATE proposals 
-            SET proposal_content = %s, updated_at = now()
-            WHERE proposal_id = %s AND tenant_id = %s AND deleted_at IS NULL
-            """
-            params = (proposal_content, proposal_id, tenant_id)
-        
-        # Use direct connection for proper transaction handling
-        conn = get_db_connection()
-        
-        try:
-            with conn.cursor() as cur:
-                cur.execute(query, params)
-                conn.commit()
-                logger.info(f"Updated proposal {proposal_id}")
-                return True
-        except Exception as e:
-            conn.rollback()
-            logger.error(f"Error executing update proposal query: {e}")
-            raise
-        
+        logger.info(f"Updated proposal {proposal_id}")
+        return True
+
     except Exception as e:
         logger.error(f"Error updating proposal {proposal_id}: {e}")
         return False
@@ -161,8 +135,8 @@ def get_proposals_by_estimate(estimate_id: str, user_email: str):
         logger.error(f"Error getting proposals for estimate {estimate_id}: {e}")
         return []
 
-def get_all_proposals(user_email: str):
-    """Get all proposals for a tenant"""
+def get_proposals_for_export(proposal_ids, user_email: str):
+    """Get proposals with their estimate's customer data for exporting to Drive"""
     try:
         tenant_id = get_tenant_id_by_user_email(user_email)
         if not tenant_id:
@@ -170,13 +144,15 @@ def get_all_proposals(user_email: str):
             return []
         
         query = """
-        SELECT proposal_id, estimate_id, proposal_content, status, created_by_email, created_at, updated_at
-        FROM proposals 
-        WHERE tenant_id = %s AND deleted_at IS NULL
-        ORDER BY created_at DESC
+        SELECT p.proposal_id, p.estimate_id, p.proposal_content, p.status, p.created_at,
+               e.customer_data, e.project_details
+        FROM proposals p
+        LEFT JOIN estimates e ON e.estimate_id = p.estimate_id AND e.tenant_id = p.tenant_id
+        WHERE p.tenant_id = %s AND p.proposal_id = ANY(%s::uuid[]) AND p.deleted_at IS NULL
+        ORDER BY p.created_at
         """
         
-        params = (tenant_id,)
+        params = (tenant_id, list(proposal_ids))
         
         conn = get_db_connection()
         try:
@@ -187,11 +163,127 @@ def get_all_proposals(user_email: str):
                 return [dict(row) for row in results]
                 
         except Exception as e:
-            logger.error(f"Error executing get all proposals query: {e}")
+            conn.rollback()
+            logger.error(f"Error executing get proposals for export query: {e}")
             raise
         
+    except Exception as e:
+        logger.error(f"Error getting proposals for export: {e}")
         return []
+
+# Listing query behind list_proposal_summaries; also profiled by db.diagnostics
+PROPOSAL_SUMMARIES_QUERY = """
+SELECT p.proposal_id, p.estimate_id, p.status, p.created_by_email, p.created_at, p.updated_at,
+       e.customer_data->>'name' AS customer_name
+FROM proposals p
+LEFT JOIN estimates e ON e.estimate_id = p.estimate_id AND e.tenant_id = p.tenant_id
+WHERE {conditions}
+ORDER BY p.created_at DESC, p.proposal_id DESC
+LIMIT %s
+"""
+
+def _proposal_filters(tenant_id, status=None, estimate_id=None, created_from=None, created_to=None):
+    """WHERE conditions and parameters for listing a tenant's live proposals"""
+    conditions = ["p.tenant_id = %s", "p.deleted_at IS NULL"]
+    params = [tenant_id]
+    
+    if status:
+        conditions.append("p.status = %s")
+        params.append(status)
+    if estimate_id:
+        conditions.append("p.estimate_id = %s")
+        params.append(estimate_id)
+    if created_from:
+        conditions.append("p.created_at >= %s::date")
+        params.append(created_from)
+    if created_to:
+        # Inclusive of the whole end day
+        conditions.append("p.created_at < %s::date + 1")
+        params.append(created_to)
+    return conditions, params
+
+def list_proposal_summaries(user_email: str, limit: int = 50, cursor: str = None,
+                            status: str = None, estimate_id: str = None,
+                            created_from=None, created_to=None):
+    """Get a page of proposals for a tenant without their content, newest first
+    
+    created_from and created_to (dates, inclusive) limit the creation date.
+    
+    Returns:
+        tuple: (list of proposal summaries, cursor for the next page or None)
+    """
+    from db.pagination import encode_cursor, decode_cursor, clamp_page_size
+    
+    try:
+        tenant_id = get_tenant_id_by_user_email(user_email)
+        if not tenant_id:
+            logger.error(f"No tenant found for user: {user_email}")
+            return [], None
+        
+        limit = clamp_page_size(limit)
+        conditions, params = _proposal_filters(tenant_id, status, estimate_id, created_from, created_to)
+        
+        position = decode_cursor(cursor)
+        if position:
+            conditions.append("(p.created_at, p.proposal_id) < (%s, %s::uuid)")
+            params.extend(position)
+        
+        # Fetch one extra row to know whether another page exists
+        params.append(limit + 1)
+        
+        query = PROPOSAL_SUMMARIES_QUERY.format(conditions=' AND '.join(conditions))
+        
+        conn = get_db_connection()
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(query, tuple(params))
+                results = [dict(row) for row in cur.fetchall()]
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error executing list proposal summaries query: {e}")
+            raise
+        
+        next_cursor = None
+        if len(results) > limit:
+            last = results[limit - 1]
+            next_cursor = encode_cursor(last['created_at'], last['proposal_id'])
+        
+        return results[:limit], next_cursor
+        
+    except Exception as e:
+        logger.error(f"Error listing proposals: {e}")
+        return [], None
+
+def list_proposal_ids(user_email: str, status: str = None, created_from=None, created_to=None):
+    """Get the IDs of every proposal matching the filters, oldest first, for bulk operations
+    
+    Returns:
+        list: Proposal IDs as strings
+    """
+    try:
+        tenant_id = get_tenant_id_by_user_email(user_email)
+        if not tenant_id:
+            logger.error(f"No tenant found for user: {user_email}")
+            return []
+        
+        conditions, params = _proposal_filters(tenant_id, status, None, created_from, created_to)
+        query = f"""
+        SELECT p.proposal_id
+        FROM proposals p
+        WHERE {' AND '.join(conditions)}
+        ORDER BY p.created_at, p.proposal_id
+        """
+        
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(query, tuple(params))
+                return [str(row[0]) for row in cur.fetchall()]
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error executing list proposal IDs query: {e}")
+            raise
         
     except Exception as e:
-        logger.error(f"Error getting all proposals: {e}")
+        logger.error(f"Error listing proposal IDs: {e}")
         return []
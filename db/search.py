@@ -0,0 +1,127 @@
+import logging
+from db.connection import execute_query
+from db.pagination import clamp_page_size
+from db.tenants import get_tenant_id_by_user_email
+
+logger = logging.getLogger(__name__)
+
+# What can be searched
+SEARCH_KINDS = ('all', 'estimates', 'proposals')
+
+# Marks the matched words in snippets; the caller escapes the text and swaps these for markup
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+_HEADLINE_OPTIONS = f"MaxFragments=2, MaxWords=18, MinWords=6, FragmentDelimiter=' … ', StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}"
+
+_ESTIMATE_HITS = """
+SELECT 'estimate' AS kind, e.estimate_id AS id, e.estimate_id, e.created_at,
+       ts_rank_cd(e.search_vector, q.query) AS rank
+FROM estimates e, q
+WHERE e.tenant_id = %(tenant_id)s AND e.deleted_at IS NULL AND e.search_vector @@ q.query
+"""
+
+_PROPOSAL_HITS = """
+SELECT 'proposal' AS kind, p.proposal_id AS id, p.estimate_id, p.created_at,
+       ts_rank_cd(p.search_vector, q.query) AS rank
+FROM proposals p, q
+WHERE p.tenant_id = %(tenant_id)s AND p.deleted_at IS NULL AND p.search_vector @@ q.query
+"""
+
+def search(user_email, query, kind='all', page=1, page_size=20):
+    """
+    Full-text search over a tenant's estimates and proposals
+
+    Matches customer names, addresses, notes, line items and proposal text,
+    ranked by relevance. Snippets are only built for the rows on the page.
+
+    Args:
+        user_email (str): User searching, used to find the tenant
+        query (str): Search text; supports "quoted phrases", OR and -exclusions
+        kind (str): One of SEARCH_KINDS
+        page (int): 1-based page number
+        page_size (int): Results per page, capped at MAX_PAGE_SIZE
+
+    Returns:
+        tuple: (list of result dicts, total number of matches)
+    """
+    if not query or not query.strip():
+        return [], 0
+
+    tenant_id = get_tenant_id_by_user_email(user_email)
+    if not tenant_id:
+        logger.error(f"No tenant found for user: {user_email}")
+        return [], 0
+
+    page_size = clamp_page_size(page_size)
+    page = max(int(page or 1), 1)
+
+    hits = []
+    if kind in ('all', 'estimates'):
+        hits.append(_ESTIMATE_HITS)
+    if kind in ('all', 'proposals'):
+        hits.append(_PROPOSAL_HITS)
+    if not hits:
+        return [], 0
+
+    sql = f"""
+    WITH q AS (
+      -- Stemmed terms (indexed for every field) or exact terms (names and addresses)
+      SELECT websearch_to_tsquery('english', %(query)s) || websearch_to_tsquery('simple', %(query)s) AS query
+    ),
+    hits AS ({' UNION ALL '.join(hits)}),
+    page AS (
+      SELECT hits.*, count(*) OVER () AS total_count
+      FROM hits
+      ORDER BY rank DESC, created_at DESC, id
+      LIMIT %(limit)s OFFSET %(offset)s
+    )
+    SELECT page.kind, page.id, page.estimate_id, page.created_at, page.rank, page.total_count,
+           e.customer_data->>'name' AS customer_name,
+           e.total_cost,
+           p.status AS proposal_status,
+           CASE WHEN page.kind = 'proposal'
+             THEN ts_headline('english', p.proposal_content, q.query, %(headline)s)
+             ELSE ts_headline('english',
+                              concat_ws(' · ', e.customer_data->>'name', e.customer_data->>'address',
+                                        e.customer_data->>'project_address', e.project_details->>'notes',
+                                        estimate_line_item_names(e.line_items)),
+                              q.query, %(headline)s)
+           END AS snippet
+    FROM page
+    CROSS JOIN q
+    LEFT JOIN estimates e ON e.estimate_id = page.estimate_id
+    LEFT JOIN proposals p ON page.kind = 'proposal' AND p.proposal_id = page.id
+    ORDER BY page.rank DESC, page.created_at DESC, page.id;
+    """
+    params = {
+        'tenant_id': tenant_id,
+        'query': query.strip(),
+        'limit': page_size,
+        'offset': (page - 1) * page_size,
+        'headline': _HEADLINE_OPTIONS
+    }
+
+    try:
+        result = execute_query(sql, params) or []
+    except Exception as e:
+        logger.error(f"Error searching for {query!r}: {e}")
+        return [], 0
+
+    if not result:
+        if page > 1:
+            # Past the last page; still report how many results match
+            count_sql = f"""
+            WITH q AS (SELECT websearch_to_tsquery('english', %(query)s) || websearch_to_tsquery('simple', %(query)s) AS query),
+            hits AS ({' UNION ALL '.join(hits)})
+            SELECT count(*) AS total_count FROM hits;
+            """
+            return [], execute_query(count_sql, params)[0]['total_count']
+        return [], 0
+
+    total = result[0]['total_count']
+    for row in result:
+        row.pop('total_count')
+        row['id'] = str(row['id'])
+        row['estimate_id'] = str(row['estimate_id']) if row['estimate_id'] else None
+    return result, total
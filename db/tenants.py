@@ -42,6 +42,58 @@ def get_tenant_id_by_user_email(email):
         logger.error(f"Error getting tenant ID for user: {e}")
         return None
 
+def create_user(tenant_id, email, name, role='STANDARD_USER'):
+    """
+    Add a user to a tenant
+
+    Args:
+        tenant_id (str): Tenant the user belongs to
+        email (str): User's email
+        name (str): Display name
+        role (str): One of the user_role enum values
+
+    Returns:
+        bool: True if the user was created
+    """
+    query = """
+    INSERT INTO users (tenant_id, email, name, role)
+    VALUES (%s, %s, %s, %s);
+    """
+    try:
+        execute_query(query, (tenant_id, email, name, role), fetch=False)
+    except Exception as e:
+        logger.error(f"Error creating user {email}: {e}")
+        return False
+    # A rejected sign-in may be cached for this email
+    from auth_directory import get_auth_directory
+    get_auth_directory().invalidate(email)
+    return True
+
+# Tenants on these plans may sign in
+ALLOWED_PLAN_LEVELS = ('super', 'basic')
+
+def is_email_allowed(email):
+    """
+    Check whether a single email belongs to a user of a tenant on an allowed plan
+
+    Returns:
+        bool: Whether the user may sign in, or None if the lookup failed
+    """
+    try:
+        query = """
+        SELECT 1
+        FROM users JOIN tenants ON users.tenant_id = tenants.id
+        WHERE users.email = %s
+        AND tenants.plan_level = ANY(%s)
+        AND users.deleted_at IS NULL
+        LIMIT 1;
+        """
+        result = execute_query(query, (email, list(ALLOWED_PLAN_LEVELS)))
+        return bool(result)
+    except Exception as e:
+        logger.error(f"Error checking whether {email} is allowed: {e}")
+        return None
+
 def update_allowed_users_from_db():
     """
     Get all tenants with plan_level 'super' or 'basic'
@@ -50,11 +102,11 @@ def update_allowed_users_from_db():
         query = """
         SELECT users.email 
         FROM users JOIN tenants ON users.tenant_id = tenants.id 
-        WHERE tenants.plan_level IN ('super', 'basic')
+        WHERE tenants.plan_level = ANY(%s)
         AND users.deleted_at IS NULL;
         """
 
-        result = execute_query(query)
+        result = execute_query(query, (list(ALLOWED_PLAN_LEVELS),))
         if result:
             return [tenant['email'] for tenant in result if tenant.get('email')]
         return []
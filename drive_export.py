@@ -0,0 +1,247 @@
+import heapq
+import random
+import logging
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+class DriveExportQueue:
+    """Runs "save to Drive" jobs on background threads instead of web workers.
+
+    Job state is kept in the drive_export_jobs table so any worker process can
+    report it; the OAuth credentials captured at enqueue time only live in memory.
+    Transient Drive errors reschedule the job with exponential backoff rather than
+    sleeping on a thread.
+
+    Jobs run on daemon threads of the web process that accepted them. A restart,
+    worker recycle, or an autoscaled instance being stopped or frozen once it
+    stops serving requests ends them; such jobs are marked failed (the user is
+    asked to export again) by the first enqueue or status check after they have
+    been unchanged for stale_after seconds.
+    """
+
+    def __init__(self, num_workers=2, max_attempts=6, base_delay=2, max_delay=300, stale_after=3600):
+        self.num_workers = num_workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Well past the longest retry schedule, so only jobs whose process is gone are affected
+        self.stale_after = stale_after
+        self.handlers = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._last_sweep = None
+
+    def register_handler(self, job_type, handler):
+        """Register the function that performs jobs of the given type."""
+        self.handlers[job_type] = handler
+
+    def enqueue(self, user_email, tenant_id, credentials_info, title, payload, job_type='proposal'):
+        """Record a job and schedule it to run as soon as a worker is free.
+
+        Returns:
+            str: The job ID, or None if the job could not be recorded
+        """
+        from db.drive_exports import create_export_job
+
+        self.fail_stale_jobs()
+        if job_type not in self.handlers:
+            raise ValueError(f"No handler registered for Drive export job type '{job_type}'")
+
+        job_id = create_export_job(tenant_id, user_email, title, job_type=job_type)
+        if not job_id:
+            return None
+
+        task = {
+            'job_id': job_id,
+            'job_type': job_type,
+            'app': current_app._get_current_object(),
+            'credentials_info': dict(credentials_info),
+            'payload': dict(payload, user_email=user_email, tenant_id=tenant_id),
+            'attempts': 0
+        }
+        self._ensure_workers()
+        self._schedule(task)
+        logger.info(f"Queued Drive export job {job_id} ({job_type}) for {user_email}")
+        return job_id
+
+    def fail_stale_jobs(self):
+        """Fail jobs left unfinished by a process that restarted or was recycled.
+
+        Their credentials were only held in that process's memory, so they
+        cannot be resumed; the user is told to export again instead. Runs at
+        most once every stale_after seconds per process.
+
+        Returns:
+            int: Number of jobs marked as failed
+        """
+        from db.drive_exports import fail_stale_export_jobs
+
+        now = time.monotonic()
+        with self._condition:
+            if self._last_sweep is not None and now - self._last_sweep < self.stale_after:
+                return 0
+            self._last_sweep = now
+
+        count = fail_stale_export_jobs(timedelta(seconds=self.stale_after))
+        if count:
+            logger.warning(f"Marked {count} interrupted Drive export jobs as failed")
+        return count
+
+    def _ensure_workers(self):
+        with self._condition:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.num_workers:
+                thread = threading.Thread(target=self._worker, name=f"drive-export-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _schedule(self, task, delay=0):
+        with self._condition:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._counter), task))
+            self._condition.notify()
+
+    def _next_task(self):
+        """Block until the earliest scheduled task is due and return it."""
+        with self._condition:
+            while True:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                ready_at = self._heap[0][0]
+                now = time.monotonic()
+                if ready_at <= now:
+                    return heapq.heappop(self._heap)[2]
+                self._condition.wait(timeout=ready_at - now)
+
+    def _worker(self):
+        while True:
+            task = self._next_task()
+            try:
+                self._run(task)
+            except Exception as e:
+                logger.error(f"Unexpected error in Drive export job {task['job_id']}: {e}", exc_info=True)
+
+    def _run(self, task):
+        from google_services import background_api_context, is_retryable_error
+        from db.drive_exports import update_export_job
+
+        job_id = task['job_id']
+        task['attempts'] += 1
+
+        with task['app'].app_context():
+            update_export_job(job_id, 'running', attempts=task['attempts'])
+            try:
+                with background_api_context(task['credentials_info']):
+                    result = self.handlers[task['job_type']](task['payload'])
+            except Exception as e:
+                if is_retryable_error(e) and task['attempts'] < self.max_attempts:
+                    delay = min(self.base_delay * (2 ** (task['attempts'] - 1)) + random.uniform(0, 1), self.max_delay)
+                    next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+                    logger.warning(f"Drive export job {job_id} failed with a transient error, retrying in {delay:.2f} seconds (attempt {task['attempts']}/{self.max_attempts})")
+                    update_export_job(job_id, 'retrying', error=str(e), next_attempt_at=next_attempt_at)
+                    self._schedule(task, delay)
+                    return
+                logger.error(f"Drive export job {job_id} failed: {e}", exc_info=True)
+                update_export_job(job_id, 'failed', error=str(e))
+                return
+
+            if not result:
+                update_export_job(job_id, 'failed', error='Failed to create Google Drive folder or Google Doc.')
+                return
+
+            update_export_job(job_id, 'succeeded', result=result)
+            logger.info(f"Drive export job {job_id} succeeded")
+
+def export_proposal(payload):
+    """Save a single proposal document into the tenant's project folder."""
+    from google_services import save_doc_to_project_folder
+
+    return save_doc_to_project_folder(
+        payload['title'],
+        payload['content'],
+        payload['tenant_id'],
+        payload.get('customer_data'),
+        payload.get('project_data'),
+        user_email=payload['user_email']
+    )
+
+def _proposal_doc_title(proposal):
+    customer = proposal.get('customer_data') or {}
+    title = f"Proposal - {customer.get('name', 'Unknown')} - {customer.get('project_address', 'Unknown')}"
+    if proposal.get('created_at'):
+        title += f" - {proposal['created_at']:%Y-%m-%d}"
+    return title
+
+def export_proposals_bulk(payload):
+    """Save many stored proposals to Drive and report a result per proposal.
+
+    Target folders are resolved together up front; docs are then uploaded with
+    bounded concurrency. Docs whose folder turns out to be gone are retried once
+    after the folder cache is invalidated.
+    """
+    from db.proposals import get_proposals_for_export
+    from google_services import (resolve_project_folders, create_docs_concurrently,
+                                 invalidate_folder, get_context_credentials)
+
+    user_email = payload['user_email']
+    tenant_id = payload['tenant_id']
+    proposal_ids = payload['proposal_ids']
+
+    proposals = get_proposals_for_export(proposal_ids, user_email)
+    found = {str(p['proposal_id']): p for p in proposals}
+    items = {proposal_id: {'proposal_id': proposal_id, 'status': 'failed', 'error': 'Proposal not found'}
+             for proposal_id in proposal_ids if proposal_id not in found}
+
+    folder_ids = resolve_project_folders(tenant_id, [p.get('customer_data') for p in proposals], user_email)
+    documents = [{
+        'proposal_id': str(proposal['proposal_id']),
+        'title': _proposal_doc_title(proposal),
+        'content': proposal['proposal_content'],
+        'customer_data': proposal.get('customer_data'),
+        'folder_id': folder_id
+    } for proposal, folder_id in zip(proposals, folder_ids)]
+
+    credentials_info = get_context_credentials()
+    results = create_docs_concurrently(documents, credentials_info)
+
+    # Re-resolve folders that were deleted in Drive since they were cached, then retry those docs
+    missing = [(document, result) for document, result in zip(documents, results) if result.get('folder_missing')]
+    if missing:
+        for folder_id in {document['folder_id'] for document, _ in missing}:
+            invalidate_folder(folder_id, tenant_id, user_email)
+        retry_documents = [document for document, _ in missing]
+        retry_folder_ids = resolve_project_folders(tenant_id, [d['customer_data'] for d in retry_documents], user_email)
+        for document, folder_id in zip(retry_documents, retry_folder_ids):
+            document['folder_id'] = folder_id
+        retry_results = iter(create_docs_concurrently(retry_documents, credentials_info))
+        results = [next(retry_results) if result.get('folder_missing') else result for result in results]
+
+    for document, result in zip(documents, results):
+        result.pop('folder_missing', None)
+        items[document['proposal_id']] = dict(result, proposal_id=document['proposal_id'], title=document['title'])
+
+    ordered = [items[proposal_id] for proposal_id in proposal_ids]
+    succeeded = sum(1 for item in ordered if item['status'] == 'succeeded')
+    logger.info(f"Bulk Drive export for {user_email}: {succeeded}/{len(ordered)} proposals saved")
+    return {
+        'total': len(ordered),
+        'succeeded': succeeded,
+        'failed': len(ordered) - succeeded,
+        'items': ordered
+    }
+
+# Create a singleton instance
+drive_export_queue = DriveExportQueue()
+drive_export_queue.register_handler('proposal', export_proposal)
+drive_export_queue.register_handler('bulk_proposals', export_proposals_bulk)
+
+def get_drive_export_queue():
+    """Get the singleton DriveExportQueue instance."""
+    return drive_export_queue
@@ -1,7 +1,17 @@
 
 import time
 import random
+import hashlib
 import logging
+import threading
+from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from collections import OrderedDict
+import httplib2
+from instrumentation import InstrumentedHttp
+from logging_config import payload
+import google_auth_httplib2
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
@@ -9,17 +19,34 @@ from flask import session
 
 logger = logging.getLogger(__name__)
 
+# Service clients are cached per thread because httplib2 transports are not thread-safe
+SERVICE_CACHE_MAX_ENTRIES = 32
+SERVICE_CACHE_TTL = 3000  # seconds, just under the lifetime of a Google access token
+HTTP_TIMEOUT = 30  # seconds
+
+# Bulk exports: Drive accepts at most 100 calls per batch request
+DRIVE_BATCH_LIMIT = 100
+BULK_EXPORT_CONCURRENCY = 4
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+_service_cache = threading.local()
+_api_context = threading.local()
+
 def retry_with_backoff(max_retries=3, base_delay=1, max_delay=60):
     """Decorator to add retry logic with exponential backoff for Google API calls"""
     def decorator(func):
+        @wraps(func)
         def wrapper(*args, **kwargs):
             for attempt in range(max_retries + 1):
                 try:
                     return func(*args, **kwargs)
                 except HttpError as e:
                     # Check if it's a rate limit error (429) or server error (5xx)
-                    if e.resp.status in [429, 500, 502, 503, 504]:
-                        if attempt < max_retries:
+                    if e.resp.status in RETRYABLE_STATUSES:
+                        # Background jobs reschedule themselves instead of sleeping here
+                        if attempt < max_retries and not getattr(_api_context, 'defer_retries', False):
                             # Calculate delay with exponential backoff and jitter
                             delay = min(base_delay * (2 ** attempt) + random.uniform(0, 1), max_delay)
                             logger.warning(f"API call failed with status {e.resp.status}, retrying in {delay:.2f} seconds (attempt {attempt + 1}/{max_retries})")
@@ -34,12 +61,85 @@ def retry_with_backoff(max_retries=3, base_delay=1, max_delay=60):
         return wrapper
     return decorator
 
-def get_service(service_name, version):
-    if 'credentials' not in session:
-        return None
-        
-    credentials = Credentials(**session['credentials'])
-    return build(service_name, version, credentials=credentials)
+def _credentials_key(credentials_info):
+    """Return a stable cache key for a set of OAuth credentials without storing the raw token."""
+    token = credentials_info.get('token') or credentials_info.get('refresh_token') or ''
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def _get_thread_cache():
+    cache = getattr(_service_cache, 'entries', None)
+    if cache is None:
+        cache = OrderedDict()
+        _service_cache.entries = cache
+    return cache
+
+def _get_cache_entry(credentials_info):
+    """Get or create the cached transport for these credentials on the current thread."""
+    cache = _get_thread_cache()
+    key = _credentials_key(credentials_info)
+    now = time.monotonic()
+
+    entry = cache.get(key)
+    if entry is not None and now - entry['created_at'] > SERVICE_CACHE_TTL:
+        cache.pop(key, None)
+        entry = None
+
+    if entry is None:
+        credentials = Credentials(**credentials_info)
+        # One authorized transport per token, shared by every service built for it
+        http = google_auth_httplib2.AuthorizedHttp(credentials, http=InstrumentedHttp(timeout=HTTP_TIMEOUT))
+        entry = {'http': http, 'services': {}, 'created_at': now}
+        cache[key] = entry
+        while len(cache) > SERVICE_CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(key)
+
+    return entry
+
+@contextmanager
+def background_api_context(credentials_info, defer_retries=True):
+    """Make Google API calls on this thread use captured credentials instead of the session.
+
+    With defer_retries, retryable errors are raised straight away rather than slept on,
+    so the caller can reschedule the work without holding the thread.
+    """
+    previous = (getattr(_api_context, 'credentials_info', None), getattr(_api_context, 'defer_retries', False))
+    _api_context.credentials_info = credentials_info
+    _api_context.defer_retries = defer_retries
+    try:
+        yield
+    finally:
+        _api_context.credentials_info, _api_context.defer_retries = previous
+
+def get_context_credentials():
+    """Return the credentials set by background_api_context on this thread, if any."""
+    return getattr(_api_context, 'credentials_info', None)
+
+def is_retryable_error(error):
+    """Check whether a Google API error is transient and worth retrying later."""
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRYABLE_STATUSES
+    return isinstance(error, (TimeoutError, ConnectionError, httplib2.HttpLib2Error))
+
+def get_service(service_name, version, credentials_info=None):
+    """Return a cached Google API client for the given credentials (defaults to the session's)."""
+    if credentials_info is None:
+        credentials_info = getattr(_api_context, 'credentials_info', None)
+    if credentials_info is None:
+        if 'credentials' not in session:
+            return None
+        credentials_info = session['credentials']
+
+    entry = _get_cache_entry(credentials_info)
+    service = entry['services'].get((service_name, version))
+    if service is None:
+        # Use the discovery documents bundled with googleapiclient instead of fetching them
+        service = build(service_name, version, http=entry['http'],
+                        cache_discovery=False, static_discovery=True)
+        entry['services'][(service_name, version)] = service
+        logger.debug(f"Built {service_name} {version} service client")
+    return service
 
 def get_drive_service():
     return get_service('drive', 'v3')
@@ -53,18 +153,20 @@ def get_docs_service():
 
 
 
+def _folder_query(folder_name, parent_folder_id=None):
+    """Build the Drive search query for a folder by name under an optional parent."""
+    query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+    if parent_folder_id:
+        query += f" and '{parent_folder_id}' in parents"
+    return query
+
 @retry_with_backoff(max_retries=3)
 def create_folder_if_not_exists(folder_name, parent_folder_id=None):
     drive_service = get_drive_service()
     if not drive_service:
         return None
 
-    # Build search query
-    query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-    if parent_folder_id:
-        query += f" and '{parent_folder_id}' in parents"
-
-    results = drive_service.files().list(q=query, spaces='drive').execute()
+    results = drive_service.files().list(q=_folder_query(folder_name, parent_folder_id), spaces='drive').execute()
     items = results.get('files', [])
 
     if items:
@@ -82,48 +184,44 @@ def create_folder_if_not_exists(folder_name, parent_folder_id=None):
     folder = drive_service.files().create(body=folder_metadata, fields='id').execute()
     return folder.get('id')
 
-def get_or_create_project_folder(tenant_id, customer_data=None, project_data=None):
-    """Get or create the appropriate project folder based on tenant settings."""
-    from db.drive_settings import get_folder_template, get_auto_organize_setting, get_subfolder_template
-    from db.tenants import get_tenant_id_by_user_email
-    from flask import session
-    
-    logger.info(f"get_or_create_project_folder called with tenant_id: {tenant_id}, customer_data: {customer_data}")
-    
-    # Get tenant-specific folder template
-    if not tenant_id:
-        user_email = session.get('user_email')
-        if user_email:
-            tenant_id = get_tenant_id_by_user_email(user_email)
-            logger.info(f"Retrieved tenant_id from user_email: {tenant_id}")
-    
-    if not tenant_id:
-        # Fallback to default
-        logger.warning("No tenant_id found, using default folder")
-        return create_folder_if_not_exists("Project Proposals")
-    
-    # Get folder template
-    root_folder_name = get_folder_template(tenant_id)
-    auto_organize = get_auto_organize_setting(tenant_id)
-    
-    logger.info(f"Retrieved settings - root_folder_name: {root_folder_name}, auto_organize: {auto_organize}")
-    
-    # Create root folder
-    root_folder_id = create_folder_if_not_exists(root_folder_name)
-    
-    if not auto_organize or not customer_data:
-        logger.info(f"Not creating subfolders - auto_organize: {auto_organize}, customer_data: {customer_data}")
-        return root_folder_id
-    
-    # Create organized subfolders
-    subfolder_template = get_subfolder_template(tenant_id)
-    logger.info(f"Retrieved subfolder_template: {subfolder_template}")
-    
+def is_not_found_error(error):
+    """Check whether a Google API error means the target file or folder no longer exists."""
+    return isinstance(error, HttpError) and error.resp.status == 404
+
+def resolve_folder(folder_name, parent_folder_id=None, tenant_id=None, user_email=None):
+    """Get a folder ID, consulting the persistent folder cache before querying Drive.
+
+    Cached IDs are trusted until Drive reports them missing; callers that hit a 404
+    should call invalidate_folder() and resolve again.
+    """
+    from db.drive_folders import get_cached_folder_id, cache_folder_id
+
+    use_cache = bool(tenant_id and user_email)
+    if use_cache:
+        folder_id = get_cached_folder_id(tenant_id, user_email, folder_name, parent_folder_id)
+        if folder_id:
+            logger.debug(f"Drive folder cache hit for '{folder_name}': {folder_id}")
+            return folder_id
+
+    folder_id = create_folder_if_not_exists(folder_name, parent_folder_id)
+    if folder_id and use_cache:
+        cache_folder_id(tenant_id, user_email, folder_name, folder_id, parent_folder_id)
+    return folder_id
+
+def invalidate_folder(folder_id, tenant_id=None, user_email=None):
+    """Drop a folder (and its cached subfolders) from the persistent folder cache."""
+    from db.drive_folders import invalidate_folder_id
+
+    if folder_id and tenant_id and user_email:
+        invalidate_folder_id(tenant_id, user_email, folder_id)
+
+def build_subfolder_name(subfolder_template, customer_data=None):
+    """Fill in a tenant's subfolder template for a customer."""
     # Replace template variables
     subfolder_name = subfolder_template
     
     if customer_data:
-        logger.info(f"Processing customer_data: {customer_data}")
+        logger.debug("Processing customer_data: %s", payload(customer_data))
         
         # Extract customer name from various possible fields
         customer_name = None
@@ -176,46 +274,260 @@ def get_or_create_project_folder(tenant_id, customer_data=None, project_data=Non
     if not subfolder_name.strip():
         subfolder_name = "General Projects"
     
+    return subfolder_name
+
+def get_or_create_project_folder(tenant_id, customer_data=None, project_data=None, user_email=None):
+    """Get or create the appropriate project folder based on tenant settings."""
+    from db.drive_settings import get_folder_template, get_auto_organize_setting, get_subfolder_template
+    from db.tenants import get_tenant_id_by_user_email
+    from flask import session
+    
+    logger.debug("get_or_create_project_folder called with tenant_id: %s, customer_data: %s", tenant_id, payload(customer_data))
+    
+    if not user_email:
+        user_email = session.get('user_email')
+    
+    # Get tenant-specific folder template
+    if not tenant_id:
+        if user_email:
+            tenant_id = get_tenant_id_by_user_email(user_email)
+            logger.info(f"Retrieved tenant_id from user_email: {tenant_id}")
+    
+    if not tenant_id:
+        # Fallback to default
+        logger.warning("No tenant_id found, using default folder")
+        return create_folder_if_not_exists("Project Proposals")
+    
+    # Get folder template
+    root_folder_name = get_folder_template(tenant_id)
+    auto_organize = get_auto_organize_setting(tenant_id)
+    
+    logger.info(f"Retrieved settings - root_folder_name: {root_folder_name}, auto_organize: {auto_organize}")
+    
+    # Create root folder
+    root_folder_id = resolve_folder(root_folder_name, None, tenant_id, user_email)
+    
+    if not auto_organize or not customer_data:
+        logger.debug("Not creating subfolders - auto_organize: %s, customer_data: %s", auto_organize, payload(customer_data))
+        return root_folder_id
+    
+    # Create organized subfolders
+    subfolder_template = get_subfolder_template(tenant_id)
+    logger.info(f"Retrieved subfolder_template: {subfolder_template}")
+    
+    subfolder_name = build_subfolder_name(subfolder_template, customer_data)
     logger.info(f"Final subfolder_name: {subfolder_name}")
     
-    final_folder_id = create_folder_if_not_exists(subfolder_name, root_folder_id)
+    try:
+        final_folder_id = resolve_folder(subfolder_name, root_folder_id, tenant_id, user_email)
+    except HttpError as e:
+        if not is_not_found_error(e):
+            raise
+        # The cached root folder was deleted in Drive; forget it and resolve both levels again
+        logger.warning(f"Cached root folder {root_folder_id} no longer exists, re-resolving")
+        invalidate_folder(root_folder_id, tenant_id, user_email)
+        root_folder_id = resolve_folder(root_folder_name, None, tenant_id, user_email)
+        final_folder_id = resolve_folder(subfolder_name, root_folder_id, tenant_id, user_email)
     logger.info(f"Final folder created with ID: {final_folder_id}")
     return final_folder_id
 
+def markdown_to_html(content):
+    """Convert proposal markdown into a standalone HTML document for Drive conversion."""
+    from markdown_cache import render_markdown
+
+    body = render_markdown(content or '', extras=('tables', 'fenced-code-blocks'))
+    return f'<html><head><meta charset="utf-8"></head><body>{body}</body></html>'
+
 @retry_with_backoff(max_retries=3)
 def create_doc_in_folder(title, content, folder_id):
+    """Create a Google Doc from markdown content in a single multipart upload.
+
+    The markdown is rendered to HTML and uploaded with a Google Docs target mimeType,
+    so Drive converts it (keeping headings, lists and tables) while creating the file.
+    """
+    from googleapiclient.http import MediaInMemoryUpload
+
     drive_service = get_drive_service()
-    docs_service = get_docs_service()
-    
-    # Create empty doc
+    if not drive_service:
+        return None
+
     doc_metadata = {
         'name': title,
         'parents': [folder_id],
         'mimeType': 'application/vnd.google-apps.document'
     }
-    doc = drive_service.files().create(body=doc_metadata, fields='id').execute()
+    media = MediaInMemoryUpload(markdown_to_html(content).encode('utf-8'),
+                                mimetype='text/html', resumable=False)
+    doc = drive_service.files().create(body=doc_metadata, media_body=media, fields='id').execute()
     doc_id = doc.get('id')
     
-    # Insert content
-    requests = [
-        {
-            'insertText': {
-                'location': {
-                    'index': 1
-                },
-                'text': content
-            }
-        }
-    ]
-    
-    docs_service.documents().batchUpdate(
-        documentId=doc_id,
-        body={'requests': requests}
-    ).execute()
-    
     # Return document info as dictionary
     doc_url = f"https://docs.google.com/document/d/{doc_id}/edit"
     return {
         'id': doc_id,
         'doc_url': doc_url
     }
+
+def save_doc_to_project_folder(title, content, tenant_id, customer_data=None, project_data=None, user_email=None):
+    """Resolve the tenant's project folder and create a doc in it.
+
+    If the (possibly cached) folder turns out to have been deleted in Drive, the cache
+    entry is invalidated and the folder is resolved and the doc created once more.
+    """
+    folder_id = get_or_create_project_folder(tenant_id, customer_data, project_data, user_email=user_email)
+    if not folder_id:
+        return None
+
+    try:
+        return create_doc_in_folder(title, content, folder_id)
+    except HttpError as e:
+        if not is_not_found_error(e):
+            raise
+        logger.warning(f"Cached project folder {folder_id} no longer exists, re-resolving")
+        invalidate_folder(folder_id, tenant_id, user_email or session.get('user_email'))
+        folder_id = get_or_create_project_folder(tenant_id, customer_data, project_data, user_email=user_email)
+        if not folder_id:
+            return None
+        return create_doc_in_folder(title, content, folder_id)
+
+def _execute_batch(drive_service, requests):
+    """Run (key, request) pairs through Drive batch requests.
+
+    Returns:
+        tuple: ({key: response}, {key: exception}) for the individual calls
+    """
+    responses = {}
+    errors = {}
+    keys = {}
+
+    def callback(request_id, response, exception):
+        if exception is not None:
+            errors[keys[request_id]] = exception
+        else:
+            responses[keys[request_id]] = response
+
+    for start in range(0, len(requests), DRIVE_BATCH_LIMIT):
+        batch = drive_service.new_batch_http_request(callback=callback)
+        for index, (key, api_request) in enumerate(requests[start:start + DRIVE_BATCH_LIMIT], start):
+            keys[str(index)] = key
+            batch.add(api_request, request_id=str(index))
+        batch.execute()
+
+    return responses, errors
+
+def resolve_folders(folder_names, parent_folder_id=None, tenant_id=None, user_email=None):
+    """Resolve many sibling folders in one pass.
+
+    Folders are looked up in the persistent cache first, then with batched Drive
+    searches, and any that still don't exist are created in a batch. Calls that fail
+    inside a batch fall back to create_folder_if_not_exists, which searches before
+    creating, so a partially applied batch never produces duplicate folders.
+
+    Returns:
+        dict: Mapping of folder name to folder ID
+    """
+    from db.drive_folders import get_cached_folder_ids, cache_folder_id
+
+    names = list(dict.fromkeys(name for name in folder_names if name))
+    use_cache = bool(tenant_id and user_email)
+    resolved = get_cached_folder_ids(tenant_id, user_email, names, parent_folder_id) if use_cache else {}
+    missing = [name for name in names if name not in resolved]
+    if not missing:
+        return resolved
+
+    drive_service = get_drive_service()
+    if not drive_service:
+        return resolved
+
+    lookups, failed = _execute_batch(drive_service, [
+        (name, drive_service.files().list(q=_folder_query(name, parent_folder_id), spaces='drive', fields='files(id)'))
+        for name in missing
+    ])
+
+    to_create = []
+    for name in missing:
+        files = lookups.get(name, {}).get('files', []) if name in lookups else None
+        if files:
+            resolved[name] = files[0]['id']
+        elif files is not None:
+            to_create.append(name)
+
+    if to_create:
+        def folder_metadata(name):
+            metadata = {'name': name, 'mimeType': 'application/vnd.google-apps.folder'}
+            if parent_folder_id:
+                metadata['parents'] = [parent_folder_id]
+            return metadata
+
+        created, create_failed = _execute_batch(drive_service, [
+            (name, drive_service.files().create(body=folder_metadata(name), fields='id'))
+            for name in to_create
+        ])
+        resolved.update({name: response.get('id') for name, response in created.items()})
+        failed.update(create_failed)
+
+    for name in failed:
+        logger.warning(f"Batched resolution of folder '{name}' failed, resolving individually")
+        resolved[name] = create_folder_if_not_exists(name, parent_folder_id)
+
+    if use_cache:
+        for name in missing:
+            if resolved.get(name):
+                cache_folder_id(tenant_id, user_email, name, resolved[name], parent_folder_id)
+
+    return resolved
+
+def resolve_project_folders(tenant_id, customers, user_email):
+    """Resolve the project folder for each customer, reading tenant settings once.
+
+    Returns:
+        list: Folder IDs in the same order as customers
+    """
+    from db.drive_settings import get_folder_template, get_auto_organize_setting, get_subfolder_template
+
+    root_folder_name = get_folder_template(tenant_id)
+    root_folder_id = resolve_folder(root_folder_name, None, tenant_id, user_email)
+    if not get_auto_organize_setting(tenant_id):
+        return [root_folder_id] * len(customers)
+
+    subfolder_template = get_subfolder_template(tenant_id)
+    subfolder_names = [build_subfolder_name(subfolder_template, customer) if customer else None
+                       for customer in customers]
+
+    try:
+        folder_ids = resolve_folders(subfolder_names, root_folder_id, tenant_id, user_email)
+    except HttpError as e:
+        if not is_not_found_error(e):
+            raise
+        logger.warning(f"Cached root folder {root_folder_id} no longer exists, re-resolving")
+        invalidate_folder(root_folder_id, tenant_id, user_email)
+        root_folder_id = resolve_folder(root_folder_name, None, tenant_id, user_email)
+        folder_ids = resolve_folders(subfolder_names, root_folder_id, tenant_id, user_email)
+
+    return [folder_ids.get(name) if name else root_folder_id for name in subfolder_names]
+
+def create_docs_concurrently(documents, credentials_info, max_workers=BULK_EXPORT_CONCURRENCY):
+    """Create many docs with bounded concurrency.
+
+    Media uploads cannot go through the Drive batch endpoint, so each doc is its own
+    single-request upload, with at most max_workers in flight at once.
+
+    Args:
+        documents (list): Dicts with 'title', 'content' and 'folder_id'
+        credentials_info (dict): OAuth credentials to use on the worker threads
+
+    Returns:
+        list: Per-document result dicts, in the same order as documents
+    """
+    def create(document):
+        with background_api_context(credentials_info, defer_retries=False):
+            try:
+                doc_info = create_doc_in_folder(document['title'], document['content'], document['folder_id'])
+                if not doc_info:
+                    return {'status': 'failed', 'error': 'Failed to create Google Doc.'}
+                return {'status': 'succeeded', 'doc_id': doc_info['id'], 'doc_url': doc_info['doc_url']}
+            except Exception as e:
+                return {'status': 'failed', 'error': str(e), 'folder_missing': is_not_found_error(e)}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(create, documents))
@@ -1,11 +1,16 @@
 from app import app
-from db.init_db import create_tables
+from db.migrations import migrate
 
 if __name__ == "__main__":
     with app.app_context():
-        success = create_tables()
+        try:
+            applied = migrate()
+            success = True
+        except Exception as e:
+            print(f"Migration error: {e}")
+            success = False
         if success:
-            print("Database tables created successfully")
+            print("Database migrated successfully" + (f" (applied {applied})" if applied else " (already at head)"))
             
             # Initialize price lists and templates if tables were created successfully
             from db.price_lists import initialize_price_lists
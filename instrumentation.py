@@ -0,0 +1,206 @@
+import re
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+import httplib2
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+METRIC_PREFIX = 'proposalpro'
+
+class MetricsRegistry:
+    """Thread-safe in-process counters and histograms rendered in Prometheus text format.
+
+    Metrics are kept per worker process; scrape each worker (or sum them) when
+    running several.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, labels=None, value=1):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': [0] * len(DURATION_BUCKETS), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    histogram['buckets'][index] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    @staticmethod
+    def _format_labels(labels, extra=None):
+        pairs = list(labels) + list(extra or [])
+        if not pairs:
+            return ''
+        escaped = []
+        for key, value in pairs:
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+            escaped.append(f'{key}="{value}"')
+        return '{' + ','.join(escaped) + '}'
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: {'buckets': list(h['buckets']), 'sum': h['sum'], 'count': h['count']}
+                          for key, h in self._histograms.items()}
+
+        lines = []
+        for metric_type, series in (('counter', counters), ('histogram', histograms)):
+            for name in sorted({name for name, _ in series}):
+                full_name = f"{METRIC_PREFIX}_{name}"
+                if name in self._help:
+                    lines.append(f"# HELP {full_name} {self._help[name]}")
+                lines.append(f"# TYPE {full_name} {metric_type}")
+                for (metric_name, labels), value in sorted(series.items(), key=lambda item: item[0]):
+                    if metric_name != name:
+                        continue
+                    if metric_type == 'counter':
+                        lines.append(f"{full_name}{self._format_labels(labels)} {value}")
+                        continue
+                    for bound, count in zip(DURATION_BUCKETS, value['buckets']):
+                        lines.append(f"{full_name}_bucket{self._format_labels(labels, [('le', bound)])} {count}")
+                    lines.append(f"{full_name}_bucket{self._format_labels(labels, [('le', '+Inf')])} {value['count']}")
+                    lines.append(f"{full_name}_sum{self._format_labels(labels)} {value['sum']:.6f}")
+                    lines.append(f"{full_name}_count{self._format_labels(labels)} {value['count']}")
+        return '\n'.join(lines) + '\n'
+
+# Create singleton instance
+metrics = MetricsRegistry()
+metrics.describe('http_request_duration_seconds', 'Time spent handling HTTP requests, by endpoint.')
+metrics.describe('db_query_duration_seconds', 'Time spent in execute_query, by SQL fingerprint.')
+metrics.describe('db_query_rows_total', 'Rows returned or affected by execute_query, by SQL fingerprint.')
+metrics.describe('gemini_request_duration_seconds', 'Latency of Gemini API calls.')
+metrics.describe('gemini_tokens_total', 'Tokens used by Gemini API calls.')
+metrics.describe('google_api_request_duration_seconds', 'Latency of Google API HTTP calls.')
+
+def get_metrics():
+    """Get the singleton MetricsRegistry instance."""
+    return metrics
+
+_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+@lru_cache(maxsize=512)
+def sql_fingerprint(query):
+    """Reduce a SQL statement to a short, parameter-free label for grouping timings.
+
+    Long statements are truncated for readability and suffixed with a hash of
+    the full text, so queries sharing a long prefix still get separate labels.
+    """
+    text = _LITERAL_PATTERN.sub('?', ' '.join(str(query).split()))
+    if len(text) <= 120:
+        return text
+    return f"{text[:100]}…#{hashlib.sha1(text.encode('utf-8')).hexdigest()[:8]}"
+
+def record_span(category, duration):
+    """Add time spent on a category of work to the current request's Server-Timing."""
+    from flask import g, has_request_context
+
+    if not has_request_context():
+        return
+    spans = g.setdefault('timing_spans', {})
+    total, count = spans.get(category, (0.0, 0))
+    spans[category] = (total + duration, count + 1)
+
+def record_db_query(query, duration, rows):
+    fingerprint = sql_fingerprint(query)
+    metrics.observe('db_query_duration_seconds', duration, {'query': fingerprint})
+    if rows is not None and rows >= 0:
+        metrics.inc('db_query_rows_total', {'query': fingerprint}, rows)
+    record_span('db', duration)
+
+def record_gemini_call(operation, model, duration, response=None):
+    labels = {'model': model, 'operation': operation}
+    metrics.observe('gemini_request_duration_seconds', duration, labels)
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is not None:
+        for kind, attribute in (('prompt', 'prompt_token_count'), ('output', 'candidates_token_count')):
+            count = getattr(usage, attribute, None)
+            if count:
+                metrics.inc('gemini_tokens_total', dict(labels, kind=kind), count)
+    record_span('gemini', duration)
+
+def record_google_api_call(api, method, status, duration):
+    metrics.observe('google_api_request_duration_seconds', duration,
+                    {'api': api, 'method': method, 'status': str(status)})
+    record_span('google', duration)
+
+def _google_api_name(uri):
+    """Label a Google API URL by service, e.g. 'drive' or 'docs'."""
+    match = re.match(r'https?://([^/]+)(/[^/?]*)?(/[^/?]*)?', uri or '')
+    if not match:
+        return 'unknown'
+    host, first, second = match.group(1), (match.group(2) or '').strip('/'), (match.group(3) or '').strip('/')
+    if host == 'www.googleapis.com':
+        # e.g. /drive/v3/files, /upload/drive/v3/files, /oauth2/v2/userinfo
+        return second if first in ('upload', 'batch') and second else first or host
+    return host.split('.')[0]
+
+class InstrumentedHttp(httplib2.Http):
+    """httplib2 transport that records the latency of every Google API call."""
+
+    def request(self, uri, method='GET', *args, **kwargs):
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            response, content = super().request(uri, method, *args, **kwargs)
+            status = response.status
+            return response, content
+        finally:
+            record_google_api_call(_google_api_name(uri), method, status, time.perf_counter() - started)
+
+def requests_timing_hook(response, *args, **kwargs):
+    """requests response hook recording Google API latency."""
+    record_google_api_call(_google_api_name(response.url), response.request.method,
+                           response.status_code, response.elapsed.total_seconds())
+    return response
+
+def init_app(app):
+    """Time every request and report its breakdown in a Server-Timing header."""
+    from flask import g, request
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        # Correlates log lines for one request; reuse the proxy's ID when it sends one
+        incoming = request.headers.get('X-Request-ID', '')
+        g.request_id = incoming if 0 < len(incoming) <= 64 else uuid.uuid4().hex
+
+    @app.after_request
+    def finish_request_timer(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        duration = time.perf_counter() - started
+        metrics.observe('http_request_duration_seconds', duration, {
+            'endpoint': request.endpoint or 'unmatched',
+            'method': request.method,
+            'status': str(response.status_code)
+        })
+
+        timings = [f"app;dur={duration * 1000:.1f}"]
+        for category, (total, count) in sorted(g.pop('timing_spans', {}).items()):
+            timings.append(f'{category};dur={total * 1000:.1f};desc="{count} calls"')
+        response.headers['Server-Timing'] = ', '.join(timings)
+        response.headers['X-Request-ID'] = g.get('request_id', '')
+        return response
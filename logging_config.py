@@ -0,0 +1,135 @@
+import json
+import random
+import logging
+from datetime import datetime, timezone
+
+# Defaults used until configure_logging() is called
+_payload_max_chars = 2000
+_configured = False
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+class LazyPayload:
+    """Wraps a large value passed as a logging argument.
+
+    The value is only serialized if a handler actually emits the record, and the
+    result is capped at the configured size, e.g.
+
+        logger.debug("Price list: %s", payload(price_list))
+    """
+
+    __slots__ = ('value', 'max_chars', 'size')
+
+    def __init__(self, value, max_chars=None):
+        self.value = value
+        self.max_chars = max_chars
+        # Length of the serialized value before truncation, once formatted
+        self.size = None
+
+    def __str__(self):
+        value = self.value
+        if hasattr(value, 'model_dump'):
+            value = value.model_dump()
+        if isinstance(value, (dict, list)):
+            try:
+                text = json.dumps(value, default=str)
+            except (TypeError, ValueError):
+                text = repr(value)
+        else:
+            text = str(value)
+
+        self.size = len(text)
+        limit = self.max_chars or _payload_max_chars
+        if len(text) > limit:
+            return f"{text[:limit]}... [{len(text) - limit} more chars]"
+        return text
+
+    __repr__ = __str__
+
+def payload(value, max_chars=None):
+    """Mark a logging argument as a large payload to be formatted lazily and truncated."""
+    return LazyPayload(value, max_chars)
+
+class PayloadSamplingFilter(logging.Filter):
+    """Lets through only a fraction of the records that carry payload() arguments."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if self.rate >= 1:
+            return True
+        if not _record_payloads(record):
+            return True
+        return random.random() < self.rate
+
+def _record_payloads(record):
+    args = record.args if isinstance(record.args, tuple) else (record.args,)
+    return [arg for arg in args if isinstance(arg, LazyPayload)]
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line, for log aggregation.
+
+    Fields: timestamp, level, logger, message, request_id (inside a request),
+    payload_chars (untruncated size of any payload() arguments) and exception.
+    """
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+
+        from flask import g, has_request_context
+        if has_request_context() and g.get('request_id'):
+            entry['request_id'] = g.request_id
+
+        payloads = _record_payloads(record)
+        if payloads:
+            entry['payload_chars'] = sum(arg.size or 0 for arg in payloads)
+
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+# Formatters selectable with the LOG_FORMAT setting
+LOG_FORMATTERS = {
+    'text': lambda: logging.Formatter(TEXT_FORMAT),
+    'json': JsonFormatter
+}
+
+def configure_logging(config):
+    """
+    Configure the root logger from the app config
+
+    Reads LOG_LEVEL (root level), LOG_LEVELS (mapping of logger name to level),
+    LOG_FORMAT ('text' or 'json'), LOG_PAYLOAD_MAX_CHARS and LOG_PAYLOAD_SAMPLE_RATE.
+    Safe to call more than once.
+
+    Args:
+        config: A config object or mapping (e.g. app.config)
+    """
+    global _payload_max_chars, _configured
+
+    get = config.get if hasattr(config, 'get') else lambda name, default=None: getattr(config, name, default)
+
+    _payload_max_chars = int(get('LOG_PAYLOAD_MAX_CHARS', _payload_max_chars))
+    root = logging.getLogger()
+    root.setLevel(get('LOG_LEVEL', 'INFO'))
+
+    if not _configured:
+        root.addHandler(logging.StreamHandler())
+        _configured = True
+
+    make_formatter = LOG_FORMATTERS.get(get('LOG_FORMAT', 'text'), LOG_FORMATTERS['text'])
+    for handler in root.handlers:
+        handler.setFormatter(make_formatter())
+        for existing in [f for f in handler.filters if isinstance(f, PayloadSamplingFilter)]:
+            handler.removeFilter(existing)
+        handler.addFilter(PayloadSamplingFilter(float(get('LOG_PAYLOAD_SAMPLE_RATE', 1.0))))
+
+    for name, level in (get('LOG_LEVELS', None) or {}).items():
+        logging.getLogger(name).setLevel(level)
@@ -0,0 +1,85 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Most recently rendered documents kept in memory, per process
+MAX_CACHED_DOCUMENTS = 256
+
+# Documents larger than this are rendered but not cached
+MAX_CACHED_CHARS = 200000
+
+class MarkdownCache:
+    """Renders Markdown to HTML, caching results by content hash.
+
+    markdown2.Markdown instances keep per-conversion state and are not
+    thread-safe, so each thread gets its own converter per set of extras.
+    Rendered HTML is shared across threads in an LRU keyed by the SHA-256 of
+    the source text, so re-rendering an unchanged proposal is a dict lookup.
+    """
+
+    def __init__(self, max_entries=MAX_CACHED_DOCUMENTS):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _converter(self, extras):
+        converters = getattr(self._local, 'converters', None)
+        if converters is None:
+            converters = self._local.converters = {}
+        converter = converters.get(extras)
+        if converter is None:
+            import markdown2
+            converter = converters[extras] = markdown2.Markdown(extras=list(extras))
+        return converter
+
+    def render(self, text, extras=()):
+        """
+        Render Markdown text to HTML
+
+        Args:
+            text (str): Markdown source
+            extras (tuple): markdown2 extras to enable
+
+        Returns:
+            str: Rendered HTML
+        """
+        if not text:
+            return ''
+
+        extras = tuple(extras)
+        key = (hashlib.sha256(text.encode('utf-8')).hexdigest(), extras)
+        with self._lock:
+            html = self._cache.get(key)
+            if html is not None:
+                self._cache.move_to_end(key)
+                return html
+
+        html = str(self._converter(extras).convert(text))
+
+        if len(text) <= MAX_CACHED_CHARS:
+            with self._lock:
+                self._cache[key] = html
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return html
+
+    def clear(self):
+        """Drop every cached rendering."""
+        with self._lock:
+            self._cache.clear()
+
+# Create singleton instance
+markdown_cache = MarkdownCache()
+
+def get_markdown_cache():
+    """Get the singleton MarkdownCache instance."""
+    return markdown_cache
+
+def render_markdown(text, extras=()):
+    """Render Markdown to HTML through the shared cache."""
+    return markdown_cache.render(text, extras)
@@ -0,0 +1,122 @@
+from array import array
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+CENT = Decimal('0.01')
+
+def to_cents(value):
+    """
+    Convert an amount to integer cents, rounding half up
+
+    Accepts ints, floats, Decimals and numeric strings (as found in JSON, forms
+    and NUMERIC columns). Anything unusable counts as zero.
+    """
+    if isinstance(value, int):
+        return value * 100
+    if value is None or value == '':
+        return 0
+    try:
+        # str() so 0.1 becomes Decimal('0.1') rather than its binary approximation
+        amount = value if isinstance(value, Decimal) else Decimal(str(value).strip().lstrip('$').replace(',', ''))
+        return int((amount * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError):
+        return 0
+
+def from_cents(cents):
+    """Integer cents as a Decimal amount with two places, e.g. for a DECIMAL(10,2) column."""
+    return (Decimal(cents) / 100).quantize(CENT)
+
+def cents_to_float(cents):
+    """Integer cents as a float, for the JSON the app stores and sends to the browser."""
+    return cents / 100
+
+def round_money(value):
+    """Round an amount to the cent, returning a float."""
+    return cents_to_float(to_cents(value))
+
+def format_money(value):
+    """Format an amount in dollars (float, Decimal or string) as e.g. '$1234.50'."""
+    return f"${from_cents(to_cents(value))}"
+
+def to_quantity(value):
+    try:
+        return max(int(value or 0), 0)
+    except (TypeError, ValueError):
+        return 0
+
+def tax_cents(amount_cents, rate):
+    """Tax on an amount in cents at a rate such as '0.0825', rounded half up to the cent."""
+    return int((Decimal(amount_cents) * Decimal(str(rate))).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def _field(line, name, default=None):
+    if isinstance(line, dict):
+        return line.get(name, default)
+    return getattr(line, name, default)
+
+class LineArray:
+    """Estimate lines held as parallel columns of integer cents and quantities.
+
+    Keeps large estimates and report aggregations cheap: totals are integer
+    arithmetic over two arrays instead of per-line model objects or floats.
+    Accepts line dicts ({name, unit, price, quantity}) or Line_Item objects.
+    A line's 'detail' tag (the project detail it prices) is carried through.
+    """
+
+    __slots__ = ('names', 'units', 'prices', 'quantities', 'details')
+
+    def __init__(self, names=None, units=None, prices=None, quantities=None, details=None):
+        self.names = list(names or [])
+        self.units = list(units or [])
+        self.prices = array('q', prices or [])
+        self.quantities = array('q', quantities or [])
+        self.details = list(details or [None] * len(self.names))
+
+    @classmethod
+    def from_lines(cls, lines):
+        lines = list(lines or [])
+        return cls(
+            names=[_field(line, 'name') or 'unknown' for line in lines],
+            units=[_field(line, 'unit') or 'unknown' for line in lines],
+            prices=[to_cents(_field(line, 'price')) for line in lines],
+            quantities=[to_quantity(_field(line, 'quantity')) for line in lines],
+            details=[_field(line, 'detail') for line in lines]
+        )
+
+    def __len__(self):
+        return len(self.prices)
+
+    def totals(self):
+        """Line totals in cents."""
+        return array('q', map(int.__mul__, self.prices, self.quantities))
+
+    def subtotal(self):
+        """Sum of the line totals in cents."""
+        return sum(map(int.__mul__, self.prices, self.quantities))
+
+    def tax(self, rate):
+        """Tax on the subtotal in cents."""
+        return tax_cents(self.subtotal(), rate)
+
+    def to_dict(self):
+        """Lines in the {'lines', 'sub_total'} shape stored with estimates."""
+        lines = []
+        for name, unit, price, quantity, total, detail in zip(
+                self.names, self.units, self.prices, self.quantities, self.totals(), self.details):
+            line = {
+                'name': name,
+                'unit': unit,
+                'price': cents_to_float(price),
+                'quantity': quantity,
+                'total': cents_to_float(total)
+            }
+            if detail is not None:
+                line['detail'] = detail
+            lines.append(line)
+        return {'lines': lines, 'sub_total': cents_to_float(self.subtotal())}
+
+def line_total(price, quantity):
+    """Total for one line as a float rounded to the cent."""
+    return cents_to_float(to_cents(price) * to_quantity(quantity))
+
+def subtotal(lines):
+    """Subtotal of line dicts or Line_Item objects as a float rounded to the cent."""
+    return cents_to_float(LineArray.from_lines(lines).subtotal())
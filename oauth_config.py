@@ -2,8 +2,6 @@
 import os
 import json
 from flask import current_app
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import Flow
 
 def create_oauth_flow(request_url=None):
     """Create and configure an OAuth flow for Google authentication.
@@ -14,6 +12,9 @@ def create_oauth_flow(request_url=None):
     Returns:
         A configured Flow object for OAuth authentication.
     """
+    # Imported here so every blueprint importing require_auth doesn't load the OAuth client stack
+    from google_auth_oauthlib.flow import Flow
+
     # Get client credentials from GOOGLE_OAUTH_SECRETS environment variable
     oauth_secrets = os.getenv("GOOGLE_OAUTH_SECRETS")
     if not oauth_secrets:
@@ -0,0 +1,213 @@
+import io
+import os
+import csv
+import json
+import uuid
+import logging
+import tempfile
+from decimal import Decimal, InvalidOperation
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = ('csv', 'xlsx', 'json')
+
+# Rows beyond this are rejected rather than staged
+MAX_IMPORT_ROWS = 100000
+
+# Only the first few invalid rows are reported back to the user
+MAX_REPORTED_ERRORS = 50
+
+# Largest price that fits the NUMERIC(12,2) price column
+MAX_PRICE = Decimal('10000000000')
+
+# Staged rows are spooled in memory up to this size before going to a temp file
+SPOOL_MAX_BYTES = 5 * 1024 * 1024
+
+# Header names accepted for each column, compared case-insensitively
+COLUMN_ALIASES = {
+    'item': ('item', 'name', 'item name', 'description', 'product', 'material'),
+    'unit': ('unit', 'units', 'uom', 'unit of measure'),
+    'price': ('price', 'unit price', 'cost', 'unit cost', 'rate')
+}
+
+# Spellings of common units mapped to the form used in the price list
+UNIT_ALIASES = {
+    'sf': 'sq ft', 'sqft': 'sq ft', 'sq ft': 'sq ft', 'ft2': 'sq ft',
+    'square foot': 'sq ft', 'square feet': 'sq ft', 'sq feet': 'sq ft',
+    'lf': 'linear ft', 'lin ft': 'linear ft', 'linear foot': 'linear ft',
+    'linear feet': 'linear ft', 'linear ft': 'linear ft',
+    'sy': 'sq yd', 'sq yd': 'sq yd', 'square yard': 'sq yd', 'square yards': 'sq yd',
+    'cy': 'cubic yard', 'cu yd': 'cubic yard', 'cubic yard': 'cubic yard', 'cubic yards': 'cubic yard',
+    'ea': 'each', 'each': 'each', 'pc': 'each', 'pcs': 'each', 'piece': 'each', 'unit': 'each',
+    'hr': 'hour', 'hrs': 'hour', 'hour': 'hour', 'hours': 'hour',
+    'day': 'day', 'days': 'day',
+    'gal': 'gallon', 'gallon': 'gallon', 'gallons': 'gallon',
+    'lb': 'lb', 'lbs': 'lb', 'pound': 'lb', 'pounds': 'lb',
+    'ton': 'ton', 'tons': 'ton',
+    'ls': 'lump sum', 'lump sum': 'lump sum'
+}
+
+class PriceImportError(Exception):
+    """Raised when an uploaded price file cannot be read at all."""
+
+def normalize_unit(raw_unit):
+    """Map a unit as written in a supplier file onto the price list's unit names."""
+    if raw_unit is None:
+        return 'unknown'
+    unit = ' '.join(str(raw_unit).replace('.', ' ').split()).lower()
+    if unit.startswith('per '):
+        unit = unit[4:]
+    if not unit:
+        return 'unknown'
+    return UNIT_ALIASES.get(unit, unit)
+
+def parse_price(raw_price):
+    """Parse a price cell such as "$1,234.50" into a Decimal, or raise ValueError."""
+    if raw_price is None or str(raw_price).strip() == '':
+        raise ValueError('missing price')
+    text = str(raw_price).strip().replace('$', '').replace(',', '')
+    try:
+        price = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"invalid price '{raw_price}'")
+    if not price.is_finite() or price < 0:
+        raise ValueError(f"invalid price '{raw_price}'")
+    if price >= MAX_PRICE:
+        raise ValueError(f"price '{raw_price}' is too large")
+    return price.quantize(Decimal('0.01'))
+
+def _map_columns(header):
+    """Work out which header cell holds the item, unit and price columns."""
+    normalized = [' '.join(str(cell or '').split()).lower() for cell in header]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                columns[field] = normalized.index(alias)
+                break
+    missing = [field for field in ('item', 'price') if field not in columns]
+    if missing:
+        raise PriceImportError(f"Missing required column(s): {', '.join(missing)}")
+    return columns
+
+def _rows_from_table(rows):
+    """Yield (item, unit, price) tuples from an iterator of header-first table rows."""
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = _map_columns(header)
+    for row in rows:
+        row = list(row)
+        yield tuple(row[columns[field]] if field in columns and columns[field] < len(row) else None
+                    for field in ('item', 'unit', 'price'))
+
+def _iter_csv(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from _rows_from_table(csv.reader(text))
+    finally:
+        text.detach()
+
+def _iter_xlsx(stream):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise PriceImportError('Excel imports require the openpyxl package to be installed.')
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        yield from _rows_from_table(workbook.active.iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+def _iter_json(stream):
+    try:
+        data = json.load(stream)
+    except json.JSONDecodeError as e:
+        raise PriceImportError(f"Invalid JSON: {e}")
+
+    if isinstance(data, dict):
+        # Same {name: {unit, price}} shape the price list is stored in
+        for name, details in data.items():
+            details = details if isinstance(details, dict) else {'price': details}
+            yield name, details.get('unit'), details.get('price')
+    elif isinstance(data, list):
+        for entry in data:
+            if not isinstance(entry, dict):
+                yield None, None, None
+                continue
+            lowered = {str(key).lower(): value for key, value in entry.items()}
+            yield tuple(next((lowered[alias] for alias in COLUMN_ALIASES[field] if alias in lowered), None)
+                        for field in ('item', 'unit', 'price'))
+    else:
+        raise PriceImportError('JSON price lists must be an object or a list of objects.')
+
+def iter_price_rows(stream, filename):
+    """
+    Stream (item, unit, price) tuples out of an uploaded CSV, XLSX or JSON file
+
+    Args:
+        stream: Binary file-like object of the upload
+        filename (str): Original file name, used to pick the parser
+
+    Returns:
+        iterator: Raw (item, unit, price) values in file order
+    """
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    if extension == 'csv':
+        return _iter_csv(stream)
+    if extension == 'xlsx':
+        return _iter_xlsx(stream)
+    if extension == 'json':
+        return _iter_json(stream)
+    raise PriceImportError(f"Unsupported file type. Upload one of: {', '.join(SUPPORTED_EXTENSIONS)}")
+
+def stage_price_import(user_email, tenant_id, stream, filename):
+    """
+    Parse an uploaded price file and load the valid rows into the staging table
+
+    Rows are validated and normalized as they are read and written straight to
+    a spooled CSV buffer that is handed to COPY, so large supplier catalogs are
+    never held in memory as Python objects.
+
+    Returns:
+        dict: import_id, number of rows staged, and a list of row errors
+    """
+    from db.price_lists import normalize_item_name
+    from db.price_imports import stage_price_rows
+
+    import_id = str(uuid.uuid4())
+    errors = []
+    staged = 0
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode='w+', newline='', encoding='utf-8') as buffer:
+        writer = csv.writer(buffer)
+        for row_no, (item, unit, price) in enumerate(iter_price_rows(stream, filename), start=1):
+            if staged >= MAX_IMPORT_ROWS:
+                raise PriceImportError(f"Price files are limited to {MAX_IMPORT_ROWS} rows.")
+
+            name = ' '.join(str(item).split()) if item is not None else ''
+            if not name:
+                if price is not None and str(price).strip():
+                    errors.append({'row': row_no, 'error': 'missing item name'})
+                continue
+            try:
+                parsed_price = parse_price(price)
+            except ValueError as e:
+                errors.append({'row': row_no, 'item': name, 'error': str(e)})
+                continue
+
+            writer.writerow((row_no, normalize_item_name(name), name, normalize_unit(unit), parsed_price))
+            staged += 1
+
+        if staged:
+            buffer.seek(0)
+            stage_price_rows(import_id, tenant_id, user_email, buffer)
+
+    logger.info(f"Staged price import {import_id} for {user_email}: {staged} rows, {len(errors)} invalid")
+    return {
+        'import_id': import_id if staged else None,
+        'staged': staged,
+        'invalid': len(errors),
+        'errors': errors[:MAX_REPORTED_ERRORS]
+    }
@@ -0,0 +1,193 @@
+import logging
+from money import LineArray, from_cents, to_quantity
+
+logger = logging.getLogger(__name__)
+
+def build_line_items(lines):
+    """
+    Recompute line totals and the subtotal in integer cents
+
+    Args:
+        lines (list): Line dicts with name, unit, price and quantity
+
+    Returns:
+        tuple: (line_items dict in the stored {'lines', 'sub_total'} shape, subtotal as Decimal)
+    """
+    line_array = LineArray.from_lines(lines)
+    return line_array.to_dict(), from_cents(line_array.subtotal())
+
+def _detail_quantities(details):
+    """Map normalized item name to (display name, total quantity) for project details."""
+    from db.price_lists import normalize_item_name
+
+    quantities = {}
+    for detail in details or []:
+        name = (detail.get('item') or '').strip()
+        if not name:
+            continue
+        key = normalize_item_name(name)
+        _, quantity = quantities.get(key, (name, 0))
+        quantities[key] = (name, quantity + to_quantity(detail.get('quantity')))
+    return quantities
+
+def diff_details(old_details, new_details):
+    """
+    Compare two versions of project_details['details']
+
+    Returns:
+        dict: Normalized item names that were 'added', 'removed', had their quantity
+            'changed', or are 'unchanged'
+    """
+    old = _detail_quantities(old_details)
+    new = _detail_quantities(new_details)
+    return {
+        'added': [key for key in new if key not in old],
+        'removed': [key for key in old if key not in new],
+        'changed': [key for key in new if key in old and new[key][1] != old[key][1]],
+        'unchanged': [key for key in new if key in old and new[key][1] == old[key][1]]
+    }
+
+def match_lines_to_details(lines, names):
+    """
+    Work out which line prices which project detail
+
+    Lines carry a 'detail' tag (the normalized detail name) once they have been
+    through tag_detail_lines or reprice_details, and lines without one are lines
+    added by hand in the editor. Lines stored before tagging existed, or fresh from
+    the model, are matched by name and then in order: the model returns one line
+    per requested detail, in request order, but often rewords the item name.
+
+    Args:
+        lines (list): Line dicts
+        names (list): Detail item names
+
+    Returns:
+        tuple: ({normalized detail name: line}, list of lines that price no detail)
+    """
+    from db.price_lists import normalize_item_name
+
+    keys = list(dict.fromkeys(normalize_item_name(name) for name in names))
+    tagged = any(line.get('detail') for line in lines)
+    matched = {}
+    unmatched = []
+    for line in lines:
+        key = line.get('detail') if tagged else normalize_item_name(line.get('name', ''))
+        if key in keys and key not in matched:
+            matched[key] = line
+        elif not line.get('detail'):
+            unmatched.append(line)
+        # A line tagged with a detail that is no longer there is dropped
+
+    if tagged:
+        return matched, unmatched
+
+    remaining = [key for key in keys if key not in matched]
+    for key, line in zip(remaining, list(unmatched)):
+        matched[key] = line
+        unmatched.remove(line)
+    return matched, unmatched
+
+def tag_detail_lines(line_items, details):
+    """Tag freshly priced lines with the project detail each one prices (in place)."""
+    lines = (line_items or {}).get('lines', [])
+    names = [(detail.get('item') or '').strip() for detail in details or []]
+    matched, _ = match_lines_to_details(lines, [name for name in names if name])
+    for key, line in matched.items():
+        line['detail'] = key
+    return line_items
+
+def _price_locally(names, user_email):
+    """Price items from the tenant's price list, returning {normalized name: price item}."""
+    from db.price_lists import get_price_items
+    return get_price_items(user_email, names) if names else {}
+
+def _price_with_ai(missing, user_email):
+    """Ask the model to price only the items the price list had no exact match for."""
+    from ai_helper import lookup_prices
+    from db.price_lists import get_price_list
+
+    details = [{'item': name, 'quantity': quantity} for name, quantity in missing]
+    line_items = lookup_prices({'details': details}, get_price_list(user_email))
+    # Key the results by the requested names, not whatever the model called them
+    matched, _ = match_lines_to_details([line.dict() for line in line_items.lines], [name for name, _ in missing])
+    return {key: {'name': line['name'], 'unit': line['unit'], 'price': line['price']}
+            for key, line in matched.items()}
+
+def reprice_details(line_items, old_details, new_details, user_email, use_ai=False):
+    """
+    Update line items after project_details['details'] changed, repricing only what changed
+
+    Lines for unchanged items are kept as they are (including manual price edits),
+    quantity changes keep the existing price, and only added items are looked up:
+    first in the tenant's price list, then (if use_ai) with one model call covering
+    just the items that had no match. Lines added by hand in the editor are kept.
+
+    Returns:
+        tuple: (line_items dict, subtotal as Decimal, list of item names left unpriced)
+    """
+    old = _detail_quantities(old_details)
+    new = _detail_quantities(new_details)
+    existing, hand_added = match_lines_to_details((line_items or {}).get('lines', []),
+                                                  [name for name, _ in old.values()])
+
+    added = [key for key in new if key not in existing]
+    priced = _price_locally([new[key][0] for key in added], user_email)
+    missing = [new[key] for key in added if key not in priced]
+    if missing and use_ai:
+        logger.info(f"Pricing {len(missing)} unmatched items with AI")
+        priced.update(_price_with_ai(missing, user_email))
+
+    lines = []
+    unpriced = []
+    for key, (name, quantity) in new.items():
+        line = existing.get(key)
+        if line is not None:
+            lines.append(dict(line, quantity=quantity, detail=key))
+            continue
+        item = priced.get(key)
+        if item is None:
+            unpriced.append(name)
+            item = {'unit': 'unknown', 'price': 0}
+        lines.append({'name': name, 'unit': item.get('unit'), 'price': item.get('price'),
+                      'quantity': quantity, 'detail': key})
+
+    lines.extend(hand_added)
+
+    logger.debug(f"Repriced estimate details: {len(added)} items looked up, {len(unpriced)} left unpriced")
+
+    built, sub_total = build_line_items(lines)
+    return built, sub_total, unpriced
+
+def reprice_lines(new_lines, user_email):
+    """
+    Normalize lines submitted from the estimate editor and recompute totals
+
+    Lines sent without a price (new or renamed items) are priced from the tenant's
+    price list; every other line keeps the price it was given.
+
+    Returns:
+        tuple: (line_items dict, subtotal as Decimal, list of item names left unpriced)
+    """
+    from db.price_lists import normalize_item_name
+
+    lines = [dict(line) for line in new_lines or [] if (line.get('name') or '').strip()]
+    needs_price = [line['name'] for line in lines if line.get('price') in (None, '')]
+    priced = _price_locally(needs_price, user_email)
+
+    unpriced = []
+    for line in lines:
+        if line.get('price') not in (None, ''):
+            continue
+        item = priced.get(normalize_item_name(line['name']))
+        if item is None:
+            unpriced.append(line['name'])
+            continue
+        line['price'] = item['price']
+        line['unit'] = line.get('unit') or item['unit']
+
+    built, sub_total = build_line_items(lines)
+    return built, sub_total, unpriced
+
+def changed_fields(current, **updates):
+    """Keep only the updates that differ from the current estimate, for a minimal update_estimate call."""
+    return {field: value for field, value in updates.items() if current.get(field) != value}
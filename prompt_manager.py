@@ -214,11 +214,8 @@ class PromptManager:
                 logger.info(f"Created default tenant with ID: {tenant_id}")
                 
                 # Create a default system user for this tenant
-                create_user_query = """
-                INSERT INTO users (tenant_id, email, name, role)
-                VALUES (%s, 'system@migration', 'System Migration User', 'TENANT_ADMIN');
-                """
-                execute_query(create_user_query, (tenant_id,), fetch=False)
+                from db.tenants import create_user
+                create_user(tenant_id, 'system@migration', 'System Migration User', role='TENANT_ADMIN')
                 logger.info("Created default system user")
                 
                 return tenant_id
@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import time
+import subprocess
+import click
+
+# (step name, seconds since the previous step) recorded while the app starts
+STARTUP_STEPS = []
+_last_mark = time.perf_counter()
+
+def mark_startup_step(name):
+    """Record how long the app spent on the startup step that just finished."""
+    global _last_mark
+    now = time.perf_counter()
+    STARTUP_STEPS.append((name, now - _last_mark))
+    _last_mark = now
+
+# Run in a fresh interpreter so every import is cold
+_PROFILE_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import app
+total = time.perf_counter() - started
+import startup_profile
+sys.stdout.write(json.dumps({'total': total, 'steps': startup_profile.STARTUP_STEPS}))
+"""
+
+def parse_importtime(output):
+    """
+    Parse `python -X importtime` output
+
+    Returns:
+        list: (module, self seconds, cumulative seconds) for each imported module
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            modules.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6))
+        except ValueError:
+            continue
+    return modules
+
+@click.command('startup-profile')
+@click.option('--limit', default=25, show_default=True, help='Number of modules to list.')
+@click.option('--sort', type=click.Choice(['cumulative', 'self']), default='cumulative', show_default=True)
+def startup_profile_command(limit, sort):
+    """Report per-module import time and app init steps for a cold start."""
+    env = dict(os.environ, AUTO_MIGRATE=os.environ.get('AUTO_MIGRATE', 'false'))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', _PROFILE_SCRIPT],
+                            capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        click.echo(result.stderr, err=True)
+        raise SystemExit(result.returncode)
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    modules = parse_importtime(result.stderr)
+    modules.sort(key=lambda module: module[2] if sort == 'cumulative' else module[1], reverse=True)
+
+    click.echo(f"Cold import of app: {report['total']:.3f}s")
+    click.echo('')
+    click.echo('Init steps:')
+    for name, seconds in report['steps']:
+        click.echo(f"  {seconds:8.3f}s  {name}")
+    click.echo('')
+    click.echo(f"Slowest modules by {sort} import time:")
+    click.echo(f"  {'self':>8}  {'cumulative':>10}  module")
+    for name, self_seconds, cumulative_seconds in modules[:limit]:
+        click.echo(f"  {self_seconds:7.3f}s  {cumulative_seconds:9.3f}s  {name}")
+
+def register_commands(app):
+    """Register the startup profiling command with the Flask app."""
+    app.cli.add_command(startup_profile_command)
@@ -0,0 +1,166 @@
+import time
+import hashlib
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from instrumentation import requests_timing_hook
+
+logger = logging.getLogger(__name__)
+
+TOKENINFO_URL = 'https://oauth2.googleapis.com/tokeninfo'
+USERINFO_URL = 'https://www.googleapis.com/oauth2/v2/userinfo'
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+class TokenVerifier:
+    """Verifies the signed-in user's Google identity without a round trip per request.
+
+    ID tokens are verified locally against Google's (cached) signing certs.
+    Access tokens are checked once with the tokeninfo endpoint and the result is
+    cached under a hash of the token until the token itself expires. Concurrent
+    checks of the same token share one HTTP call, so a burst of requests after a
+    session purge results in one verification per token rather than one per request.
+    """
+
+    def __init__(self, timeout=(3.05, 10), max_ttl=3600, max_entries=10000):
+        self.timeout = timeout
+        self.max_ttl = max_ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._certs = None
+        self._certs_expire_at = 0
+
+        retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504),
+                      allowed_methods=frozenset(['GET']))
+        self.http = requests.Session()
+        self.http.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry))
+        self.http.hooks['response'].append(requests_timing_hook)
+
+    @staticmethod
+    def _token_key(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def verify(self, credentials, id_token=None):
+        """
+        Get the verified email for the signed-in user
+
+        Args:
+            credentials (dict): OAuth credentials stored in the session
+            id_token (str, optional): OpenID Connect ID token from the same sign-in
+
+        Returns:
+            str: The user's email, or None if the token is invalid or expired
+        """
+        if id_token:
+            email = self._verify_id_token(id_token, credentials.get('client_id'))
+            if email:
+                return email
+
+        token = credentials.get('token')
+        if not token:
+            return None
+
+        key = self._token_key(token)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now:
+                return entry[0]
+            # Only one thread calls Google for a given token; the rest wait for its answer
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+
+        if not leader:
+            event.wait(timeout=sum(self.timeout))
+            with self._lock:
+                entry = self._entries.get(key)
+            return entry[0] if entry and entry[1] > time.monotonic() else None
+
+        try:
+            email, expires_in = self._introspect(token)
+            if email:
+                with self._lock:
+                    if len(self._entries) >= self.max_entries:
+                        self._evict(time.monotonic())
+                    self._entries[key] = (email, time.monotonic() + min(expires_in, self.max_ttl))
+            return email
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def _introspect(self, token):
+        """Ask Google who an access token belongs to and how long it remains valid."""
+        response = self.http.get(TOKENINFO_URL, params={'access_token': token}, timeout=self.timeout)
+        if response.status_code != 200:
+            logger.info(f"Access token rejected by tokeninfo (status {response.status_code})")
+            return None, 0
+
+        info = response.json()
+        expires_in = int(info.get('expires_in', 0))
+        email = info.get('email') if info.get('email_verified') in (True, 'true') else None
+        if not email:
+            # Token lacks the email scope details; fall back to the userinfo endpoint
+            response = self.http.get(USERINFO_URL, headers={'Authorization': f'Bearer {token}'},
+                                     timeout=self.timeout)
+            if response.status_code != 200:
+                return None, 0
+            email = response.json().get('email')
+        return email, expires_in
+
+    def _get_certs(self):
+        """Get Google's ID token signing certs, refetching them when their cache lifetime ends."""
+        now = time.monotonic()
+        if self._certs is None or now >= self._certs_expire_at:
+            response = self.http.get(GOOGLE_CERTS_URL, timeout=self.timeout)
+            response.raise_for_status()
+            max_age = 3600
+            for directive in response.headers.get('Cache-Control', '').split(','):
+                name, _, value = directive.strip().partition('=')
+                if name == 'max-age' and value.isdigit():
+                    max_age = int(value)
+            self._certs = response.json()
+            self._certs_expire_at = now + max_age
+        return self._certs
+
+    def _verify_id_token(self, id_token, client_id):
+        """Verify an ID token locally and return its email, or None if it can't be used."""
+        from google.auth import jwt
+
+        try:
+            claims = jwt.decode(id_token, certs=self._get_certs(), audience=client_id)
+        except Exception as e:
+            # Expired or otherwise unusable; the caller falls back to the access token
+            logger.debug(f"ID token not verified locally: {e}")
+            return None
+
+        if claims.get('iss') not in GOOGLE_ISSUERS or not claims.get('email_verified'):
+            return None
+        return claims.get('email')
+
+    def _evict(self, now):
+        """Drop expired entries, or everything if none have expired yet."""
+        expired = [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]
+        if not expired:
+            self._entries.clear()
+            return
+        for key in expired:
+            del self._entries[key]
+
+    def invalidate(self, token):
+        """Forget the cached verification of an access token."""
+        with self._lock:
+            self._entries.pop(self._token_key(token), None)
+
+# Create singleton instance
+token_verifier = TokenVerifier()
+
+def get_token_verifier():
+    """Get the singleton TokenVerifier instance."""
+    return token_verifier